@@ -0,0 +1,144 @@
+"""
+This module provides the ASGI entry point of the application.
+
+Each HTTP request opens an ``AsyncSession`` and runs the regular Flask
+application inside its ``run_sync`` greenlet, with that session as the
+request session. Views, schemas and services are the ones of the WSGI
+mode; every database call they make is awaited on the event loop by the
+asyncio driver, so a request waiting on the database no longer holds a
+thread and one process serves many concurrent requests.
+
+Serve it with any ASGI server, e.g.:
+
+    uvicorn app.asgi:application --workers 4
+"""
+
+import io
+import sys
+
+from sqlalchemy.util import await_only
+
+from app.main import app as flask_app
+from app.utils.async_bridge import request_session
+from app.utils.database import create_async_session, get_async_engine
+
+
+def _environ(scope: dict, body: bytes) -> dict:
+    """
+    Builds the WSGI environment of an ASGI HTTP request.
+    """
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin-1"),
+        "PATH_INFO": scope["path"].encode().decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope["headers"]:
+        key = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if key == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+            continue
+        if key == "CONTENT_LENGTH":
+            continue
+        key = f"HTTP_{key}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def _serve(session, environ: dict, send):
+    """
+    Runs the Flask application on ``session`` and sends its response.
+    Called inside the ``run_sync`` greenlet, where ``await_only`` hands
+    each send to the event loop.
+    """
+    token = request_session.set(session)
+    response_start = {}
+
+    def start_response(status, headers, exc_info=None):
+        response_start.update(
+            type="http.response.start",
+            status=int(status.split(" ", 1)[0]),
+            headers=[
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in headers
+            ],
+        )
+
+    try:
+        body = flask_app(environ, start_response)
+        try:
+            pending = None
+            for chunk in body:
+                if not chunk:
+                    continue
+                if pending is None:
+                    await_only(send(response_start))
+                else:
+                    await_only(send({
+                        "type": "http.response.body",
+                        "body": pending,
+                        "more_body": True,
+                    }))
+                pending = chunk
+            if pending is None:
+                await_only(send(response_start))
+            await_only(send({
+                "type": "http.response.body", "body": pending or b"",
+            }))
+        finally:
+            if hasattr(body, "close"):
+                body.close()
+    finally:
+        request_session.reset(token)
+
+
+async def _lifespan(receive, send):
+    """
+    Handles the ASGI lifespan protocol: the engine is disposed on shutdown.
+    """
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await get_async_engine().dispose()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    """
+    The ASGI application.
+    """
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    environ = _environ(scope, b"".join(chunks))
+    async with create_async_session() as session:
+        await session.run_sync(_serve, environ, send)
@@ -0,0 +1,79 @@
+"""
+This module contains the command line commands of the application, run
+with ``flask --app app.main <command>``.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+import click
+
+from app.utils.database import SessionLocal, get_engine, init_db
+
+STARTUP_BUDGET_MS = float(os.environ.get("STARTUP_BUDGET_MS", 200))
+
+
+@click.command("init-db")
+def init_db_command():
+    """Create the database, its tables, columns and indexes."""
+    init_db()
+    click.echo("Database initialized.")
+
+
+@click.command("archive-bookings")
+@click.option(
+    "--before",
+    type=click.DateTime(),
+    default=None,
+    help="Archive bookings that ended before this UTC time (default: "
+         "ARCHIVE_RETENTION_DAYS ago).",
+)
+@click.option(
+    "--batch-size",
+    type=int,
+    default=None,
+    help="Bookings moved per transaction (default: ARCHIVE_BATCH_SIZE).",
+)
+def archive_bookings_command(before: datetime | None, batch_size):
+    """Move past bookings to the bookings_archive table."""
+    from app.services.archive import ARCHIVE_BATCH_SIZE, archive_bookings
+
+    get_engine()
+    db = SessionLocal()
+    try:
+        moved = archive_bookings(db, before, batch_size or ARCHIVE_BATCH_SIZE)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    finally:
+        db.close()
+    click.echo(f"{moved} bookings archived.")
+
+
+@click.command("startup-report")
+@click.option(
+    "--connect/--no-connect",
+    default=False,
+    help="Also open the first database connection.",
+)
+def startup_report_command(connect):
+    """
+    Measure the startup of the application in a fresh interpreter and fail
+    when the worker cold start exceeds STARTUP_BUDGET_MS.
+    """
+    command = [sys.executable, "-m", "app.startup"]
+    if connect:
+        command.append("--connect")
+    result = subprocess.run(
+        command, capture_output=True, text=True, check=True
+    )
+    report = json.loads(result.stdout)
+    for name, value in report.items():
+        click.echo(f"{name:>22}: {value:9.3f} ms")
+    if report["cold_start_ms"] > STARTUP_BUDGET_MS:
+        raise click.ClickException(
+            f"Cold start of {report['cold_start_ms']:.1f} ms exceeds the "
+            f"budget of {STARTUP_BUDGET_MS:.0f} ms"
+        )
@@ -3,20 +3,53 @@ This module initializes the Flask application and registers blueprints.
 """
 
 from flask import Flask
-from app.utils.database import init_db
-from app.routes import users_bp, rooms_bp, bookings_bp, auth_bp
+from app.utils.compression import init_compression
+from app.utils.database import close_session, record_write
+from app.utils.metrics import init_metrics
+from app.utils.query_budget import init_query_budget
+from app.utils.serialization import FastJSONProvider
+from app.routes import (
+    users_bp, rooms_bp, bookings_bp, auth_bp, admin_bp, metrics_bp
+)
+from app.commands import (
+    archive_bookings_command,
+    init_db_command,
+    startup_report_command,
+)
 from dotenv import load_dotenv
 
 load_dotenv()
 
-app = Flask(__name__)
 
-app.register_blueprint(users_bp, url_prefix="/api/users")
-app.register_blueprint(rooms_bp, url_prefix="/api/rooms")
-app.register_blueprint(bookings_bp, url_prefix="/api/bookings")
-app.register_blueprint(auth_bp, url_prefix="/api/auth")
+def create_app() -> Flask:
+    """
+    Creates the Flask application. No database connection is opened here:
+    the engine is created on first use and the schema is created with the
+    ``init-db`` command.
+    """
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
 
-init_db()
+    app.register_blueprint(users_bp, url_prefix="/api/users")
+    app.register_blueprint(rooms_bp, url_prefix="/api/rooms")
+    app.register_blueprint(bookings_bp, url_prefix="/api/bookings")
+    app.register_blueprint(auth_bp, url_prefix="/api/auth")
+    app.register_blueprint(admin_bp, url_prefix="/api/admin")
+    app.register_blueprint(metrics_bp)
+
+    app.after_request(record_write)
+    app.teardown_appcontext(close_session)
+    init_metrics(app)
+    init_query_budget(app)
+    init_compression(app)
+
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(archive_bookings_command)
+    app.cli.add_command(startup_report_command)
+    return app
+
+
+app = create_app()
 
 if __name__ == "__main__":
     app.run(debug=True)
@@ -5,3 +5,6 @@ This package contains the SQLAlchemy database models.
 from .user import User
 from .meeting_room import MeetingRoom
 from .booking import Booking
+from .booking_series import BookingSeries
+from .booking_archive import BookingArchive
+from .change_version import ChangeVersion
@@ -2,9 +2,9 @@
 This module defines the Booking model for the database.
 """
 
-from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
-from app.utils.database import Base
+from app.utils.database import Base, RELATIONSHIP_LAZY
 
 
 class Booking(Base):
@@ -12,15 +12,38 @@ class Booking(Base):
     Represents a booking for a meeting room made by a user.
     """
     __tablename__ = "bookings"
+    __table_args__ = (
+        Index(
+            "ix_bookings_room_id_end_time_start_time",
+            "room_id", "end_time", "start_time",
+        ),
+        Index("ix_bookings_start_time_id", "start_time", "id"),
+        Index(
+            "ix_bookings_user_id_start_time_id", "user_id", "start_time", "id"
+        ),
+        Index(
+            "ix_bookings_room_id_start_time_id", "room_id", "start_time", "id"
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     room_id = Column(Integer, ForeignKey("meeting_rooms.id"), nullable=False)
     start_time = Column(DateTime, nullable=False)
     end_time = Column(DateTime, nullable=False)
+    series_id = Column(
+        Integer, ForeignKey("booking_series.id"), nullable=True, index=True
+    )
 
-    user = relationship("User", back_populates="bookings")
-    room = relationship("MeetingRoom", back_populates="bookings")
+    user = relationship(
+        "User", back_populates="bookings", lazy=RELATIONSHIP_LAZY
+    )
+    room = relationship(
+        "MeetingRoom", back_populates="bookings", lazy=RELATIONSHIP_LAZY
+    )
+    series = relationship(
+        "BookingSeries", back_populates="bookings", lazy=RELATIONSHIP_LAZY
+    )
 
     def __repr__(self):
         return (f"<Booking(id={self.id}, user_id={self.user_id}, "
@@ -0,0 +1,56 @@
+"""
+This module defines the BookingArchive model for the database.
+"""
+
+from sqlalchemy import Column, Integer, DateTime, Index
+from sqlalchemy.orm import relationship
+from app.utils.database import Base, RELATIONSHIP_LAZY
+
+
+class BookingArchive(Base):
+    """
+    Represents a past booking moved out of the bookings table by the
+    archival job (see ``app.services.archive``).
+
+    Rows keep the ID they had as a Booking. The table has no foreign keys
+    and its primary key includes ``start_time``, so MySQL can partition it
+    by month.
+    """
+    __tablename__ = "bookings_archive"
+    __table_args__ = (
+        Index("ix_bookings_archive_start_time_id", "start_time", "id"),
+        Index(
+            "ix_bookings_archive_user_id_start_time_id",
+            "user_id", "start_time", "id",
+        ),
+        Index(
+            "ix_bookings_archive_room_id_start_time_id",
+            "room_id", "start_time", "id",
+        ),
+        Index("ix_bookings_archive_series_id", "series_id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    start_time = Column(DateTime, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    room_id = Column(Integer, nullable=False)
+    end_time = Column(DateTime, nullable=False)
+    series_id = Column(Integer, nullable=True)
+
+    user = relationship(
+        "User",
+        primaryjoin="foreign(BookingArchive.user_id) == User.id",
+        viewonly=True,
+        lazy=RELATIONSHIP_LAZY,
+    )
+    room = relationship(
+        "MeetingRoom",
+        primaryjoin="foreign(BookingArchive.room_id) == MeetingRoom.id",
+        viewonly=True,
+        lazy=RELATIONSHIP_LAZY,
+    )
+
+    def __repr__(self):
+        return (f"<BookingArchive(id={self.id}, user_id={self.user_id}, "
+                f"room_id={self.room_id}, start_time={self.start_time}, "
+                f"end_time={self.end_time})>")
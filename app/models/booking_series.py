@@ -0,0 +1,38 @@
+"""
+This module defines the BookingSeries model for the database.
+"""
+
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, String, JSON
+from sqlalchemy.orm import relationship
+from app.utils.database import Base, RELATIONSHIP_LAZY
+
+
+class BookingSeries(Base):
+    """
+    Represents a recurring booking of a meeting room made by a user.
+
+    The series stores the recurrence rule; each occurrence is a regular
+    Booking linked back to it through ``Booking.series_id``.
+    """
+    __tablename__ = "booking_series"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    room_id = Column(Integer, ForeignKey("meeting_rooms.id"), nullable=False)
+    start_time = Column(DateTime, nullable=False)
+    end_time = Column(DateTime, nullable=False)
+    frequency = Column(String(10), nullable=False)
+    interval = Column(Integer, nullable=False, default=1)
+    count = Column(Integer)
+    until = Column(DateTime)
+    exceptions = Column(JSON, nullable=False, default=list)
+
+    bookings = relationship(
+        "Booking", back_populates="series", order_by="Booking.start_time",
+        passive_deletes=True, lazy=RELATIONSHIP_LAZY,
+    )
+
+    def __repr__(self):
+        return (f"<BookingSeries(id={self.id}, room_id={self.room_id}, "
+                f"frequency='{self.frequency}', interval={self.interval}, "
+                f"start_time={self.start_time})>")
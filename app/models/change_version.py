@@ -0,0 +1,21 @@
+"""
+This module defines the ChangeVersion model for the database.
+"""
+
+from sqlalchemy import Column, Integer, String
+from app.utils.database import Base
+
+
+class ChangeVersion(Base):
+    """
+    Counts the writes to a set of rows, e.g. the room catalog or the
+    bookings of one user, so responses built from them can be given an
+    ETag without reading the rows (see ``app.services.change_versions``).
+    """
+    __tablename__ = "change_versions"
+
+    key = Column(String(100), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ChangeVersion(key='{self.key}', version={self.version})>"
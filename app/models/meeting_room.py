@@ -4,7 +4,7 @@ This module defines the MeetingRoom model for the database.
 
 from sqlalchemy import Column, Integer, String, Text
 from sqlalchemy.orm import relationship
-from app.utils.database import Base
+from app.utils.database import Base, RELATIONSHIP_LAZY
 
 
 class MeetingRoom(Base):
@@ -15,10 +15,16 @@ class MeetingRoom(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), unique=True, index=True, nullable=False)
-    capacity = Column(Integer, nullable=False)
+    capacity = Column(Integer, nullable=False, index=True)
     description = Column(Text)
+    booking_version = Column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
 
-    bookings = relationship("Booking", back_populates="room")
+    bookings = relationship(
+        "Booking", back_populates="room", passive_deletes=True,
+        lazy=RELATIONSHIP_LAZY,
+    )
 
     def __repr__(self):
         return f"<MeetingRoom(id={self.id},\
@@ -4,7 +4,7 @@ This module defines the User model for the database.
 
 from sqlalchemy import Column, Integer, String, Boolean
 from sqlalchemy.orm import relationship
-from app.utils.database import Base
+from app.utils.database import Base, RELATIONSHIP_LAZY
 
 
 class User(Base):
@@ -18,7 +18,10 @@ class User(Base):
     password = Column(String(255), nullable=False)
     is_admin = Column(Boolean, default=False)
 
-    bookings = relationship("Booking", back_populates="user")
+    bookings = relationship(
+        "Booking", back_populates="user", passive_deletes=True,
+        lazy=RELATIONSHIP_LAZY,
+    )
 
     def __repr__(self):
         return f"<User(id={self.id},\
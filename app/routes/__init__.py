@@ -6,3 +6,5 @@ from .users import users_bp
 from .rooms import rooms_bp
 from .bookings import bookings_bp
 from .auth import auth_bp
+from .admin import admin_bp
+from .metrics import metrics_bp
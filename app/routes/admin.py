@@ -0,0 +1,37 @@
+"""
+This module contains operational API routes for administrators.
+"""
+
+from flask import Blueprint, jsonify
+from app.utils.database import get_pool_status, get_replica_status
+from app.utils.auth import admin_required
+from app.utils.hashing import hashing_pool
+
+admin_bp = Blueprint("admin", __name__)
+
+
+@admin_bp.route("/pool", methods=["GET"])
+@admin_required
+def get_pool_stats(current_user):
+    """
+    Retrieves database connection pool statistics (admin only).
+    """
+    return jsonify(get_pool_status())
+
+
+@admin_bp.route("/hashing", methods=["GET"])
+@admin_required
+def get_hashing_stats(current_user):
+    """
+    Retrieves password hashing pool statistics (admin only).
+    """
+    return jsonify(hashing_pool.stats())
+
+
+@admin_bp.route("/replicas", methods=["GET"])
+@admin_required
+def get_replica_stats(current_user):
+    """
+    Retrieves the read replicas and their health (admin only).
+    """
+    return jsonify(get_replica_status())
@@ -2,51 +2,106 @@
 This module contains authentication-related routes.
 """
 
-from app.models.user import User
 from flask import Blueprint, jsonify, request
 from app.schemas.user import UserCreate, UserInDB
-from app.services.user import create_user, get_user_by_username
-from app.utils.hashing import Hasher
-from app.utils.auth import create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
-from app.utils.database import get_db
+from app.services.user import (
+    create_user,
+    get_user_by_username,
+    has_users,
+    update_password_hash,
+)
+from app.utils.hashing import Hasher, HashingBusyError
+from app.utils.auth import (
+    create_access_token,
+    revoke_token,
+    token_required,
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+)
+from app.utils.query_budget import query_budget
+from app.utils.rate_limit import (
+    Limit,
+    client_ip,
+    client_ip_and_username,
+    rate_limited,
+)
+from app.utils.database import get_session
 from sqlalchemy.orm import Session
 from datetime import timedelta
 from pydantic import ValidationError
+import os
+
+LOGIN_LIMIT_PER_IP = Limit.parse(os.environ.get("LOGIN_LIMIT_PER_IP", "20/60"))
+LOGIN_LIMIT_PER_USERNAME = Limit.parse(
+    os.environ.get("LOGIN_LIMIT_PER_USERNAME", "5/60")
+)
+REGISTER_LIMIT_PER_IP = Limit.parse(
+    os.environ.get("REGISTER_LIMIT_PER_IP", "10/3600")
+)
 
 auth_bp = Blueprint("auth", __name__)
 
 
 @auth_bp.route("/register", methods=["POST"])
+@query_budget(4)
+@rate_limited("register", (client_ip, REGISTER_LIMIT_PER_IP))
 def register_user():
     """
     Registers a new user.
     """
-    db: Session = next(get_db())
+    db: Session = get_session()
     try:
         user_data = UserCreate(**request.json)
     except ValidationError as e:
         return jsonify(e.errors()), 400
-    is_first_user = db.query(User).count() == 0
-    user_data.is_admin = is_first_user
+    user_data.is_admin = not has_users(db)
     if get_user_by_username(db, user_data.username):
         return jsonify({"message": "Username already exists"}), 409
-    user = create_user(db, user_data)
+    try:
+        user = create_user(db, user_data)
+    except HashingBusyError as e:
+        return jsonify({"message": str(e)}), 503
     return jsonify(UserInDB.model_validate(user).model_dump()), 201
 
 
 @auth_bp.route("/login", methods=["POST"])
+@query_budget(2)
+@rate_limited(
+    "login",
+    (client_ip, LOGIN_LIMIT_PER_IP),
+    (client_ip_and_username, LOGIN_LIMIT_PER_USERNAME),
+)
 def login_user():
     """
     Logs in a user.
     """
-    db: Session = next(get_db())
+    db: Session = get_session()
     username = request.json.get("username")
     password = request.json.get("password")
     user = get_user_by_username(db, username)
-    if not user or not Hasher.verify_password(password, user.password):
+    try:
+        if not user:
+            Hasher.verify_missing(password)
+            return jsonify({"message": "Invalid credentials"}), 401
+        verified, new_hash = Hasher.verify_and_update(password, user.password)
+    except HashingBusyError as e:
+        return jsonify({"message": str(e)}), 503
+    if not verified:
         return jsonify({"message": "Invalid credentials"}), 401
+    if new_hash:
+        update_password_hash(db, user, new_hash)
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
     )
     return jsonify(access_token=access_token), 200
+
+
+@auth_bp.route("/logout", methods=["POST"])
+@query_budget(1)
+@token_required
+def logout_user(current_user):
+    """
+    Logs out a user by revoking the token of the request.
+    """
+    revoke_token(request.headers["Authorization"].split(" ")[1])
+    return "", 204
@@ -2,31 +2,128 @@
 This module contains API routes for booking management.
 """
 
-from flask import Blueprint, jsonify, request
+import csv
+import io
+import json
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from app.schemas.booking import BookingCreate, BookingUpdate, BookingInDB
+from app.schemas.meeting_room import MeetingRoomInDB
+from app.schemas.user import UserInDB
+from app.schemas.booking_series import (
+    BookingSeriesCreate,
+    BookingSeriesUpdate,
+    BookingSeriesInDB,
+)
 from app.services.booking import (
+    ConcurrentWriteError,
     get_booking_by_id,
+    get_archived_booking,
     create_booking,
+    create_bookings_bulk,
     update_booking,
     cancel_booking,
     get_bookings_by_user_id,
     get_bookings_by_room_id,
     get_bookings,
+    iter_bookings,
+)
+from app.services.booking_series import (
+    get_booking_series_by_id,
+    create_booking_series,
+    update_booking_series,
+    cancel_booking_series,
 )
-from app.utils.database import get_db
+from app.services.change_versions import ROOMS, USERS, user_bookings_key
+from app.utils.database import get_read_session, get_session
 from sqlalchemy.orm import Session
+from pydantic import ValidationError
 from app.utils.auth import token_required, admin_required, user_required
+from app.utils.conditional import conditional_on
+from app.utils.query_budget import query_budget
+from app.utils.pagination import get_pagination_args, paginate
+from app.utils.serialization import schema_fields, serialize_rows
+from datetime import datetime
 
 bookings_bp = Blueprint("bookings", __name__)
 
+MAX_BATCH_SIZE = 10000
+EXPORT_FIELDS = tuple(BookingInDB.model_fields)
+EXPORT_CHUNK_ROWS = 500
+INCLUDES = {"room": MeetingRoomInDB, "user": UserInDB}
+
+
+def _booking_key(booking: dict) -> tuple:
+    """
+    Returns the keyset pagination key of a serialized booking.
+    """
+    return booking["start_time"], booking["id"]
+
+
+def _include_arg() -> tuple[str, ...]:
+    """
+    Reads the related objects requested with ``?include=room,user``.
+    """
+    names = tuple(dict.fromkeys(
+        name.strip() for name in request.args.get("include", "").split(",")
+        if name.strip()
+    ))
+    for name in names:
+        if name not in INCLUDES:
+            raise ValueError(f"Invalid value for include: {name}")
+    return names
+
+
+def _serialize_bookings(bookings, include: tuple[str, ...]) -> list[dict]:
+    """
+    Serializes bookings, embedding the related objects named in
+    ``include``; each distinct object is serialized once.
+    """
+    items = serialize_rows(BookingInDB, bookings)
+    for name in include:
+        serialized = {}
+        for item, booking in zip(items, bookings):
+            related = getattr(booking, name)
+            if related is None:
+                item[name] = None
+                continue
+            if related.id not in serialized:
+                serialized[related.id] = serialize_rows(
+                    INCLUDES[name], [related]
+                )[0]
+            item[name] = serialized[related.id]
+    return items
+
+
+def _list_fields(include: tuple[str, ...]) -> tuple[str, ...] | None:
+    """
+    Returns the columns a booking list selects: only those of the
+    response, unless related objects are included and ORM objects with
+    eagerly loaded relationships are needed.
+    """
+    return None if include else schema_fields(BookingInDB)
+
+
+def _user_bookings_versions(current_user, user_id: int) -> list[str]:
+    """
+    Returns the change versions the booking list of a user depends on.
+    """
+    include = request.args.get("include", "")
+    keys = [user_bookings_key(user_id)]
+    if "room" in include:
+        keys.append(ROOMS)
+    if "user" in include:
+        keys.append(USERS)
+    return keys
+
 
 @bookings_bp.route("/", methods=["POST"])
+@query_budget(9)
 @token_required
 def create_new_booking(current_user):
     """
     Creates a new booking.
     """
-    db: Session = next(get_db())
+    db: Session = get_session()
     try:
         booking_data = BookingCreate(**request.json)
         if not current_user.is_admin and\
@@ -34,110 +131,413 @@ def create_new_booking(current_user):
             raise ValueError("Unauthorized to create booking for other users")
         booking = create_booking(db, booking_data)
         return jsonify(BookingInDB.model_validate(booking).model_dump()), 201
+    except ConcurrentWriteError as e:
+        return jsonify({"message": str(e)}), 409
     except ValueError as e:
         if "not available" in str(e):
             return jsonify({"message": str(e)}), 409
         return jsonify({"message": str(e)}), 400
 
 
+@bookings_bp.route("/batch", methods=["POST"])
+@query_budget(7)
+@token_required
+def create_new_bookings_batch(current_user):
+    """
+    Creates many bookings at once and reports the outcome of each item.
+    """
+    db: Session = get_session()
+    items = request.json
+    if not isinstance(items, list):
+        return jsonify({"message": "Expected a list of bookings"}), 400
+    if len(items) > MAX_BATCH_SIZE:
+        return jsonify(
+            {"message": f"At most {MAX_BATCH_SIZE} bookings per batch"}
+        ), 400
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[index] = {
+                "status": "invalid", "message": "Expected a booking object"
+            }
+            continue
+        try:
+            booking_data = BookingCreate(**item)
+        except ValidationError as e:
+            results[index] = {
+                "status": "invalid",
+                "message": e.errors(include_url=False, include_context=False),
+            }
+            continue
+        if not current_user.is_admin and\
+                booking_data.user_id != current_user.id:
+            results[index] = {
+                "status": "invalid",
+                "message": "Unauthorized to create booking for other users",
+            }
+            continue
+        valid.append((index, booking_data))
+    try:
+        created = create_bookings_bulk(db, [data for _, data in valid])
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 409
+    for (index, _), result in zip(valid, created):
+        if "booking" in result:
+            result["booking"] = BookingInDB.model_validate(
+                result["booking"]
+            ).model_dump()
+        results[index] = result
+    return jsonify(
+        [{"index": index, **result} for index, result in enumerate(results)]
+    )
+
+
 @bookings_bp.route("/<int:booking_id>", methods=["GET"])
+@query_budget(5)
 @token_required
 def get_existing_booking(current_user, booking_id: int):
     """
-    Retrieves a booking by ID.
+    Retrieves a booking by ID, with its room and user when requested with
+    ``?include=room,user``.
     """
-    db: Session = next(get_db())
-    booking = get_booking_by_id(db, booking_id)
+    db: Session = get_read_session()
+    try:
+        include = _include_arg()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    booking = get_booking_by_id(db, booking_id, include) or \
+        get_archived_booking(db, booking_id, include)
     if booking:
         if not current_user.is_admin and booking.user_id != current_user.id:
             return jsonify(
                 {"message": "Unauthorized to view this booking"}
             ), 403
-        return jsonify(BookingInDB.model_validate(booking).model_dump())
+        return jsonify(_serialize_bookings([booking], include)[0])
     return jsonify({"message": "Booking not found"}), 404
 
 
 @bookings_bp.route("/user/<int:user_id>", methods=["GET"])
+@query_budget(8)
 @user_required
+@conditional_on(_user_bookings_versions)
 def get_bookings_for_user(current_user, user_id: int):
     """
-    Retrieves all bookings for a specific user.
+    Retrieves all bookings for a specific user. Answers ``304 Not
+    Modified`` while they are unchanged.
     """
-    db: Session = next(get_db())
-    skip = int(request.args.get("skip", 0))
-    limit = int(request.args.get("limit", 100))
-    bookings = get_bookings_by_user_id(db, user_id, skip, limit)
-    return jsonify(
-        [BookingInDB.model_validate(booking).model_dump()
-         for booking in bookings]
+    db: Session = get_read_session()
+    try:
+        skip, limit, after, keyset = get_pagination_args(
+            datetime.fromisoformat, int
+        )
+        start_time = _optional_arg("from", datetime.fromisoformat)
+        end_time = _optional_arg("to", datetime.fromisoformat)
+        history = bool(_optional_arg("history", _parse_flag))
+        include = _include_arg()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    bookings = get_bookings_by_user_id(
+        db, user_id, skip, limit, after, _list_fields(include),
+        start_time, end_time, include, history
     )
+    return jsonify(paginate(
+        _serialize_bookings(bookings, include), limit, keyset, _booking_key
+    ))
 
 
 @bookings_bp.route("/room/<int:room_id>", methods=["GET"])
+@query_budget(7)
 @admin_required
 def get_bookings_for_room(current_user, room_id: int):
     """
     Retrieves all bookings for a specific room (admin only).
     """
-    db: Session = next(get_db())
-    skip = int(request.args.get("skip", 0))
-    limit = int(request.args.get("limit", 100))
-    bookings = get_bookings_by_room_id(db, room_id, skip, limit)
-    return jsonify(
-        [BookingInDB.model_validate(booking).model_dump()
-         for booking in bookings]
+    db: Session = get_read_session()
+    try:
+        skip, limit, after, keyset = get_pagination_args(
+            datetime.fromisoformat, int
+        )
+        start_time = _optional_arg("from", datetime.fromisoformat)
+        end_time = _optional_arg("to", datetime.fromisoformat)
+        history = bool(_optional_arg("history", _parse_flag))
+        include = _include_arg()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    bookings = get_bookings_by_room_id(
+        db, room_id, skip, limit, after, _list_fields(include),
+        start_time, end_time, include, history
     )
+    return jsonify(paginate(
+        _serialize_bookings(bookings, include), limit, keyset, _booking_key
+    ))
 
 
 @bookings_bp.route("/", methods=["GET"])
+@query_budget(7)
 @admin_required
 def get_all_bookings(current_user):
     """
     Retrieves all bookings (admin only).
     """
-    db: Session = next(get_db())
-    skip = int(request.args.get("skip", 0))
-    limit = int(request.args.get("limit", 100))
-    if skip < 0 or limit < 0:
-        raise ValueError("skip and limit must be >= 0")
-    bookings = get_bookings(db, skip, limit)
-    return jsonify(
-        [BookingInDB.model_validate(booking).model_dump()
-         for booking in bookings]
+    db: Session = get_read_session()
+    try:
+        skip, limit, after, keyset = get_pagination_args(
+            datetime.fromisoformat, int
+        )
+        start_time = _optional_arg("from", datetime.fromisoformat)
+        end_time = _optional_arg("to", datetime.fromisoformat)
+        history = bool(_optional_arg("history", _parse_flag))
+        include = _include_arg()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    bookings = get_bookings(
+        db, skip, limit, after, _list_fields(include), start_time,
+        end_time, include, history
     )
+    return jsonify(paginate(
+        _serialize_bookings(bookings, include), limit, keyset, _booking_key
+    ))
+
+
+@bookings_bp.route("/export", methods=["GET"])
+@query_budget(2)
+@admin_required
+def export_bookings(current_user):
+    """
+    Streams bookings as NDJSON or CSV (admin only).
+    """
+    db: Session = get_read_session()
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in ("ndjson", "csv"):
+        return jsonify({"message": "format must be ndjson or csv"}), 400
+    try:
+        start_time = _optional_arg("from", datetime.fromisoformat)
+        end_time = _optional_arg("to", datetime.fromisoformat)
+        history = bool(_optional_arg("history", _parse_flag))
+        room_id = _optional_arg("room_id", int)
+        user_id = _optional_arg("user_id", int)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    rows = iter_bookings(
+        db, EXPORT_FIELDS, start_time, end_time, room_id, user_id,
+        history=history
+    )
+    if export_format == "csv":
+        body, mimetype = _csv_chunks(rows), "text/csv"
+    else:
+        body, mimetype = _ndjson_chunks(rows), "application/x-ndjson"
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={
+            "Content-Disposition":
+                f"attachment; filename=bookings.{export_format}"
+        },
+    )
+
+
+def _optional_arg(name: str, cast):
+    """
+    Reads an optional query parameter, converting it with ``cast``.
+    """
+    value = request.args.get(name)
+    if value is None or value == "":
+        return None
+    try:
+        return cast(value)
+    except ValueError as e:
+        raise ValueError(f"Invalid value for {name}: {value}") from e
+
+
+def _parse_flag(value: str) -> bool:
+    """
+    Parses a boolean query parameter.
+    """
+    if value.lower() in ("1", "true", "yes"):
+        return True
+    if value.lower() in ("0", "false", "no"):
+        return False
+    raise ValueError(value)
+
+
+def _export_value(value):
+    """
+    Formats a column value for export.
+    """
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _ndjson_chunks(rows):
+    """
+    Encodes rows as newline-delimited JSON objects, a few hundred per chunk.
+    """
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(
+            dict(zip(EXPORT_FIELDS, map(_export_value, row)))
+        ))
+        if len(lines) == EXPORT_CHUNK_ROWS:
+            lines.append("")
+            yield "\n".join(lines)
+            lines = []
+    if lines:
+        lines.append("")
+        yield "\n".join(lines)
+
+
+def _csv_chunks(rows):
+    """
+    Encodes rows as CSV with a header line, a few hundred rows per chunk.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(map(_export_value, row))
+        if count % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
 
 
 @bookings_bp.route("/<int:booking_id>", methods=["PUT"])
+@query_budget(10)
 @token_required
 def update_existing_booking(current_user, booking_id: int):
     """
     Updates an existing booking.
     """
-    db: Session = next(get_db())
+    db: Session = get_session()
     booking = get_booking_by_id(db, booking_id)
     if not booking:
         return jsonify({"message": "Booking not found"}), 404
     if not current_user.is_admin and booking.user_id != current_user.id:
         return jsonify({"message": "Unauthorized to update this booking"}), 403
-    booking_data = BookingUpdate(**request.json)
-    updated_booking = update_booking(db, booking_id, booking_data)
+    try:
+        booking_data = BookingUpdate(**request.json)
+        updated_booking = update_booking(db, booking_id, booking_data)
+    except ValidationError as e:
+        return jsonify({"message": str(e)}), 400
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 409
+    if updated_booking is None:
+        return jsonify({"message": "Booking not found"}), 404
     return jsonify(
         BookingInDB.model_validate(updated_booking).model_dump()
     )
 
 
 @bookings_bp.route("/<int:booking_id>", methods=["DELETE"])
+@query_budget(9)
 @token_required
 def delete_existing_booking(current_user, booking_id: int):
     """
     Deletes a booking.
     """
-    db: Session = next(get_db())
+    db: Session = get_session()
     booking = get_booking_by_id(db, booking_id)
     if not booking:
         return jsonify({"message": "Booking not found"}), 404
     if not current_user.is_admin and booking.user_id != current_user.id:
         return jsonify({"message": "Unauthorized to delete this booking"}), 403
-    if cancel_booking(db, booking_id):
+    try:
+        cancelled = cancel_booking(db, booking_id)
+    except ConcurrentWriteError as e:
+        return jsonify({"message": str(e)}), 409
+    if cancelled:
         return "", 204
     return jsonify({"message": "Booking not found"}), 404
+
+
+@bookings_bp.route("/series", methods=["POST"])
+@query_budget(11)
+@token_required
+def create_new_booking_series(current_user):
+    """
+    Creates a recurring booking and all of its occurrences.
+    """
+    db: Session = get_session()
+    try:
+        series_data = BookingSeriesCreate(**request.json)
+        if not current_user.is_admin and\
+                series_data.user_id != current_user.id:
+            raise ValueError("Unauthorized to create booking for other users")
+        series = create_booking_series(db, series_data)
+        return jsonify(
+            BookingSeriesInDB.model_validate(series).model_dump()
+        ), 201
+    except ConcurrentWriteError as e:
+        return jsonify({"message": str(e)}), 409
+    except ValueError as e:
+        if "not available" in str(e):
+            return jsonify({"message": str(e)}), 409
+        return jsonify({"message": str(e)}), 400
+
+
+@bookings_bp.route("/series/<int:series_id>", methods=["GET"])
+@query_budget(3)
+@token_required
+def get_existing_booking_series(current_user, series_id: int):
+    """
+    Retrieves a recurring booking with its occurrences.
+    """
+    db: Session = get_read_session()
+    series = get_booking_series_by_id(db, series_id, with_bookings=True)
+    if series:
+        if not current_user.is_admin and series.user_id != current_user.id:
+            return jsonify(
+                {"message": "Unauthorized to view this booking"}
+            ), 403
+        return jsonify(BookingSeriesInDB.model_validate(series).model_dump())
+    return jsonify({"message": "Booking series not found"}), 404
+
+
+@bookings_bp.route("/series/<int:series_id>", methods=["PUT"])
+@query_budget(13)
+@token_required
+def update_existing_booking_series(current_user, series_id: int):
+    """
+    Updates the rule of a recurring booking and its upcoming occurrences.
+    """
+    db: Session = get_session()
+    series = get_booking_series_by_id(db, series_id)
+    if not series:
+        return jsonify({"message": "Booking series not found"}), 404
+    if not current_user.is_admin and series.user_id != current_user.id:
+        return jsonify({"message": "Unauthorized to update this booking"}), 403
+    try:
+        series_data = BookingSeriesUpdate(**request.json)
+        updated_series = update_booking_series(db, series_id, series_data)
+        return jsonify(
+            BookingSeriesInDB.model_validate(updated_series).model_dump()
+        )
+    except ConcurrentWriteError as e:
+        return jsonify({"message": str(e)}), 409
+    except ValueError as e:
+        if "not available" in str(e):
+            return jsonify({"message": str(e)}), 409
+        return jsonify({"message": str(e)}), 400
+
+
+@bookings_bp.route("/series/<int:series_id>", methods=["DELETE"])
+@query_budget(11)
+@token_required
+def delete_existing_booking_series(current_user, series_id: int):
+    """
+    Cancels the upcoming occurrences of a recurring booking.
+    """
+    db: Session = get_session()
+    series = get_booking_series_by_id(db, series_id)
+    if not series:
+        return jsonify({"message": "Booking series not found"}), 404
+    if not current_user.is_admin and series.user_id != current_user.id:
+        return jsonify({"message": "Unauthorized to delete this booking"}), 403
+    try:
+        cancelled = cancel_booking_series(db, series_id)
+    except ConcurrentWriteError as e:
+        return jsonify({"message": str(e)}), 409
+    if cancelled:
+        return "", 204
+    return jsonify({"message": "Booking series not found"}), 404
@@ -0,0 +1,36 @@
+"""
+This module contains the Prometheus metrics route.
+"""
+
+import hmac
+import os
+
+from flask import Blueprint, Response, jsonify, request
+from app.utils.database import get_pool_status
+from app.utils.metrics import render_metrics
+
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def get_metrics():
+    """
+    Exposes request and database metrics in the Prometheus text format.
+    When ``METRICS_TOKEN`` is set, scrapers must send it as a bearer token.
+    """
+    if METRICS_TOKEN:
+        token = request.headers.get("Authorization", "").split(" ")[-1]
+        if not hmac.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+            return jsonify({"message": "Invalid metrics token"}), 401
+    pool = get_pool_status()
+    body = render_metrics({
+        "db_pool_checked_out": (
+            "Connections checked out of the pool.", pool["checked_out"]
+        ),
+        "db_pool_overflow": (
+            "Connections open beyond the pool size.", pool["overflow"]
+        ),
+    })
+    return Response(body, mimetype="text/plain; version=0.0.4")
@@ -7,6 +7,8 @@ from app.schemas.meeting_room import (
     MeetingRoomCreate,
     MeetingRoomUpdate,
     MeetingRoomInDB,
+    MeetingRoomAvailabilityQuery,
+    MeetingRoomOccupancyQuery,
 )
 from app.services.meeting_room import (
     get_room_by_id,
@@ -15,22 +17,41 @@ from app.services.meeting_room import (
     update_room,
     delete_room,
     get_rooms,
+    get_available_rooms,
 )
-from app.utils.database import get_db
-from app.utils.auth import admin_required
+from app.services.occupancy import (
+    get_rooms_occupancy,
+    encode_base64,
+    encode_rle,
+)
+from app.utils.database import get_read_session, get_session
+from app.services.change_versions import ROOMS
+from app.utils.auth import admin_required, token_required
+from app.utils.conditional import conditional_on
+from app.utils.query_budget import query_budget
+from app.utils.pagination import get_pagination_args, paginate
+from app.utils.serialization import schema_fields, serialize_rows
 from sqlalchemy.orm import Session
 from pydantic import ValidationError
 
 rooms_bp = Blueprint("rooms", __name__)
 
 
+def _room_key(room: dict) -> tuple:
+    """
+    Returns the keyset pagination key of a serialized meeting room.
+    """
+    return (room["id"],)
+
+
 @rooms_bp.route("/", methods=["POST"])
+@query_budget(4)
 @admin_required
 def create_new_room(current_user):
     """
     Creates a new meeting room.
     """
-    db: Session = next(get_db())
+    db: Session = get_session()
     try:
         room_data = MeetingRoomCreate(**request.json)
         room = create_room(db, room_data)
@@ -44,12 +65,13 @@ def create_new_room(current_user):
 
 
 @rooms_bp.route("/<int:room_id>", methods=["GET"])
+@query_budget(2)
 @admin_required
 def get_existing_room(current_user, room_id: int):
     """
     Retrieves a meeting room by ID.
     """
-    db: Session = next(get_db())
+    db: Session = get_read_session()
     room = get_room_by_id(db, room_id)
     if room:
         return jsonify(MeetingRoomInDB.model_validate(room).model_dump())
@@ -57,12 +79,13 @@ def get_existing_room(current_user, room_id: int):
 
 
 @rooms_bp.route("/name/<string:name>", methods=["GET"])
+@query_budget(2)
 @admin_required
 def get_existing_room_by_name(current_user, name: str):
     """
     Retrieves a meeting room by name.
     """
-    db: Session = next(get_db())
+    db: Session = get_read_session()
     room = get_room_by_name(db, name)
     if room:
         return jsonify(MeetingRoomInDB.model_validate(room).model_dump())
@@ -70,27 +93,90 @@ def get_existing_room_by_name(current_user, name: str):
 
 
 @rooms_bp.route("/", methods=["GET"])
+@query_budget(3)
 @admin_required
+@conditional_on(lambda current_user: [ROOMS])
 def get_all_rooms(current_user):
     """
-    Retrieves all meeting rooms.
+    Retrieves all meeting rooms. Answers ``304 Not Modified`` while the
+    catalog is unchanged.
+    """
+    db: Session = get_read_session()
+    try:
+        skip, limit, after, keyset = get_pagination_args(int)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    rooms = get_rooms(
+        db, skip, limit, after, fields=schema_fields(MeetingRoomInDB)
+    )
+    return jsonify(paginate(
+        serialize_rows(MeetingRoomInDB, rooms), limit, keyset, _room_key
+    ))
+
+
+@rooms_bp.route("/available", methods=["GET"])
+@query_budget(2)
+@token_required
+def get_available_rooms_for_slot(current_user):
+    """
+    Retrieves meeting rooms free during a time slot.
     """
-    db: Session = next(get_db())
-    skip = int(request.args.get("skip", 0))
-    limit = int(request.args.get("limit", 100))
-    rooms = get_rooms(db, skip, limit)
-    return jsonify(
-        [MeetingRoomInDB.model_validate(room).model_dump() for room in rooms]
+    db: Session = get_read_session()
+    try:
+        query = MeetingRoomAvailabilityQuery(**request.args.to_dict())
+    except ValidationError as e:
+        return jsonify(e.errors(include_context=False)), 400
+    try:
+        skip, limit, after, keyset = get_pagination_args(int)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    rooms = get_available_rooms(
+        db, query.start, query.end, query.min_capacity, skip, limit, after,
+        fields=schema_fields(MeetingRoomInDB)
+    )
+    return jsonify(paginate(
+        serialize_rows(MeetingRoomInDB, rooms), limit, keyset, _room_key
+    ))
+
+
+@rooms_bp.route("/occupancy", methods=["GET"])
+@query_budget(4)
+@token_required
+def get_occupancy(current_user):
+    """
+    Retrieves the occupancy bitmap of every meeting room over a time range.
+    """
+    db: Session = get_read_session()
+    try:
+        query = MeetingRoomOccupancyQuery(**request.args.to_dict())
+    except ValidationError as e:
+        return jsonify(e.errors(include_context=False)), 400
+    encode = encode_rle if query.encoding == "rle" else encode_base64
+    occupancy = get_rooms_occupancy(
+        db, query.start, query.end, query.granularity
     )
+    return jsonify({
+        "from": query.start,
+        "to": query.end,
+        "granularity": query.granularity,
+        "cells": int((query.end - query.start).total_seconds())
+        // 60 // query.granularity,
+        "encoding": query.encoding,
+        "rooms": [
+            {"room_id": room_id, "occupancy": encode(cells, bits)}
+            for room_id, cells, bits in occupancy
+        ],
+    })
 
 
 @rooms_bp.route("/<int:room_id>", methods=["PUT"])
+@query_budget(5)
 @admin_required
 def update_existing_room(current_user, room_id: int):
     """
     Updates an existing meeting room.
     """
-    db: Session = next(get_db())
+    db: Session = get_session()
     try:
         room_data = MeetingRoomUpdate(**request.json)
     except ValidationError as e:
@@ -104,12 +190,13 @@ def update_existing_room(current_user, room_id: int):
 
 
 @rooms_bp.route("/<int:room_id>", methods=["DELETE"])
+@query_budget(5)
 @admin_required
 def delete_existing_room(current_user, room_id: int):
     """
     Deletes a meeting room.
     """
-    db: Session = next(get_db())
+    db: Session = get_session()
     if delete_room(db, room_id):
         return "", 204
     return jsonify({"message": "Room not found"}), 404
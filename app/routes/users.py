@@ -2,50 +2,166 @@
 This module contains API routes for user management.
 """
 
+import csv
+import io
+import os
+
 from flask import Blueprint, jsonify, request
 from app.schemas.user import UserCreate, UserUpdate, UserInDB
 from app.services.user import (
     get_user_by_id,
     get_user_by_username,
     create_user,
+    create_users_bulk,
     update_user,
     delete_user,
     get_users,
+    IMPORT_CHUNK_ROWS,
 )
-from app.utils.database import get_db
+from app.utils.database import get_read_session, get_session
 from sqlalchemy.orm import Session
 from app.utils.auth import admin_required
+from app.utils.query_budget import query_budget
+from app.utils.hashing import HashingBusyError
+from app.utils.pagination import get_pagination_args, paginate
+from app.utils.serialization import schema_fields, serialize_rows
 from pydantic import ValidationError
 
 users_bp = Blueprint("users", __name__)
 
+USER_IMPORT_MAX_ROWS = int(os.environ.get("USER_IMPORT_MAX_ROWS", 10000))
+# Authentication, the username check, and an insert plus (on MySQL) an id
+# lookup per chunk.
+IMPORT_QUERY_BUDGET = 2 + 2 * -(-USER_IMPORT_MAX_ROWS // IMPORT_CHUNK_ROWS)
+
+
+def _user_key(user: dict) -> tuple:
+    """
+    Returns the keyset pagination key of a serialized user.
+    """
+    return (user["id"],)
+
 
 @users_bp.route("/", methods=["POST"])
+@query_budget(3)
 @admin_required
 def create_new_user(current_user):
     """
     Creates a new user (admin only).
     """
-    db: Session = next(get_db())
+    db: Session = get_session()
     try:
         user_data = UserCreate(**request.json)
         user = create_user(db, user_data)
         return jsonify(UserInDB.model_validate(user).model_dump()), 201
     except ValidationError as e:
         return jsonify(e.errors()), 400
+    except HashingBusyError as e:
+        return jsonify({"message": str(e)}), 503
     except ValueError as e:
         if "already exists" in str(e):
             return jsonify({"message": str(e)}), 409
         return jsonify({"message": str(e)}), 400
 
 
+IMPORT_CSV_FIELDS = ("username", "password", "is_admin")
+
+
+def _import_rows() -> tuple[list, dict[int, str]]:
+    """
+    Reads the rows of a user import: a CSV body (``text/csv``) with a
+    header of ``username,password[,is_admin]``, or a JSON array. Returns
+    the rows and the messages of the CSV rows that cannot be read, by
+    index. Raises ValueError for an invalid CSV header.
+    """
+    if request.mimetype != "text/csv":
+        return request.json, {}
+    reader = csv.DictReader(io.StringIO(request.get_data(as_text=True)))
+    header = reader.fieldnames or []
+    unknown = [field for field in header if field not in IMPORT_CSV_FIELDS]
+    if unknown or len(set(header)) != len(header) or not {
+        "username", "password"
+    } <= set(header):
+        raise ValueError(
+            "Invalid CSV: the header must have the columns username, "
+            "password and optionally is_admin, once each"
+        )
+    rows, errors = [], {}
+    for index, row in enumerate(reader):
+        if None in row:
+            errors[index] = (
+                f"Row has {len(header) + len(row[None])} fields, "
+                f"expected {len(header)}"
+            )
+        rows.append({
+            key: value for key, value in row.items()
+            if key is not None and value
+        })
+    return rows, errors
+
+
+@users_bp.route("/import", methods=["POST"])
+@query_budget(IMPORT_QUERY_BUDGET)
+@admin_required
+def import_users(current_user):
+    """
+    Creates many users at once and reports the outcome of each row
+    (admin only).
+    """
+    db: Session = get_session()
+    try:
+        items, errors = _import_rows()
+    except csv.Error as e:
+        return jsonify({"message": f"Invalid CSV: {e}"}), 400
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    if not isinstance(items, list):
+        return jsonify({"message": "Expected a list of users"}), 400
+    if len(items) > USER_IMPORT_MAX_ROWS:
+        return jsonify(
+            {"message": f"At most {USER_IMPORT_MAX_ROWS} users per import"}
+        ), 400
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        if index in errors:
+            results[index] = {"status": "invalid", "message": errors[index]}
+            continue
+        if not isinstance(item, dict):
+            results[index] = {
+                "status": "invalid", "message": "Expected a user object"
+            }
+            continue
+        try:
+            valid.append((index, UserCreate(**item)))
+        except ValidationError as e:
+            results[index] = {
+                "status": "invalid",
+                "message": e.errors(include_url=False, include_context=False),
+            }
+    try:
+        created = create_users_bulk(db, [data for _, data in valid])
+    except HashingBusyError as e:
+        return jsonify({"message": str(e)}), 503
+    for (index, _), result in zip(valid, created):
+        if "user" in result:
+            result["user"] = UserInDB.model_validate(
+                result["user"]
+            ).model_dump()
+        results[index] = result
+    return jsonify(
+        [{"index": index, **result} for index, result in enumerate(results)]
+    )
+
+
 @users_bp.route("/<int:user_id>", methods=["GET"])
+@query_budget(2)
 @admin_required
 def get_existing_user(current_user, user_id: int):
     """
     Retrieves a user by ID (admin only).
     """
-    db: Session = next(get_db())
+    db: Session = get_read_session()
     user = get_user_by_id(db, user_id)
     if user:
         return jsonify(UserInDB.model_validate(user).model_dump())
@@ -53,12 +169,13 @@ def get_existing_user(current_user, user_id: int):
 
 
 @users_bp.route("/username/<string:username>", methods=["GET"])
+@query_budget(2)
 @admin_required
 def get_existing_user_by_username(current_user, username: str):
     """
     Retrieves a user by username (admin only).
     """
-    db: Session = next(get_db())
+    db: Session = get_read_session()
     user = get_user_by_username(db, username)
     if user:
         return jsonify(UserInDB.model_validate(user).model_dump())
@@ -66,27 +183,33 @@ def get_existing_user_by_username(current_user, username: str):
 
 
 @users_bp.route("/", methods=["GET"])
+@query_budget(2)
 @admin_required
 def get_all_users(current_user):
     """
     Retrieves all users (admin only).
     """
-    db: Session = next(get_db())
-    skip = int(request.args.get("skip", 0))
-    limit = int(request.args.get("limit", 100))
-    users = get_users(db, skip, limit)
-    return jsonify(
-        [UserInDB.model_validate(user).model_dump() for user in users]
+    db: Session = get_read_session()
+    try:
+        skip, limit, after, keyset = get_pagination_args(int)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    users = get_users(
+        db, skip, limit, after, fields=schema_fields(UserInDB)
     )
+    return jsonify(paginate(
+        serialize_rows(UserInDB, users), limit, keyset, _user_key
+    ))
 
 
 @users_bp.route("/<int:user_id>", methods=["PUT"])
+@query_budget(5)
 @admin_required
 def update_existing_user(current_user, user_id: int):
     """
     Updates an existing user (admin only).
     """
-    db: Session = next(get_db())
+    db: Session = get_session()
     user = get_user_by_id(db, user_id)
     if not user:
         return jsonify({"message": "User not found"}), 404
@@ -110,12 +233,13 @@ def update_existing_user(current_user, user_id: int):
 
 
 @users_bp.route("/<int:user_id>", methods=["DELETE"])
+@query_budget(5)
 @admin_required
 def delete_existing_user(current_user, user_id: int):
     """
     Deletes a user (admin only).
     """
-    db: Session = next(get_db())
+    db: Session = get_session()
     try:
         if delete_user(db, user_id):
             return "", 204
@@ -12,7 +12,9 @@ from .meeting_room import (
     MeetingRoomBase,
     MeetingRoomCreate,
     MeetingRoomInDB,
-    MeetingRoomUpdate
+    MeetingRoomUpdate,
+    MeetingRoomAvailabilityQuery,
+    MeetingRoomOccupancyQuery
 )
 from .booking import (
     BookingBase,
@@ -20,3 +22,9 @@ from .booking import (
     BookingInDB,
     BookingUpdate
 )
+from .booking_series import (
+    BookingSeriesBase,
+    BookingSeriesCreate,
+    BookingSeriesInDB,
+    BookingSeriesUpdate
+)
@@ -0,0 +1,93 @@
+"""
+This module defines Pydantic schemas for the BookingSeries model.
+"""
+
+from pydantic import BaseModel, Field, validator
+from datetime import date, datetime
+from typing import Literal, Optional
+from app.schemas.booking import BookingBase, BookingInDB
+
+MAX_OCCURRENCES = 730
+# Largest interval per frequency, and how far after the first occurrence
+# the last one may start.
+MAX_INTERVAL = {"daily": 365, "weekly": 52, "monthly": 12}
+SERIES_HORIZON_DAYS = 5 * 366
+
+
+class BookingSeriesBase(BookingBase):
+    """
+    Base schema for BookingSeries.
+
+    ``start_time`` and ``end_time`` describe the first occurrence. The
+    series repeats every ``interval`` days, weeks or months until either
+    ``count`` occurrences were generated or ``until`` is reached, skipping
+    occurrences starting on any of the ``exceptions`` dates.
+    """
+    frequency: Literal["daily", "weekly", "monthly"]
+    interval: int = Field(1, gt=0)
+    count: Optional[int] = Field(None, gt=0, le=MAX_OCCURRENCES)
+    until: Optional[datetime] = None
+    exceptions: list[date] = []
+
+    @validator("interval")
+    def validate_interval(cls, value, values):
+        """
+        Validator to bound the interval of the frequency.
+        """
+        limit = MAX_INTERVAL.get(values.get("frequency"))
+        if limit is not None and value > limit:
+            raise ValueError(
+                f"interval must be at most {limit} for a "
+                f"{values['frequency']} series"
+            )
+        return value
+
+    @validator("until", always=True)
+    def validate_limit(cls, value, values):
+        """
+        Validator to ensure the series is bounded by count or until.
+        """
+        if value is None and values.get("count") is None:
+            raise ValueError("either count or until must be provided")
+        if value is not None and "start_time" in values and\
+                value.replace(tzinfo=None) <\
+                values["start_time"].replace(tzinfo=None):
+            raise ValueError("until must not be before start_time")
+        return value
+
+
+class BookingSeriesCreate(BookingSeriesBase):
+    """
+    Schema for creating a new BookingSeries.
+    """
+    user_id: int
+    room_id: int
+
+
+class BookingSeriesUpdate(BaseModel):
+    """
+    Schema for updating a BookingSeries. Only the provided fields change;
+    the occurrences that have not started yet are regenerated.
+    """
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    frequency: Optional[Literal["daily", "weekly", "monthly"]] = None
+    interval: Optional[int] = Field(
+        None, gt=0, le=max(MAX_INTERVAL.values())
+    )
+    count: Optional[int] = Field(None, gt=0, le=MAX_OCCURRENCES)
+    until: Optional[datetime] = None
+    exceptions: Optional[list[date]] = None
+
+
+class BookingSeriesInDB(BookingSeriesBase):
+    """
+    Schema for representing a BookingSeries retrieved from the database.
+    """
+    id: int
+    user_id: int
+    room_id: int
+    bookings: list[BookingInDB] = []
+
+    class Config:
+        from_attributes = True
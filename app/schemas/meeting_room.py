@@ -2,8 +2,12 @@
 This module defines Pydantic schemas for the MeetingRoom model.
 """
 
-from pydantic import BaseModel, constr, Field
-from typing import Optional
+from pydantic import BaseModel, constr, Field, validator
+from datetime import datetime, timedelta
+from typing import Literal, Optional
+
+MAX_OCCUPANCY_DAYS = 31
+MIN_GRANULARITY = 5
 
 
 class MeetingRoomBase(BaseModel):
@@ -39,3 +43,78 @@ class MeetingRoomInDB(MeetingRoomBase):
 
     class Config:
         from_attributes = True
+
+
+class MeetingRoomAvailabilityQuery(BaseModel):
+    """
+    Schema for searching meeting rooms free during a time slot.
+    """
+    start: datetime
+    end: datetime
+    min_capacity: int = Field(1, gt=0)
+
+    @validator("end")
+    def validate_end(cls, value, values):
+        """
+        Validator to ensure end is after start.
+        """
+        if "start" in values and value <= values["start"]:
+            raise ValueError("end must be greater than start")
+        return value
+
+
+class MeetingRoomOccupancyQuery(BaseModel):
+    """
+    Schema for requesting the occupancy bitmaps of all meeting rooms.
+    Granularity is given in minutes, e.g. ``15m``, ``1h`` or ``30``.
+    """
+    granularity: int = 15
+    start: datetime = Field(..., alias="from")
+    end: datetime = Field(..., alias="to")
+    encoding: Literal["base64", "rle"] = "base64"
+
+    @validator("granularity", pre=True)
+    def validate_granularity(cls, value):
+        """
+        Validator to parse the granularity and ensure it divides a day.
+        """
+        if isinstance(value, str):
+            text = value.strip().lower()
+            factor = 60 if text.endswith("h") else 1
+            try:
+                value = int(text.rstrip("mh")) * factor
+            except ValueError:
+                raise ValueError("granularity must look like 15m or 1h")
+        if value < MIN_GRANULARITY or (24 * 60) % value:
+            raise ValueError(
+                f"granularity must be at least {MIN_GRANULARITY} minutes "
+                "and divide a day"
+            )
+        return value
+
+    @validator("start", "end")
+    def validate_alignment(cls, value, values):
+        """
+        Validator to ensure both bounds fall on a cell boundary.
+        """
+        granularity = values.get("granularity")
+        if granularity and (
+            value.second or value.microsecond
+            or (value.hour * 60 + value.minute) % granularity
+        ):
+            raise ValueError("must be a multiple of the granularity")
+        return value
+
+    @validator("end")
+    def validate_end(cls, value, values):
+        """
+        Validator to ensure end is after start and within the allowed range.
+        """
+        if "start" in values:
+            if value <= values["start"]:
+                raise ValueError("to must be greater than from")
+            if value - values["start"] > timedelta(days=MAX_OCCUPANCY_DAYS):
+                raise ValueError(
+                    f"The range cannot exceed {MAX_OCCUPANCY_DAYS} days"
+                )
+        return value
@@ -7,25 +7,50 @@ from .user import (
     get_user_by_id,
     get_user_by_username,
     get_users,
+    has_users,
     create_user,
+    create_users_bulk,
     update_user,
+    update_password_hash,
     delete_user,
 )
 from .meeting_room import (
     get_room_by_id,
     get_room_by_name,
     get_rooms,
+    get_available_rooms,
+    lock_room,
+    lock_rooms,
     create_room,
     update_room,
     delete_room,
 )
 from .booking import (
     get_booking_by_id,
+    get_archived_booking,
     get_bookings_by_user_id,
     get_bookings_by_room_id,
     get_bookings,
+    iter_bookings,
     create_booking,
+    create_bookings_bulk,
     update_booking,
     cancel_booking,
     is_room_available,
+    ConcurrentWriteError,
+)
+from .booking_series import (
+    get_booking_series_by_id,
+    create_booking_series,
+    update_booking_series,
+    cancel_booking_series,
+)
+from .occupancy import (
+    get_rooms_occupancy,
+    encode_base64,
+    encode_rle,
+)
+from .archive import (
+    archive_bookings,
+    archive_cutoff,
 )
@@ -0,0 +1,150 @@
+"""
+This module contains the archival job that moves past bookings out of the
+bookings table.
+
+Bookings that ended more than ``ARCHIVE_RETENTION_DAYS`` ago can never
+conflict with a new booking, which must start in the future, so they are
+moved to the ``bookings_archive`` table in batches of
+``ARCHIVE_BATCH_SIZE``. This keeps the bookings table, its indexes and the
+conflict checks bounded by the retention window instead of by the age of
+the deployment. Reads whose time range reaches back past the retention
+window, or that ask for the whole history, also query the archive (see
+``needs_archive``).
+
+On MySQL the archive is range-partitioned by ``start_time`` month, with a
+partition added for every month the job archives. The bookings table
+itself is not partitioned: MySQL does not allow foreign keys on
+partitioned tables, and archiving already bounds its size.
+"""
+
+import os
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.orm import Session
+from app.models.booking import Booking
+from app.models.booking_archive import BookingArchive
+from app.services.change_versions import bump_versions, user_bookings_key
+
+ARCHIVE_RETENTION_DAYS = int(os.environ.get("ARCHIVE_RETENTION_DAYS", 365))
+ARCHIVE_BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", 1000))
+
+ARCHIVE_COLUMNS = ("id", "user_id", "room_id", "start_time", "end_time",
+                   "series_id")
+FUTURE_PARTITION = "p_future"
+
+
+def archive_cutoff() -> datetime:
+    """
+    Returns the stored (naive UTC) time before which bookings may have
+    been archived.
+    """
+    return (
+        datetime.now(timezone.utc) - timedelta(days=ARCHIVE_RETENTION_DAYS)
+    ).replace(tzinfo=None)
+
+
+def needs_archive(
+    start_time: datetime | None, history: bool = False
+) -> bool:
+    """
+    Tells whether a read of bookings starting at or after ``start_time``
+    has to query the archive. Without a lower bound, only reads of the
+    whole ``history`` do; the others are answered by the bookings table.
+    """
+    if start_time is None:
+        return history
+    return start_time.replace(tzinfo=None) < archive_cutoff()
+
+
+def archive_bookings(
+    db: Session,
+    before: datetime | None = None,
+    batch_size: int = ARCHIVE_BATCH_SIZE
+) -> int:
+    """
+    Moves the bookings that ended before ``before`` (by default, the
+    retention cutoff) to the archive, oldest first, in transactions of
+    ``batch_size`` bookings. Returns the number of bookings moved.
+
+    Each batch bumps the booking change versions of its users, so the
+    ETags of their default (current) booking lists change with it.
+    """
+    cutoff = archive_cutoff()
+    if before is not None:
+        before = before.replace(tzinfo=None)
+        if before > cutoff:
+            raise ValueError(
+                f"Cannot archive bookings newer than the retention window "
+                f"of {ARCHIVE_RETENTION_DAYS} days"
+            )
+        cutoff = before
+    columns = [getattr(Booking, name) for name in ARCHIVE_COLUMNS]
+    moved = 0
+    while True:
+        rows = db.query(
+            Booking.id, Booking.start_time, Booking.user_id
+        ).filter(
+            Booking.start_time < cutoff, Booking.end_time <= cutoff
+        ).order_by(Booking.start_time, Booking.id).limit(batch_size).all()
+        if not rows:
+            return moved
+        if db.get_bind().dialect.name == "mysql":
+            _add_partitions(db, {start.date() for _, start, _ in rows})
+        ids = [booking_id for booking_id, _, _ in rows]
+        db.execute(insert(BookingArchive).from_select(
+            ARCHIVE_COLUMNS, select(*columns).where(Booking.id.in_(ids))
+        ))
+        db.execute(delete(Booking).where(Booking.id.in_(ids)))
+        bump_versions(db, {user_bookings_key(user_id) for *_, user_id in rows})
+        db.commit()
+        moved += len(ids)
+
+
+def _month_bound(day: date) -> str:
+    """
+    Returns the first day of the month after ``day``.
+    """
+    next_month = (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return next_month.isoformat()
+
+
+def _add_partitions(db: Session, days: set[date]):
+    """
+    Makes sure the MySQL archive has a partition for the months of
+    ``days``, partitioning the table on first use. Months before the last
+    partition bound already fall into an existing partition, so only later
+    months are added.
+    """
+    table = BookingArchive.__tablename__
+    existing = [
+        bound for bound, in db.execute(text(
+            "SELECT PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table "
+            "AND PARTITION_NAME IS NOT NULL"
+        ), {"table": table})
+    ]
+    if not existing:
+        db.execute(text(
+            f"ALTER TABLE {table} PARTITION BY RANGE COLUMNS(start_time) "
+            f"(PARTITION {FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE))"
+        ))
+    last = max(
+        (bound.strip("'")[:10] for bound in existing if bound != "MAXVALUE"),
+        default="",
+    )
+    months = {
+        _month_bound(day): f"p{day:%Y%m}" for day in days
+        if _month_bound(day) > last
+    }
+    if not months:
+        return
+    partitions = ", ".join(
+        f"PARTITION {months[bound]} VALUES LESS THAN ('{bound}')"
+        for bound in sorted(months)
+    )
+    db.execute(text(
+        f"ALTER TABLE {table} REORGANIZE PARTITION {FUTURE_PARTITION} INTO "
+        f"({partitions}, PARTITION {FUTURE_PARTITION} "
+        f"VALUES LESS THAN (MAXVALUE))"
+    ))
@@ -0,0 +1,277 @@
+"""
+This module contains an optional in-process availability index.
+
+The index keeps, per meeting room, the upcoming bookings as a sorted list
+of non-overlapping intervals so conflict checks can be answered with a
+binary search instead of a database round trip. Each room entry is tagged
+with the room's ``booking_version`` and is only trusted while that version
+matches the one read from the database, so several workers never act on
+stale data. The database stays the final authority: writers bump the
+version with a conditional update at commit time.
+
+Enable it with ``AVAILABILITY_INDEX_ENABLED=true``.
+"""
+
+import os
+import threading
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.models.booking import Booking
+from app.models.meeting_room import MeetingRoom
+
+AVAILABILITY_INDEX_ENABLED = os.environ.get(
+    "AVAILABILITY_INDEX_ENABLED", "false"
+).lower() in ("1", "true", "yes")
+
+HISTORY_MARGIN = timedelta(days=1)
+
+
+def as_stored(value: datetime) -> datetime:
+    """
+    Returns a datetime the way the DateTime column stores it: the wall
+    clock value without timezone information.
+    """
+    return value.replace(tzinfo=None)
+
+
+class RoomIntervals:
+    """
+    Bookings of a single room at a given version, sorted by start time.
+
+    Only bookings ending after ``horizon`` are kept; queries starting
+    before it cannot be answered and fall back to the database.
+
+    Bookings are kept in three parallel sorted lists rather than a balanced
+    tree. Lookups are O(log n). An insert or removal finds its position in
+    O(log n) too, but then shifts the tail of each list, which is O(n)
+    pointer moves done by a single ``memmove``. Here n is the number of
+    upcoming bookings of one room, typically hundreds. At that size the
+    shift costs less than rebalancing a tree written in pure Python, and no
+    extra dependency is needed.
+    """
+    __slots__ = (
+        "version", "horizon", "starts", "ends", "ids", "disjoint",
+        "_start_of",
+    )
+
+    def __init__(self, version: int, horizon: datetime):
+        self.version = version
+        self.horizon = horizon
+        self.starts: list[datetime] = []
+        self.ends: list[datetime] = []
+        self.ids: list[int] = []
+        self.disjoint = True
+        self._start_of: dict[int, datetime] = {}
+
+    def overlaps(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        exclude_booking_id: int | None = None
+    ) -> bool:
+        """
+        Checks whether any kept booking overlaps the given time slot.
+
+        When intervals do not overlap each other their end times are sorted
+        as well and only the bookings right before the insertion point of
+        ``end_time`` can reach past ``start_time``. Otherwise every booking
+        starting before ``end_time`` has to be looked at.
+        """
+        position = bisect_left(self.starts, end_time) - 1
+        if not self.disjoint:
+            return any(
+                self.ends[i] > start_time
+                and self.ids[i] != exclude_booking_id
+                for i in range(position + 1)
+            )
+        while position >= 0 and self.ends[position] > start_time:
+            if self.ids[position] != exclude_booking_id:
+                return True
+            position -= 1
+        return False
+
+    def add(self, booking_id: int, start_time: datetime, end_time: datetime):
+        """
+        Inserts a booking that is known not to overlap any other one.
+        """
+        if end_time <= self.horizon:
+            return
+        position = bisect_left(self.starts, start_time)
+        self.starts.insert(position, start_time)
+        self.ends.insert(position, end_time)
+        self.ids.insert(position, booking_id)
+        self._start_of[booking_id] = start_time
+
+    def remove(self, booking_id: int):
+        """
+        Removes a booking if it is kept, finding it by its start time.
+        """
+        start_time = self._start_of.pop(booking_id, None)
+        if start_time is None:
+            return
+        position = bisect_left(self.starts, start_time)
+        while self.ids[position] != booking_id:
+            position += 1
+        del self.starts[position]
+        del self.ends[position]
+        del self.ids[position]
+
+    def append(
+        self, booking_id: int, start_time: datetime, end_time: datetime
+    ):
+        """
+        Appends a booking loaded in start time order.
+        """
+        if self.ids and start_time < self.ends[-1]:
+            self.disjoint = False
+        self.starts.append(start_time)
+        self.ends.append(end_time)
+        self.ids.append(booking_id)
+        self._start_of[booking_id] = start_time
+
+
+def load_schedules(
+    db: Session,
+    room_ids,
+    window_start: datetime,
+    window_end: datetime,
+    exclude_series_id: int | None = None
+) -> dict[int, RoomIntervals]:
+    """
+    Loads the bookings of several rooms overlapping a time window with a
+    single range query, for checking many candidate slots at once.
+    """
+    schedules = {
+        room_id: RoomIntervals(0, datetime.min) for room_id in room_ids
+    }
+    query = (
+        db.query(
+            Booking.id, Booking.room_id, Booking.start_time, Booking.end_time
+        )
+        .filter(
+            Booking.room_id.in_(schedules),
+            Booking.start_time < as_stored(window_end),
+            Booking.end_time > as_stored(window_start),
+        )
+    )
+    if exclude_series_id is not None:
+        query = query.filter(or_(
+            Booking.series_id.is_(None),
+            Booking.series_id != exclude_series_id,
+        ))
+    for booking_id, room_id, start_time, end_time in query.order_by(
+        Booking.room_id, Booking.start_time
+    ):
+        schedules[room_id].append(booking_id, start_time, end_time)
+    return schedules
+
+
+class AvailabilityIndex:
+    """
+    Per-room interval lists, loaded lazily and validated by room version.
+    """
+
+    def __init__(self, enabled: bool = AVAILABILITY_INDEX_ENABLED):
+        self.enabled = enabled
+        self._rooms: dict[int, RoomIntervals] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, db: Session, room: MeetingRoom) -> RoomIntervals | None:
+        """
+        Loads the upcoming bookings of a room from the database.
+        """
+        horizon = as_stored(datetime.now(timezone.utc)) - HISTORY_MARGIN
+        entry = RoomIntervals(room.booking_version, horizon)
+        rows = (
+            db.query(Booking.id, Booking.start_time, Booking.end_time)
+            .filter(Booking.room_id == room.id, Booking.end_time > horizon)
+            .order_by(Booking.start_time)
+            .all()
+        )
+        for booking_id, start_time, end_time in rows:
+            entry.append(booking_id, start_time, end_time)
+        if not entry.disjoint:
+            return None
+        return entry
+
+    def is_free(
+        self,
+        db: Session,
+        room: MeetingRoom,
+        start_time: datetime,
+        end_time: datetime,
+        exclude_booking_id: int | None = None
+    ) -> bool | None:
+        """
+        Answers a conflict check from memory.
+
+        ``room`` must have been read in the current transaction so its
+        ``booking_version`` is the one the caller will commit against.
+        Returns None when the index cannot answer and the database has to.
+        """
+        if not self.enabled:
+            return None
+        start_time, end_time = as_stored(start_time), as_stored(end_time)
+        with self._lock:
+            entry = self._rooms.get(room.id)
+        if entry is None or entry.version != room.booking_version:
+            entry = self._load(db, room)
+            if entry is None:
+                return None
+            with self._lock:
+                self._rooms[room.id] = entry
+        if start_time < entry.horizon:
+            return None
+        with self._lock:
+            return not entry.overlaps(start_time, end_time, exclude_booking_id)
+
+    def record(
+        self,
+        room_id: int,
+        version: int,
+        booking_id: int,
+        start_time: datetime | None = None,
+        end_time: datetime | None = None
+    ):
+        """
+        Applies a committed write that moved the room from ``version - 1``
+        to ``version``. The booking is removed and, when times are given,
+        re-inserted. Entries at any other version are dropped.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            entry = self._rooms.get(room_id)
+            if entry is None:
+                return
+            if entry.version != version - 1:
+                del self._rooms[room_id]
+                return
+            entry.remove(booking_id)
+            if start_time is not None and end_time is not None:
+                entry.add(
+                    booking_id, as_stored(start_time), as_stored(end_time)
+                )
+            entry.version = version
+
+    def invalidate(self, room_ids):
+        """
+        Drops the given rooms so they are reloaded on the next check.
+        """
+        with self._lock:
+            for room_id in room_ids:
+                self._rooms.pop(room_id, None)
+
+    def clear(self):
+        """
+        Drops every cached room.
+        """
+        with self._lock:
+            self._rooms.clear()
+
+
+availability_index = AvailabilityIndex()
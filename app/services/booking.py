@@ -2,59 +2,311 @@
 This module contains service functions for booking management.
 """
 
-from sqlalchemy.orm import Session
+import heapq
+from itertools import islice
+from operator import attrgetter
+
+from sqlalchemy import and_, insert, or_, tuple_, update
+from sqlalchemy.orm import Session, selectinload
 from app.models.booking import Booking
+from app.models.booking_archive import BookingArchive
+from app.models.booking_series import BookingSeries
+from app.models.meeting_room import MeetingRoom
+from app.models.user import User
 from app.schemas.booking import BookingCreate, BookingUpdate
 from app.services.user import get_user_by_id
-from app.services.meeting_room import get_room_by_id
-from sqlalchemy import and_, or_
+from app.services.meeting_room import lock_room, lock_rooms
+from app.services.archive import needs_archive
+from app.services.change_versions import bump_versions, user_bookings_key
+from app.services.availability import (
+    availability_index,
+    as_stored,
+    load_schedules,
+)
 from datetime import datetime, timezone
 
+ROOM_WRITE_RETRIES = 3
+
+
+class ConcurrentWriteError(ValueError):
+    """
+    Raised when the bookings of a room kept changing under a write for
+    ``ROOM_WRITE_RETRIES`` attempts. The request can be retried as is.
+    """
+
+
+def get_booking_by_id(
+    db: Session, booking_id: int, include: tuple[str, ...] = ()
+) -> Booking | None:
+    """
+    Retrieves a booking by its ID, eagerly loading the relationships named
+    in ``include`` (``room``, ``user``).
+    """
+    return db.query(Booking).options(
+        *_eager_loads(Booking, include)
+    ).filter(Booking.id == booking_id).first()
+
+
+def get_archived_booking(
+    db: Session, booking_id: int, include: tuple[str, ...] = ()
+) -> BookingArchive | None:
+    """
+    Retrieves a booking moved to the archive by its ID.
+    """
+    return db.query(BookingArchive).options(
+        *_eager_loads(BookingArchive, include)
+    ).filter(BookingArchive.id == booking_id).first()
+
 
-def get_booking_by_id(db: Session, booking_id: int) -> Booking | None:
+def _eager_loads(model, include: tuple[str, ...]) -> list:
     """
-    Retrieves a booking by its ID.
+    Returns the loader options fetching the relationships named in
+    ``include`` with one extra query each, whatever the number of rows.
     """
-    return db.query(Booking).filter(Booking.id == booking_id).first()
+    return [selectinload(getattr(model, name)) for name in include]
 
 
 def get_bookings_by_user_id(
-    db: Session, user_id: int, skip: int = 0, limit: int = 100
+    db: Session,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    after: tuple[datetime, int] | None = None,
+    fields: tuple[str, ...] | None = None,
+    start_time: datetime | None = None,
+    end_time: datetime | None = None,
+    include: tuple[str, ...] = (),
+    history: bool = False
 ) -> list[Booking]:
     """
     Retrieves a list of bookings for a specific user.
     """
-    return (
-        db.query(Booking)
-        .filter(Booking.user_id == user_id)
-        .offset(skip)
-        .limit(limit)
-        .all()
+    return _page(
+        db, lambda model: [model.user_id == user_id],
+        skip, limit, after, fields, start_time, end_time, include, history
     )
 
 
 def get_bookings_by_room_id(
-    db: Session, room_id: int, skip: int = 0, limit: int = 100
+    db: Session,
+    room_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    after: tuple[datetime, int] | None = None,
+    fields: tuple[str, ...] | None = None,
+    start_time: datetime | None = None,
+    end_time: datetime | None = None,
+    include: tuple[str, ...] = (),
+    history: bool = False
 ) -> list[Booking]:
     """
     Retrieves a list of bookings for a specific meeting room.
     """
-    return (
-        db.query(Booking)
-        .filter(Booking.room_id == room_id)
-        .offset(skip)
-        .limit(limit)
-        .all()
+    return _page(
+        db, lambda model: [model.room_id == room_id],
+        skip, limit, after, fields, start_time, end_time, include, history
     )
 
 
 def get_bookings(
-        db: Session, skip: int = 0, limit: int = 100
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        after: tuple[datetime, int] | None = None,
+        fields: tuple[str, ...] | None = None,
+        start_time: datetime | None = None,
+        end_time: datetime | None = None,
+        include: tuple[str, ...] = (),
+        history: bool = False
 ) -> list[Booking]:
     """
     Retrieves a list of all bookings.
     """
-    return db.query(Booking).offset(skip).limit(limit).all()
+    return _page(
+        db, lambda model: [], skip, limit, after, fields, start_time,
+        end_time, include, history
+    )
+
+
+def _booking_query(
+    db: Session,
+    model,
+    criteria,
+    after: tuple | None,
+    fields: tuple[str, ...] | None,
+    start_time: datetime | None,
+    end_time: datetime | None,
+    include: tuple[str, ...] = ()
+):
+    """
+    Builds a query of ``model`` (Booking or BookingArchive) matching
+    ``criteria(model)`` and starting in [``start_time``, ``end_time``),
+    ordered by (start_time, id) and seeking past ``after`` when given.
+    """
+    query = db.query(model).filter(*criteria(model))
+    if include:
+        query = query.options(*_eager_loads(model, include))
+    if fields is not None:
+        query = query.with_entities(
+            *(getattr(model, field) for field in fields)
+        )
+    if start_time is not None:
+        query = query.filter(model.start_time >= start_time)
+    if end_time is not None:
+        query = query.filter(model.start_time < end_time)
+    query = query.order_by(model.start_time, model.id)
+    if after is not None:
+        after_start, after_id = after
+        query = query.filter(or_(
+            model.start_time > after_start,
+            and_(model.start_time == after_start, model.id > after_id),
+        ))
+    return query
+
+
+def _page(
+    db: Session,
+    criteria,
+    skip: int,
+    limit: int,
+    after: tuple | None,
+    fields: tuple[str, ...] | None = None,
+    start_time: datetime | None = None,
+    end_time: datetime | None = None,
+    include: tuple[str, ...] = (),
+    history: bool = False
+):
+    """
+    Returns a page of the bookings matching ``criteria(model)`` ordered by
+    (start_time, id), with either offset pagination or, when ``after``
+    holds the key of the last booking of the previous page, keyset
+    pagination that seeks directly past it.
+
+    When ``fields`` is given only those columns are selected and rows are
+    returned instead of ORM objects. Otherwise the relationships named in
+    ``include`` are eagerly loaded.
+
+    The archive is only queried when the time range reaches back past the
+    retention window, or when there is no lower bound and the whole
+    ``history`` is requested; its page is then merged with the one of the
+    bookings table, each table returning at most ``skip + limit`` rows.
+    """
+    query = _booking_query(
+        db, Booking, criteria, after, fields, start_time, end_time, include
+    )
+    if not needs_archive(start_time, history):
+        if after is None:
+            query = query.offset(skip)
+        return query.limit(limit).all()
+    archive_query = _booking_query(
+        db, BookingArchive, criteria, after, fields, start_time, end_time,
+        include
+    )
+    if fields is not None:
+        keys = [key for key in ("start_time", "id") if key not in fields]
+        query = query.add_columns(*(getattr(Booking, key) for key in keys))
+        archive_query = archive_query.add_columns(
+            *(getattr(BookingArchive, key) for key in keys)
+        )
+    if after is not None:
+        skip = 0
+    merged = heapq.merge(
+        archive_query.limit(skip + limit).all(),
+        query.limit(skip + limit).all(),
+        key=attrgetter("start_time", "id"),
+    )
+    return list(islice(merged, skip, skip + limit))
+
+
+def iter_bookings(
+    db: Session,
+    fields: tuple[str, ...],
+    start_time: datetime | None = None,
+    end_time: datetime | None = None,
+    room_id: int | None = None,
+    user_id: int | None = None,
+    batch_size: int = 1000,
+    history: bool = False
+):
+    """
+    Yields the requested columns of bookings starting in
+    [``start_time``, ``end_time``), optionally for one room or user, as
+    plain row tuples ordered by (start_time, id) without building ORM
+    objects.
+
+    Rows are streamed through a server-side cursor (``yield_per``) when the
+    driver supports one. Otherwise they are read in keyset batches, so
+    memory stays bounded by ``batch_size`` either way. When the range
+    reaches back past the retention window, or there is no lower bound
+    and the whole ``history`` is requested, the bookings table and the
+    archive are both read in keyset batches and merged.
+    """
+    def criteria(model):
+        conditions = []
+        if room_id is not None:
+            conditions.append(model.room_id == room_id)
+        if user_id is not None:
+            conditions.append(model.user_id == user_id)
+        return conditions
+
+    width = len(fields)
+    if not needs_archive(start_time, history):
+        rows = _iter_rows(
+            db, Booking, criteria, fields, start_time, end_time, batch_size,
+            db.get_bind().dialect.supports_server_side_cursors
+        )
+    else:
+        rows = heapq.merge(
+            *(
+                _iter_rows(
+                    db, model, criteria, fields, start_time, end_time,
+                    batch_size, False
+                )
+                for model in (BookingArchive, Booking)
+            ),
+            key=lambda row: row[width:],
+        )
+    for row in rows:
+        yield tuple(row[:width])
+
+
+def _iter_rows(
+    db: Session,
+    model,
+    criteria,
+    fields: tuple[str, ...],
+    start_time: datetime | None,
+    end_time: datetime | None,
+    batch_size: int,
+    server_side: bool
+):
+    """
+    Yields the ``fields`` of the matching rows of ``model`` followed by
+    their (start_time, id) sort key, through a server-side cursor or in
+    keyset batches.
+    """
+    query = _booking_query(
+        db, model, criteria, None, None, start_time, end_time
+    ).with_entities(
+        *(getattr(model, field) for field in fields),
+        model.start_time, model.id,
+    )
+    width = len(fields)
+    if server_side:
+        yield from query.yield_per(batch_size)
+        return
+
+    batch = query
+    while True:
+        rows = batch.limit(batch_size).all()
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        last_start, last_id = rows[-1][width:]
+        batch = query.filter(or_(
+            model.start_time > last_start,
+            and_(model.start_time == last_start, model.id > last_id),
+        ))
 
 
 def create_booking(db: Session, booking: BookingCreate) -> Booking:
@@ -63,24 +315,187 @@ def create_booking(db: Session, booking: BookingCreate) -> Booking:
     """
     if get_user_by_id(db, booking.user_id) is None:
         raise ValueError(f"User with id {booking.user_id} does not exist")
-    if get_room_by_id(db, booking.room_id) is None:
-        raise ValueError(f"Room with id {booking.room_id} does not exist")
     if booking.start_time.tzinfo is None:
         booking.start_time = booking.start_time.replace(tzinfo=timezone.utc)
     if booking.start_time < datetime.now(timezone.utc):
         raise ValueError("Cannot create a booking in the past")
-    if not is_room_available(
-        db, booking.room_id, booking.start_time, booking.end_time
-    ):
-        raise ValueError(
-            f"Room with id {
-                booking.room_id} is not available during the specified time"
+    for _ in range(ROOM_WRITE_RETRIES):
+        # End the reads so far: the lock starts a new transaction.
+        db.commit()
+        room = lock_room(db, booking.room_id)
+        if room is None:
+            db.rollback()
+            raise ValueError(f"Room with id {booking.room_id} does not exist")
+        if not _is_room_free(db, room, booking.start_time, booking.end_time):
+            db.rollback()
+            raise ValueError(
+                f"Room with id {booking.room_id} "
+                "is not available during the specified time"
+            )
+        db_booking = Booking(**booking.model_dump())
+        db.add(db_booking)
+        version = commit_room_write(db, room, [booking.user_id])
+        if version is not None:
+            db.refresh(db_booking)
+            availability_index.record(
+                room.id, version, db_booking.id,
+                db_booking.start_time, db_booking.end_time
+            )
+            return db_booking
+    raise ConcurrentWriteError(
+        f"Room with id {booking.room_id} is being booked concurrently, "
+        "please retry"
+    )
+
+
+def create_bookings_bulk(
+    db: Session, bookings: list[BookingCreate]
+) -> list[dict]:
+    """
+    Creates many bookings in a single transaction.
+
+    Users and rooms are validated with one IN query each and the existing
+    bookings of all involved rooms are fetched with one range query. Every
+    item is then checked against those and against the items accepted
+    before it in the batch, and the accepted ones are inserted with one
+    bulk statement. Returns one result per item, in order, with a
+    ``status`` of ``created`` (and the ``booking``), or ``invalid`` or
+    ``conflict`` (and a ``message``).
+    """
+    for booking in bookings:
+        if booking.start_time.tzinfo is None:
+            booking.start_time = booking.start_time.replace(
+                tzinfo=timezone.utc
+            )
+    user_ids = {booking.user_id for booking in bookings}
+    room_ids = {booking.room_id for booking in bookings}
+    known_users = {
+        user_id for user_id, in
+        db.query(User.id).filter(User.id.in_(user_ids))
+    }
+    for _ in range(ROOM_WRITE_RETRIES):
+        # End the reads so far: the lock starts a new transaction.
+        db.commit()
+        rooms = lock_rooms(db, room_ids)
+        results = _plan_bulk_bookings(db, bookings, known_users, rooms)
+        accepted = [
+            index for index, result in enumerate(results)
+            if result["status"] == "created"
+        ]
+        if not accepted:
+            db.rollback()
+            return results
+        rows = [bookings[index].model_dump() for index in accepted]
+        booking_ids = _insert_bookings(db, rows)
+        touched = {bookings[index].room_id for index in accepted}
+        result = db.execute(
+            update(MeetingRoom)
+            .where(tuple_(MeetingRoom.id, MeetingRoom.booking_version).in_(
+                [(room_id, rooms[room_id].booking_version)
+                 for room_id in touched]
+            ))
+            .values(booking_version=MeetingRoom.booking_version + 1),
+            execution_options={"synchronize_session": False},
         )
-    db_booking = Booking(**booking.model_dump())
-    db.add(db_booking)
-    db.commit()
-    db.refresh(db_booking)
-    return db_booking
+        if result.rowcount != len(touched):
+            db.rollback()
+            continue
+        bump_versions(db, {
+            user_bookings_key(row["user_id"]) for row in rows
+        })
+        db.commit()
+        availability_index.invalidate(touched)
+        for index, row, booking_id in zip(accepted, rows, booking_ids):
+            results[index]["booking"] = Booking(
+                id=booking_id,
+                user_id=row["user_id"],
+                room_id=row["room_id"],
+                start_time=as_stored(row["start_time"]),
+                end_time=as_stored(row["end_time"]),
+            )
+        return results
+    raise ConcurrentWriteError(
+        "Rooms are being booked concurrently, please retry"
+    )
+
+
+def _plan_bulk_bookings(
+    db: Session,
+    bookings: list[BookingCreate],
+    known_users: set[int],
+    rooms: dict[int, MeetingRoom]
+) -> list[dict]:
+    """
+    Decides which items of a bulk request can be created, without writing.
+    """
+    now = datetime.now(timezone.utc)
+    results = []
+    for booking in bookings:
+        if booking.user_id not in known_users:
+            message = f"User with id {booking.user_id} does not exist"
+        elif booking.room_id not in rooms:
+            message = f"Room with id {booking.room_id} does not exist"
+        elif booking.start_time < now:
+            message = "Cannot create a booking in the past"
+        else:
+            message = None
+        results.append(
+            {"status": "invalid", "message": message} if message
+            else {"status": "created"}
+        )
+    candidates = [
+        booking for booking, result in zip(bookings, results)
+        if result["status"] == "created"
+    ]
+    if not candidates:
+        return results
+
+    schedules = load_schedules(
+        db,
+        {booking.room_id for booking in candidates},
+        min(as_stored(booking.start_time) for booking in candidates),
+        max(as_stored(booking.end_time) for booking in candidates),
+    )
+    for booking, result in zip(bookings, results):
+        if result["status"] != "created":
+            continue
+        schedule = schedules[booking.room_id]
+        start_time = as_stored(booking.start_time)
+        end_time = as_stored(booking.end_time)
+        if schedule.overlaps(start_time, end_time):
+            result.update(
+                status="conflict",
+                message=f"Room with id {booking.room_id} "
+                        "is not available during the specified time",
+            )
+        else:
+            schedule.add(0, start_time, end_time)
+    return results
+
+
+def _insert_bookings(db: Session, rows: list[dict]) -> list[int]:
+    """
+    Inserts booking rows with one executemany statement and returns their
+    ids in order. Rows are matched to their ids by (room_id, start_time),
+    which is unique among the non-overlapping bookings of a room, so
+    RETURNING does not need to preserve the parameter order (SQLite can
+    only guarantee it by inserting rows one at a time). Dialects without
+    RETURNING for executemany (MySQL) look the ids up afterwards.
+    """
+    keys = [(row["room_id"], as_stored(row["start_time"])) for row in rows]
+    columns = (Booking.id, Booking.room_id, Booking.start_time)
+    if db.get_bind().dialect.insert_executemany_returning:
+        inserted = db.execute(insert(Booking).returning(*columns), rows)
+    else:
+        db.execute(insert(Booking), rows)
+        inserted = db.query(*columns).filter(
+            tuple_(Booking.room_id, Booking.start_time).in_(keys)
+        )
+    found = {
+        (room_id, start_time): booking_id
+        for booking_id, room_id, start_time in inserted
+    }
+    return [found[key] for key in keys]
 
 
 def update_booking(
@@ -89,38 +504,130 @@ def update_booking(
     """
     Updates an existing booking.
     """
-    db_booking = get_booking_by_id(db, booking_id)
-    if not db_booking:
-        return None
     update_data = booking.model_dump(exclude_unset=True)
-    new_start = update_data.get("start_time", db_booking.start_time)
-    new_end = update_data.get("end_time", db_booking.end_time)
-    if not is_room_available(
-        db,
-        db_booking.room_id,
-        new_start,
-        new_end,
-        exclude_booking_id=db_booking.id
-    ):
-        raise ValueError("Room is not available during the specified time")
-
-    for key, value in update_data.items():
-        setattr(db_booking, key, value)
-    db.commit()
-    db.refresh(db_booking)
-    return db_booking
+    for _ in range(ROOM_WRITE_RETRIES):
+        # The caller usually loaded the booking already; only its room ID is
+        # needed before the lock, so reuse it from the identity map.
+        db_booking = db.get(Booking, booking_id)
+        if not db_booking:
+            return None
+        room_id = db_booking.room_id
+        # End the reads so far: the lock starts a new transaction.
+        db.commit()
+        room = lock_room(db, room_id)
+        db_booking = get_booking_by_id(db, booking_id)
+        if not db_booking:
+            db.rollback()
+            return None
+        new_start = update_data.get("start_time", db_booking.start_time)
+        new_end = update_data.get("end_time", db_booking.end_time)
+        if not _is_room_free(
+            db, room, new_start, new_end, exclude_booking_id=db_booking.id
+        ):
+            db.rollback()
+            raise ValueError("Room is not available during the specified time")
+
+        for key, value in update_data.items():
+            setattr(db_booking, key, value)
+        version = commit_room_write(db, room, [db_booking.user_id])
+        if version is not None:
+            db.refresh(db_booking)
+            availability_index.record(
+                room.id, version, db_booking.id,
+                db_booking.start_time, db_booking.end_time
+            )
+            return db_booking
+    raise ConcurrentWriteError(
+        "Room is being booked concurrently, please retry"
+    )
 
 
 def cancel_booking(db: Session, booking_id: int) -> bool:
     """
     Cancels a booking.
     """
-    db_booking = get_booking_by_id(db, booking_id)
-    if not db_booking:
-        return False
-    db.delete(db_booking)
+    for _ in range(ROOM_WRITE_RETRIES):
+        db_booking = db.get(Booking, booking_id)
+        if not db_booking:
+            return False
+        room_id = db_booking.room_id
+        # End the reads so far: the lock starts a new transaction.
+        db.commit()
+        room = lock_room(db, room_id)
+        db_booking = get_booking_by_id(db, booking_id)
+        if not db_booking:
+            db.rollback()
+            return False
+        if db_booking.series_id is not None:
+            _skip_series_occurrence(db, db_booking)
+        db.delete(db_booking)
+        version = commit_room_write(db, room, [db_booking.user_id])
+        if version is not None:
+            availability_index.record(room.id, version, booking_id)
+            return True
+    raise ConcurrentWriteError(
+        "Room is being booked concurrently, please retry"
+    )
+
+
+def _skip_series_occurrence(db: Session, db_booking: Booking):
+    """
+    Adds the day of a cancelled occurrence to its series' exceptions, so
+    the occurrence is not generated again when the series is edited.
+    """
+    series = db.get(BookingSeries, db_booking.series_id)
+    day = db_booking.start_time.date().isoformat()
+    if day not in series.exceptions:
+        series.exceptions = [*series.exceptions, day]
+
+
+def _is_room_free(
+    db: Session,
+    room: MeetingRoom,
+    start_time: datetime,
+    end_time: datetime,
+    exclude_booking_id: int = None
+) -> bool:
+    """
+    Checks availability from the in-process index when it can answer for
+    the room's current version, and from the database otherwise.
+    """
+    free = availability_index.is_free(
+        db, room, start_time, end_time, exclude_booking_id
+    )
+    if free is None:
+        free = is_room_available(
+            db, room.id, start_time, end_time, exclude_booking_id
+        )
+    return free
+
+
+def commit_room_write(
+    db: Session, room: MeetingRoom, user_ids=()
+) -> int | None:
+    """
+    Commits pending booking changes of a room together with a bump of its
+    ``booking_version``. The bump only applies if the version is still the
+    one the availability check was made against; otherwise another writer
+    got there first, the transaction is rolled back and None is returned.
+    The booking change versions of ``user_ids`` are bumped in the same
+    transaction.
+    """
+    expected = room.booking_version
+    result = db.execute(
+        update(MeetingRoom)
+        .where(
+            MeetingRoom.id == room.id,
+            MeetingRoom.booking_version == expected
+        )
+        .values(booking_version=expected + 1)
+    )
+    if result.rowcount != 1:
+        db.rollback()
+        return None
+    bump_versions(db, map(user_bookings_key, user_ids))
     db.commit()
-    return True
+    return expected + 1
 
 
 def is_room_available(
@@ -133,21 +640,18 @@ def is_room_available(
     """
     Checks if a room is available during a given time slot,
     excluding a specific booking.
+
+    Two intervals overlap exactly when each one starts before the other
+    ends, so a single range predicate is enough. The check is answered by
+    an EXISTS probe on the (room_id, end_time, start_time) index: the range
+    scan starts at ``start_time`` and only walks bookings that end after
+    it, so past history is never touched.
     """
-    query = db.query(Booking).filter(
-        and_(
-            Booking.room_id == room_id,
-            or_(
-                and_(Booking.start_time < end_time,
-                     Booking.end_time > start_time),
-                and_(Booking.start_time >= start_time,
-                     Booking.start_time < end_time),
-                and_(Booking.end_time > start_time,
-                     Booking.end_time <= end_time)
-            )
-        )
+    query = db.query(Booking.id).filter(
+        Booking.room_id == room_id,
+        Booking.start_time < end_time,
+        Booking.end_time > start_time,
     )
     if exclude_booking_id:
         query = query.filter(Booking.id != exclude_booking_id)
-    overlapping_bookings = query.all()
-    return not overlapping_bookings
+    return not db.query(query.limit(1).exists()).scalar()
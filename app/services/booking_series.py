@@ -0,0 +1,330 @@
+"""
+This module contains service functions for recurring booking management.
+"""
+
+from sqlalchemy import exists, insert, or_
+from sqlalchemy.orm import Session, selectinload
+from app.models.booking import Booking
+from app.models.booking_archive import BookingArchive
+from app.models.booking_series import BookingSeries
+from app.schemas.booking_series import (
+    BookingSeriesBase,
+    BookingSeriesCreate,
+    BookingSeriesUpdate,
+    MAX_OCCURRENCES,
+    SERIES_HORIZON_DAYS,
+)
+from app.services.user import get_user_by_id
+from app.services.meeting_room import lock_room
+from app.services.booking import (
+    ConcurrentWriteError,
+    commit_room_write,
+    ROOM_WRITE_RETRIES,
+)
+from app.services.availability import (
+    availability_index,
+    as_stored,
+    load_schedules,
+)
+from datetime import MAXYEAR, datetime, timedelta, timezone
+
+SERIES_FIELDS = (
+    "start_time", "end_time", "frequency", "interval", "count", "until",
+)
+
+
+def _add_months(value: datetime, months: int) -> datetime | None:
+    """
+    Shifts a datetime by whole months, or returns None when the day does
+    not exist in the target month (e.g. the 31st), like RRULE does.
+    Raises OverflowError past the last representable year.
+    """
+    month = value.month - 1 + months
+    year = value.year + month // 12
+    if year > MAXYEAR:
+        raise OverflowError("date value out of range")
+    try:
+        return value.replace(year=year, month=month % 12 + 1)
+    except ValueError:
+        return None
+
+
+def expand_occurrences(
+    series: BookingSeriesBase
+) -> list[tuple[datetime, datetime]]:
+    """
+    Expands a recurrence rule into the (start_time, end_time) pairs of its
+    occurrences, in order and without the exception dates. Every
+    occurrence must start within ``SERIES_HORIZON_DAYS`` of the first.
+    """
+    first_start = as_stored(series.start_time)
+    horizon = timedelta(days=SERIES_HORIZON_DAYS)
+    duration = as_stored(series.end_time) - first_start
+    until = as_stored(series.until) if series.until else None
+    step = timedelta(
+        days=series.interval * (7 if series.frequency == "weekly" else 1)
+    )
+    starts = []
+    position = 0
+    while series.count is None or len(starts) < series.count:
+        try:
+            if series.frequency == "monthly":
+                start_time = _add_months(
+                    first_start, position * series.interval
+                )
+            else:
+                start_time = first_start + step * position
+        except OverflowError:
+            raise ValueError(
+                "Occurrences of the series are out of the supported range"
+            ) from None
+        position += 1
+        if start_time is None:
+            continue
+        if until is not None and start_time > until:
+            break
+        if start_time - first_start > horizon:
+            raise ValueError(
+                "Occurrences of a series must start within "
+                f"{SERIES_HORIZON_DAYS} days of the first one"
+            )
+        if len(starts) == MAX_OCCURRENCES:
+            raise ValueError(
+                f"A series cannot have more than {MAX_OCCURRENCES} "
+                "occurrences"
+            )
+        starts.append(start_time)
+
+    if any(later - earlier < duration
+           for earlier, later in zip(starts, starts[1:])):
+        raise ValueError("Occurrences of the series overlap each other")
+    skipped = set(series.exceptions)
+    return [
+        (start_time, start_time + duration) for start_time in starts
+        if start_time.date() not in skipped
+    ]
+
+
+def _find_conflicts(
+    db: Session,
+    room_id: int,
+    occurrences: list[tuple[datetime, datetime]],
+    exclude_series_id: int | None = None
+) -> list[datetime]:
+    """
+    Returns the start of every occurrence overlapping an existing booking.
+    The room's bookings in the span of the series are read with one range
+    query and each occurrence is then checked with a binary search.
+    """
+    schedule = load_schedules(
+        db,
+        [room_id],
+        occurrences[0][0],
+        occurrences[-1][1],
+        exclude_series_id=exclude_series_id,
+    )[room_id]
+    return [
+        start_time for start_time, end_time in occurrences
+        if schedule.overlaps(start_time, end_time)
+    ]
+
+
+def _conflict_error(room_id: int, conflicts: list[datetime]) -> ValueError:
+    """
+    Builds the error raised when occurrences of a series conflict.
+    """
+    shown = ", ".join(start.isoformat() for start in conflicts[:5])
+    more = f" and {len(conflicts) - 5} more" if len(conflicts) > 5 else ""
+    return ValueError(
+        f"Room with id {room_id} is not available during the specified "
+        f"time for occurrences starting {shown}{more}"
+    )
+
+
+def _insert_occurrences(
+    db: Session,
+    db_series: BookingSeries,
+    occurrences: list[tuple[datetime, datetime]]
+):
+    """
+    Inserts the occurrences of a series with one executemany statement.
+    """
+    db.execute(insert(Booking), [
+        {
+            "user_id": db_series.user_id,
+            "room_id": db_series.room_id,
+            "start_time": start_time,
+            "end_time": end_time,
+            "series_id": db_series.id,
+        }
+        for start_time, end_time in occurrences
+    ])
+
+
+def get_booking_series_by_id(
+    db: Session, series_id: int, with_bookings: bool = False
+) -> BookingSeries | None:
+    """
+    Retrieves a booking series by its ID, with its occurrences loaded when
+    ``with_bookings`` is set.
+    """
+    query = db.query(BookingSeries).filter(BookingSeries.id == series_id)
+    if with_bookings:
+        query = query.options(selectinload(BookingSeries.bookings))
+    return query.first()
+
+
+def create_booking_series(
+    db: Session, series: BookingSeriesCreate
+) -> BookingSeries:
+    """
+    Creates a booking series and all of its occurrences in one transaction.
+    Nothing is created if any occurrence conflicts with an existing booking.
+    """
+    if get_user_by_id(db, series.user_id) is None:
+        raise ValueError(f"User with id {series.user_id} does not exist")
+    if series.start_time.tzinfo is None:
+        series.start_time = series.start_time.replace(tzinfo=timezone.utc)
+    if series.start_time < datetime.now(timezone.utc):
+        raise ValueError("Cannot create a booking in the past")
+    occurrences = expand_occurrences(series)
+    if not occurrences:
+        raise ValueError("The series has no occurrences")
+    for _ in range(ROOM_WRITE_RETRIES):
+        # End the reads so far: the lock starts a new transaction.
+        db.commit()
+        room = lock_room(db, series.room_id)
+        if room is None:
+            db.rollback()
+            raise ValueError(f"Room with id {series.room_id} does not exist")
+        conflicts = _find_conflicts(db, room.id, occurrences)
+        if conflicts:
+            db.rollback()
+            raise _conflict_error(room.id, conflicts)
+        db_series = BookingSeries(
+            user_id=series.user_id,
+            room_id=series.room_id,
+            start_time=as_stored(series.start_time),
+            end_time=as_stored(series.end_time),
+            frequency=series.frequency,
+            interval=series.interval,
+            count=series.count,
+            until=as_stored(series.until) if series.until else None,
+            exceptions=[day.isoformat() for day in series.exceptions],
+        )
+        db.add(db_series)
+        db.flush()
+        _insert_occurrences(db, db_series, occurrences)
+        if commit_room_write(db, room, [db_series.user_id]) is not None:
+            availability_index.invalidate([room.id])
+            db.refresh(db_series)
+            db.refresh(db_series, ["bookings"])
+            return db_series
+    raise ConcurrentWriteError(
+        f"Room with id {series.room_id} is being booked concurrently, "
+        "please retry"
+    )
+
+
+def update_booking_series(
+    db: Session, series_id: int, series: BookingSeriesUpdate
+) -> BookingSeries | None:
+    """
+    Updates the rule of a booking series. Occurrences that already started
+    are kept; the upcoming ones are replaced by the expansion of the new
+    rule in one transaction, provided none of them conflicts.
+    """
+    # The stored rule has naive datetimes: store the new ones the same way
+    # before merging them.
+    stored_update = {
+        field: as_stored(value) if isinstance(value, datetime) else value
+        for field, value in series.model_dump(exclude_unset=True).items()
+    }
+    for _ in range(ROOM_WRITE_RETRIES):
+        db_series = db.get(BookingSeries, series_id)
+        if not db_series:
+            return None
+        room_id = db_series.room_id
+        # End the reads so far: the lock starts a new transaction.
+        db.commit()
+        room = lock_room(db, room_id)
+        db_series = get_booking_series_by_id(db, series_id)
+        if not db_series:
+            db.rollback()
+            return None
+        merged = BookingSeriesBase(**{
+            **{field: getattr(db_series, field) for field in SERIES_FIELDS},
+            "exceptions": db_series.exceptions,
+            **stored_update,
+        })
+        now = as_stored(datetime.now(timezone.utc))
+        occurrences = [
+            occurrence for occurrence in expand_occurrences(merged)
+            if occurrence[0] >= now
+        ]
+        if occurrences:
+            conflicts = _find_conflicts(
+                db, room.id, occurrences, exclude_series_id=db_series.id
+            )
+            if conflicts:
+                db.rollback()
+                raise _conflict_error(room.id, conflicts)
+        db.query(Booking).filter(
+            Booking.series_id == db_series.id, Booking.start_time >= now
+        ).delete(synchronize_session=False)
+        for field in SERIES_FIELDS:
+            value = getattr(merged, field)
+            if isinstance(value, datetime):
+                value = as_stored(value)
+            setattr(db_series, field, value)
+        db_series.exceptions = [day.isoformat() for day in merged.exceptions]
+        if occurrences:
+            _insert_occurrences(db, db_series, occurrences)
+        if commit_room_write(db, room, [db_series.user_id]) is not None:
+            availability_index.invalidate([room.id])
+            db.refresh(db_series)
+            db.refresh(db_series, ["bookings"])
+            return db_series
+    raise ConcurrentWriteError(
+        "Room is being booked concurrently, please retry"
+    )
+
+
+def cancel_booking_series(db: Session, series_id: int) -> bool:
+    """
+    Cancels the upcoming occurrences of a booking series. The series itself
+    is deleted when no past occurrence refers to it anymore, otherwise it is
+    ended now so the past occurrences keep their history.
+    """
+    for _ in range(ROOM_WRITE_RETRIES):
+        db_series = db.get(BookingSeries, series_id)
+        if not db_series:
+            return False
+        room_id = db_series.room_id
+        # End the reads so far: the lock starts a new transaction.
+        db.commit()
+        room = lock_room(db, room_id)
+        db_series = get_booking_series_by_id(db, series_id)
+        if not db_series:
+            db.rollback()
+            return False
+        now = as_stored(datetime.now(timezone.utc))
+        db.query(Booking).filter(
+            Booking.series_id == db_series.id, Booking.start_time >= now
+        ).delete(synchronize_session=False)
+        has_history = db.query(or_(
+            exists().where(Booking.series_id == db_series.id),
+            exists().where(BookingArchive.series_id == db_series.id),
+        )).scalar()
+        if has_history:
+            db_series.count = None
+            db_series.until = now
+        else:
+            db.delete(db_series)
+        if commit_room_write(db, room, [db_series.user_id]) is not None:
+            availability_index.invalidate([room.id])
+            return True
+    raise ConcurrentWriteError(
+        "Room is being booked concurrently, please retry"
+    )
+
@@ -0,0 +1,75 @@
+"""
+This module contains service functions for change versions.
+
+A change version is a counter bumped in the same transaction as every
+write to the rows it covers: ``ROOMS`` for the room catalog, ``USERS`` for
+user details and ``user_bookings_key(user_id)`` for the bookings of one
+user. Reading the versions a response depends on is a single primary key
+lookup, so conditional requests can be answered without running the
+query that builds the response.
+"""
+
+from sqlalchemy import insert, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models.change_version import ChangeVersion
+
+ROOMS = "meeting_rooms"
+USERS = "users"
+
+_UPSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+def user_bookings_key(user_id: int) -> str:
+    """
+    Returns the change version key of the bookings of a user.
+    """
+    return f"user_bookings:{user_id}"
+
+
+def get_versions(db: Session, keys) -> dict[str, int]:
+    """
+    Returns the current version of each key; keys never bumped are 0.
+    """
+    keys = sorted(set(keys))
+    versions = dict.fromkeys(keys, 0)
+    versions.update(
+        db.query(ChangeVersion.key, ChangeVersion.version)
+        .filter(ChangeVersion.key.in_(keys))
+    )
+    return versions
+
+
+def bump_versions(db: Session, keys):
+    """
+    Increments the versions of ``keys`` in the current transaction, with
+    one upsert statement where the dialect supports one. The caller
+    commits.
+    """
+    keys = sorted(set(keys))
+    if not keys:
+        return
+    rows = [{"key": key, "version": 1} for key in keys]
+    dialect = db.get_bind().dialect.name
+    if dialect in _UPSERTS:
+        statement = _UPSERTS[dialect](ChangeVersion).values(rows)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[ChangeVersion.key],
+            set_={"version": ChangeVersion.version + 1},
+        ))
+    elif dialect == "mysql":
+        statement = mysql.insert(ChangeVersion).values(rows)
+        db.execute(statement.on_duplicate_key_update(
+            version=ChangeVersion.version + 1
+        ))
+    else:
+        for row in rows:
+            if not db.execute(
+                update(ChangeVersion)
+                .where(ChangeVersion.key == row["key"])
+                .values(version=ChangeVersion.version + 1)
+            ).rowcount:
+                db.execute(insert(ChangeVersion).values(row))
@@ -2,10 +2,15 @@
 This module contains service functions for meeting room management.
 """
 
+from sqlalchemy import exists, or_
 from sqlalchemy.orm import Session
+from app.models.booking import Booking
+from app.models.booking_archive import BookingArchive
 from app.models.meeting_room import MeetingRoom
 from app.schemas.meeting_room import MeetingRoomCreate, MeetingRoomUpdate
+from app.services.change_versions import ROOMS, bump_versions
 from sqlalchemy.exc import IntegrityError
+from datetime import datetime
 
 
 def get_room_by_id(db: Session, room_id: int) -> MeetingRoom | None:
@@ -22,13 +27,113 @@ def get_room_by_name(db: Session, name: str) -> MeetingRoom | None:
     return db.query(MeetingRoom).filter(MeetingRoom.name == name).first()
 
 
+def lock_rooms(db: Session, room_ids) -> dict[int, MeetingRoom]:
+    """
+    Starts a new transaction holding a row lock (``SELECT ... FOR UPDATE``)
+    on the given meeting rooms and returns the ones that exist, by ID.
+
+    Booking writers take this lock before checking for conflicts, so writers
+    on the same room run one after the other while writers on other rooms
+    are not blocked. Rows are locked in ID order to avoid deadlocks. The
+    session must not be in a transaction: under REPEATABLE READ a snapshot
+    taken before the lock would hide bookings committed while waiting for
+    it, so callers end their reads (commit or roll back) first. Backends
+    without row locks (SQLite) ignore ``FOR UPDATE``; there the version
+    check of ``commit_room_write`` rejects concurrent writers.
+    """
+    if db.in_transaction():
+        raise RuntimeError(
+            "Rooms must be locked in a new transaction: commit or roll "
+            "back the session first"
+        )
+    rooms = (
+        db.query(MeetingRoom)
+        .filter(MeetingRoom.id.in_(set(room_ids)))
+        .order_by(MeetingRoom.id)
+        .with_for_update()
+        .populate_existing()
+        .all()
+    )
+    return {room.id: room for room in rooms}
+
+
+def lock_room(db: Session, room_id: int) -> MeetingRoom | None:
+    """
+    Starts a new transaction holding a row lock on a meeting room.
+    See ``lock_rooms``.
+    """
+    return lock_rooms(db, [room_id]).get(room_id)
+
+
 def get_rooms(
-        db: Session, skip: int = 0, limit: int = 100
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        after: tuple[int] | None = None,
+        fields: tuple[str, ...] | None = None
+) -> list[MeetingRoom]:
+    """
+    Retrieves a list of meeting rooms with pagination, ordered by ID.
+    """
+    return _page(db.query(MeetingRoom), skip, limit, after, fields)
+
+
+def get_available_rooms(
+        db: Session,
+        start_time: datetime,
+        end_time: datetime,
+        min_capacity: int = 1,
+        skip: int = 0,
+        limit: int = 100,
+        after: tuple[int] | None = None,
+        fields: tuple[str, ...] | None = None
 ) -> list[MeetingRoom]:
     """
-    Retrieves a list of meeting rooms with pagination.
+    Retrieves meeting rooms with at least ``min_capacity`` seats that have
+    no booking overlapping the given time slot.
+
+    Runs as a single anti-join: each candidate room is probed with a
+    correlated NOT EXISTS on the bookings (room_id, end_time, start_time)
+    index, so the cost grows with the number of rooms, not bookings.
+    """
+    conflict = exists().where(
+        Booking.room_id == MeetingRoom.id,
+        Booking.start_time < end_time,
+        Booking.end_time > start_time,
+    )
+    return _page(
+        db.query(MeetingRoom).filter(
+            MeetingRoom.capacity >= min_capacity, ~conflict
+        ),
+        skip, limit, after, fields
+    )
+
+
+def _page(
+    query,
+    skip: int,
+    limit: int,
+    after: tuple[int] | None,
+    fields: tuple[str, ...] | None = None
+):
+    """
+    Orders a meeting room query by ID and applies either offset pagination
+    or, when ``after`` holds the ID of the last room of the previous page,
+    keyset pagination that seeks directly past it.
+
+    When ``fields`` is given only those columns are selected and plain row
+    tuples are returned instead of ORM objects.
     """
-    return db.query(MeetingRoom).offset(skip).limit(limit).all()
+    if fields is not None:
+        query = query.with_entities(
+            *(getattr(MeetingRoom, field) for field in fields)
+        )
+    query = query.order_by(MeetingRoom.id)
+    if after is not None:
+        query = query.filter(MeetingRoom.id > after[0])
+    else:
+        query = query.offset(skip)
+    return query.limit(limit).all()
 
 
 def create_room(db: Session, room: MeetingRoomCreate) -> MeetingRoom:
@@ -38,6 +143,8 @@ def create_room(db: Session, room: MeetingRoomCreate) -> MeetingRoom:
     db_room = MeetingRoom(**room.model_dump())
     db.add(db_room)
     try:
+        db.flush()
+        bump_versions(db, [ROOMS])
         db.commit()
         db.refresh(db_room)
         return db_room
@@ -66,6 +173,7 @@ def update_room(
             raise ValueError("Room name already exists")
     for key, value in update_data.items():
         setattr(db_room, key, value)
+    bump_versions(db, [ROOMS])
     db.commit()
     db.refresh(db_room)
     return db_room
@@ -78,8 +186,12 @@ def delete_room(db: Session, room_id: int) -> bool:
     db_room = get_room_by_id(db, room_id)
     if not db_room:
         return False
-    if db_room.bookings:
+    if db.query(or_(
+        exists().where(Booking.room_id == room_id),
+        exists().where(BookingArchive.room_id == room_id),
+    )).scalar():
         raise ValueError("Cannot delete room with existing bookings.")
     db.delete(db_room)
+    bump_versions(db, [ROOMS])
     db.commit()
     return True
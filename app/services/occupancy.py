@@ -0,0 +1,206 @@
+"""
+This module contains service functions for room occupancy bitmaps.
+
+The occupancy of a room over a day is a bitset with one bit per cell of
+``granularity`` minutes, the first cell being the most significant bit.
+Bitsets are Python integers, so marking a booking sets all of its cells
+with a single shift-and-or instead of a loop over cells.
+
+Each room-day bitset is cached and tagged with the room's
+``booking_version``. Every booking write bumps that version, so entries
+of a room are recomputed after any write, on every worker, without
+explicit invalidation.
+"""
+
+import base64
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from itertools import groupby
+
+from sqlalchemy.orm import Session
+
+from app.models.booking import Booking
+from app.models.booking_archive import BookingArchive
+from app.models.meeting_room import MeetingRoom
+from app.services.archive import archive_cutoff
+from app.services.availability import as_stored
+
+OCCUPANCY_CACHE_SIZE = int(os.environ.get("OCCUPANCY_CACHE_SIZE", 50000))
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def rasterize_day(
+    day: date,
+    granularity: int,
+    intervals: list[tuple[datetime, datetime]]
+) -> int:
+    """
+    Returns the bitset of the cells of ``day`` touched by any interval.
+    """
+    cells = MINUTES_PER_DAY // granularity
+    day_start = datetime.combine(day, datetime.min.time())
+    bits = 0
+    for start_time, end_time in intervals:
+        first = max(int((start_time - day_start).total_seconds()) // 60, 0)
+        last = min(
+            -(-int((end_time - day_start).total_seconds()) // 60),
+            MINUTES_PER_DAY,
+        )
+        if first >= last:
+            continue
+        low, high = first // granularity, -(-last // granularity)
+        bits |= ((1 << (high - low)) - 1) << (cells - high)
+    return bits
+
+
+class OccupancyCache:
+    """
+    Thread-safe LRU mapping of (room_id, day, granularity) to the room's
+    booking version and the bitset of that day.
+    """
+
+    def __init__(self, maxsize: int = OCCUPANCY_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[tuple, tuple[int, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, version: int) -> int | None:
+        """
+        Returns a cached bitset if it was computed at ``version``.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: tuple, version: int, bits: int):
+        """
+        Stores a bitset, evicting the least recently used entries.
+        """
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (version, bits)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Drops every cached bitset.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+occupancy_cache = OccupancyCache()
+
+
+def get_rooms_occupancy(
+    db: Session,
+    start_time: datetime,
+    end_time: datetime,
+    granularity: int
+) -> list[tuple[int, int, int]]:
+    """
+    Returns ``(room_id, cells, bits)`` for every room, ordered by ID, where
+    ``bits`` marks the cells of ``granularity`` minutes between
+    ``start_time`` and ``end_time`` that overlap a booking. Both bounds
+    must fall on a cell boundary.
+
+    Room-days missing from the cache are rasterized from a single range
+    query over the bookings of the rooms that need them.
+    """
+    start_time, end_time = as_stored(start_time), as_stored(end_time)
+    days = [
+        start_time.date() + timedelta(days=offset)
+        for offset in range(
+            (end_time - timedelta(microseconds=1)).date().toordinal()
+            - start_time.date().toordinal() + 1
+        )
+    ]
+    rooms = db.query(MeetingRoom.id, MeetingRoom.booking_version).order_by(
+        MeetingRoom.id
+    ).all()
+
+    day_bits = {}
+    stale = []
+    for room_id, version in rooms:
+        for day in days:
+            bits = occupancy_cache.get((room_id, day, granularity), version)
+            if bits is None:
+                stale.append(room_id)
+                break
+            day_bits[room_id, day] = bits
+
+    if stale:
+        window_start = datetime.combine(days[0], datetime.min.time())
+        window_end = window_start + timedelta(days=len(days))
+        bookings = {room_id: [] for room_id in stale}
+        models = [Booking]
+        if window_start < archive_cutoff():
+            models.append(BookingArchive)
+        for model in models:
+            for room_id, booking_start, booking_end in (
+                db.query(model.room_id, model.start_time, model.end_time)
+                .filter(
+                    model.room_id.in_(stale),
+                    model.start_time < window_end,
+                    model.end_time > window_start,
+                )
+            ):
+                bookings[room_id].append((booking_start, booking_end))
+        versions = dict(rooms)
+        for room_id in stale:
+            for day in days:
+                bits = rasterize_day(day, granularity, bookings[room_id])
+                occupancy_cache.set(
+                    (room_id, day, granularity), versions[room_id], bits
+                )
+                day_bits[room_id, day] = bits
+
+    cells_per_day = MINUTES_PER_DAY // granularity
+    window_start = datetime.combine(days[0], datetime.min.time())
+    skipped = int((start_time - window_start).total_seconds()) // 60
+    skipped //= granularity
+    cells = int((end_time - start_time).total_seconds()) // 60 // granularity
+    trailing = cells_per_day * len(days) - skipped - cells
+    result = []
+    for room_id, _ in rooms:
+        bits = 0
+        for day in days:
+            bits = (bits << cells_per_day) | day_bits[room_id, day]
+        bits = (bits >> trailing) & ((1 << cells) - 1)
+        result.append((room_id, cells, bits))
+    return result
+
+
+def encode_base64(cells: int, bits: int) -> str:
+    """
+    Encodes a bitset as base64, first cell in the most significant bit of
+    the first byte, padded with zero bits to a whole byte.
+    """
+    size = -(-cells // 8)
+    return base64.b64encode(
+        (bits << (size * 8 - cells)).to_bytes(size, "big")
+    ).decode()
+
+
+def encode_rle(cells: int, bits: int) -> list[int]:
+    """
+    Encodes a bitset as the lengths of alternating runs of free and busy
+    cells, starting with free cells (so the first run may be 0).
+    """
+    runs = [
+        (busy, len(list(run)))
+        for busy, run in groupby(format(bits, f"0{cells}b"))
+    ]
+    lengths = [length for _, length in runs]
+    if runs and runs[0][0] == "1":
+        lengths.insert(0, 0)
+    return lengths
@@ -2,10 +2,15 @@
 This module contains service functions for user management.
 """
 
+from sqlalchemy import exists, insert, or_
 from sqlalchemy.orm import Session
+from app.models.booking import Booking
+from app.models.booking_archive import BookingArchive
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
-from app.utils.hashing import Hasher
+from app.services.change_versions import USERS, bump_versions
+from app.utils.hashing import Hasher, hash_passwords
+from app.utils.user_cache import user_cache
 from sqlalchemy.exc import IntegrityError
 
 
@@ -23,11 +28,37 @@ def get_user_by_username(db: Session, username: str) -> User | None:
     return db.query(User).filter(User.username == username).first()
 
 
-def get_users(db: Session, skip: int = 0, limit: int = 100) -> list[User]:
+def has_users(db: Session) -> bool:
     """
-    Retrieves a list of users with pagination.
+    Checks whether any user exists, without counting them all.
     """
-    return db.query(User).offset(skip).limit(limit).all()
+    return db.query(exists().where(User.id.isnot(None))).scalar()
+
+
+def get_users(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    after: tuple[int] | None = None,
+    fields: tuple[str, ...] | None = None
+) -> list[User]:
+    """
+    Retrieves a list of users with pagination, ordered by ID. When
+    ``after`` holds the ID of the last user of the previous page, the
+    query seeks past it instead of skipping rows. When ``fields`` is given
+    only those columns are selected and plain row tuples are returned.
+    """
+    query = db.query(User)
+    if fields is not None:
+        query = query.with_entities(
+            *(getattr(User, field) for field in fields)
+        )
+    query = query.order_by(User.id)
+    if after is not None:
+        query = query.filter(User.id > after[0])
+    else:
+        query = query.offset(skip)
+    return query.limit(limit).all()
 
 
 def create_user(db: Session, user: UserCreate) -> User:
@@ -50,6 +81,130 @@ def create_user(db: Session, user: UserCreate) -> User:
         raise ValueError("Username already exists.")
 
 
+IMPORT_CHUNK_ROWS = 1000
+
+
+def create_users_bulk(db: Session, users: list[UserCreate]) -> list[dict]:
+    """
+    Creates many users at once.
+
+    Usernames repeated within the batch and usernames that already exist
+    (found with one IN query) are rejected before any password is hashed.
+    The remaining passwords are hashed in parallel on the import process
+    pool and the users are inserted in chunks of ``IMPORT_CHUNK_ROWS``, one
+    statement and commit per chunk. Returns one result per item, in order,
+    with a ``status`` of ``created`` (and the ``user``) or ``conflict``
+    (and a ``message``).
+    """
+    results = [{"status": "created"} for _ in users]
+    first_index = {}
+    for index, user in enumerate(users):
+        if user.username in first_index:
+            results[index] = {
+                "status": "conflict",
+                "message": f"Username {user.username} is repeated in the "
+                           f"import (first at index "
+                           f"{first_index[user.username]})",
+            }
+        else:
+            first_index[user.username] = index
+    existing = {
+        username for username, in
+        db.query(User.username).filter(User.username.in_(first_index))
+    }
+    for username in existing:
+        results[first_index[username]] = _existing_username(username)
+    accepted = [
+        index for username, index in first_index.items()
+        if username not in existing
+    ]
+    hashes = hash_passwords([users[index].password for index in accepted])
+    rows = [
+        {
+            "username": users[index].username,
+            "password": hashed,
+            "is_admin": users[index].is_admin,
+        }
+        for index, hashed in zip(accepted, hashes)
+    ]
+    for offset in range(0, len(rows), IMPORT_CHUNK_ROWS):
+        chunk = rows[offset:offset + IMPORT_CHUNK_ROWS]
+        indexes = accepted[offset:offset + IMPORT_CHUNK_ROWS]
+        try:
+            user_ids = _insert_users(db, chunk)
+            db.commit()
+        except IntegrityError:
+            # Some usernames were created concurrently since the check, or
+            # collide under the database collation (e.g. case-insensitive
+            # on MySQL): insert the chunk row by row to find them.
+            db.rollback()
+            indexes, chunk, user_ids = _insert_users_one_by_one(
+                db, indexes, chunk, results
+            )
+        for index, row, user_id in zip(indexes, chunk, user_ids):
+            results[index]["user"] = User(id=user_id, **row)
+    return results
+
+
+def _insert_users_one_by_one(
+    db: Session, indexes: list[int], chunk: list[dict], results: list[dict]
+) -> tuple[list[int], list[dict], list[int]]:
+    """
+    Inserts the rows of a chunk one at a time, each in a savepoint, and
+    records a conflict for each row the database rejects. Returns the
+    indexes, rows and ids of the inserted users.
+    """
+    inserted = ([], [], [])
+    for index, row in zip(indexes, chunk):
+        try:
+            with db.begin_nested():
+                user_id, = _insert_users(db, [row])
+        except IntegrityError:
+            results[index] = _existing_username(row["username"])
+            continue
+        for values, value in zip(inserted, (index, row, user_id)):
+            values.append(value)
+    db.commit()
+    return inserted
+
+
+def _existing_username(username: str) -> dict:
+    """
+    Returns the import result of a username that is already taken.
+    """
+    return {
+        "status": "conflict",
+        "message": f"Username {username} already exists.",
+    }
+
+
+def _insert_users(db: Session, rows: list[dict]) -> list[int]:
+    """
+    Inserts user rows with one executemany statement and returns their ids
+    in order. Rows are matched to their ids by the unique username, so
+    RETURNING does not need to preserve the parameter order; dialects
+    without RETURNING for executemany (MySQL) look the ids up afterwards.
+    """
+    usernames = [row["username"] for row in rows]
+    columns = (User.id, User.username)
+    if db.get_bind().dialect.insert_executemany_returning:
+        inserted = db.execute(insert(User).returning(*columns), rows)
+    else:
+        db.execute(insert(User), rows)
+        inserted = db.query(*columns).filter(User.username.in_(usernames))
+    found = {username: user_id for user_id, username in inserted}
+    return [found[username] for username in usernames]
+
+
+def update_password_hash(db: Session, db_user: User, hashed_password: str):
+    """
+    Replaces the stored password hash of a user, e.g. after a login
+    rehashed it with the current bcrypt cost.
+    """
+    db_user.password = hashed_password
+    db.commit()
+
+
 def update_user(db: Session, user_id: int, user: UserUpdate) -> User | None:
     """
     Updates an existing user.
@@ -63,13 +218,17 @@ def update_user(db: Session, user_id: int, user: UserUpdate) -> User | None:
             "Cannot revoke admin status from initial administrator"
         )
 
+    previous_username = db_user.username
     update_data = user.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_user, key, value)
 
     try:
+        db.flush()
+        bump_versions(db, [USERS])
         db.commit()
         db.refresh(db_user)
+        user_cache.invalidate(previous_username, db_user.username)
         return db_user
     except IntegrityError as e:
         db.rollback()
@@ -88,6 +247,13 @@ def delete_user(db: Session, user_id: int) -> bool:
         return False
     if db_user.id == 1:
         raise ValueError("Cannot delete initial administrator account")
+    if db.query(or_(
+        exists().where(Booking.user_id == user_id),
+        exists().where(BookingArchive.user_id == user_id),
+    )).scalar():
+        raise ValueError("Cannot delete user with existing bookings.")
     db.delete(db_user)
+    bump_versions(db, [USERS])
     db.commit()
+    user_cache.invalidate(db_user.username)
     return True
@@ -0,0 +1,73 @@
+"""
+This module measures how long the application takes to start. Run it in
+a fresh interpreter with ``python -m app.startup``, or through the
+``startup-report`` command, which also checks the result against the
+startup budget.
+
+Workers are expected to be forked from a master process that imported the
+application once (e.g. ``gunicorn --preload``), so the imports are
+reported separately from the worker cold start: the time from the fork
+until the worker has built its application and engine.
+"""
+
+import json
+import os
+import sys
+import time
+
+
+def _start_worker(connect: bool) -> dict:
+    """
+    Runs the startup a worker does after being forked.
+    """
+    from app.main import create_app
+    from app.utils.database import get_engine, startup_timings
+
+    started = time.perf_counter()
+    create_app()
+    created = time.perf_counter()
+    get_engine()
+    report = {
+        "create_app_ms": (created - started) * 1000,
+        "engine_ms": startup_timings["engine_ms"],
+    }
+    if connect:
+        with get_engine().connect():
+            pass
+        report["first_connection_ms"] = startup_timings["first_connection_ms"]
+    return report
+
+
+def measure_startup(connect: bool = False) -> dict:
+    """
+    Times the startup phases of the application. It must run before the
+    application is imported. The first database connection is only opened
+    when ``connect`` is set; workers otherwise open it on their first query.
+    """
+    started = time.perf_counter()
+    import app.main  # noqa: F401
+    report = {"imports_ms": (time.perf_counter() - started) * 1000}
+    if not hasattr(os, "fork"):
+        report.update(_start_worker(connect))
+        report["cold_start_ms"] = (time.perf_counter() - started) * 1000
+        return report
+
+    read_end, write_end = os.pipe()
+    forked = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_end)
+        worker = _start_worker(connect)
+        worker["cold_start_ms"] = (time.perf_counter() - forked) * 1000
+        with os.fdopen(write_end, "w") as pipe:
+            json.dump(worker, pipe)
+        os._exit(0)
+    os.close(write_end)
+    with os.fdopen(read_end) as pipe:
+        report.update(json.load(pipe))
+    os.waitpid(pid, 0)
+    return report
+
+
+if __name__ == "__main__":
+    print(json.dumps(measure_startup(connect="--connect" in sys.argv)))
@@ -8,5 +8,14 @@ from .auth import (
     get_current_user,
     admin_required
 )
-from .database import Base, engine, get_db, init_db
+from .database import (
+    Base,
+    get_engine,
+    get_db,
+    get_session,
+    get_read_session,
+    close_session,
+    init_db,
+)
 from .hashing import Hasher
+from .user_cache import user_cache, UserSnapshot
@@ -0,0 +1,38 @@
+"""
+Helpers for running the synchronous application on an event loop.
+
+The ASGI entry point (``app.asgi``) serves every request inside the
+greenlet of ``AsyncSession.run_sync``: the Flask views and the service
+layer run unchanged on the session's synchronous facade, while SQLAlchemy
+awaits each database call on the event loop. ``request_session`` holds
+that session for ``get_session``, and ``wait`` lets other blocking waits
+yield to the event loop the same way.
+"""
+
+import asyncio
+from concurrent.futures import Future
+from contextvars import ContextVar
+
+from sqlalchemy.orm import Session
+from sqlalchemy.util import await_only
+
+request_session: ContextVar[Session | None] = ContextVar(
+    "request_session", default=None
+)
+
+
+def on_event_loop() -> bool:
+    """
+    Tells whether the current request is served by the ASGI entry point.
+    """
+    return request_session.get() is not None
+
+
+def wait(future: Future):
+    """
+    Returns the result of a future, yielding to the event loop while it
+    runs when called from a request served by the ASGI entry point.
+    """
+    if on_event_loop():
+        return await_only(asyncio.wrap_future(future))
+    return future.result()
@@ -5,11 +5,14 @@ This module provides authentication utilities using JWT.
 from datetime import datetime, timedelta, timezone
 from jose import jwt, JWTError, JWSError
 from app.services.user import get_user_by_username
-from app.utils.database import get_db
+from app.utils.database import get_session
+from app.utils.token_cache import token_cache
+from app.utils.user_cache import user_cache, UserSnapshot
 from sqlalchemy.orm import Session
 from functools import wraps
 from flask import request, jsonify
 import os
+import secrets
 
 SECRET_KEY = os.environ.get("SECRET_KEY")
 ALGORITHM = "HS256"
@@ -18,43 +21,79 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     """
-    Creates a JWT access token.
+    Creates a JWT access token. Each token gets a unique ID, so revoking
+    one never revokes another issued in the same second.
     """
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": secrets.token_urlsafe(12)})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-def verify_token(token: str, credentials_exception):
+def decode_token(token: str, credentials_exception) -> dict:
     """
-    Verifies a JWT token.
+    Decodes and validates a JWT token, rejecting revoked tokens and tokens
+    that never expire.
     """
+    if token_cache.is_revoked(token):
+        raise credentials_exception
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        return username
+        payload = jwt.decode(
+            token, SECRET_KEY, algorithms=[ALGORITHM],
+            options={"require_exp": True},
+        )
     except (JWTError, JWSError):
         raise credentials_exception
+    if payload.get("sub") is None:
+        raise credentials_exception
+    return payload
+
+
+def verify_token(token: str, credentials_exception):
+    """
+    Verifies a JWT token and returns its username, from the token cache
+    when the token was verified before.
+    """
+    username = token_cache.get(token)
+    if username is not None:
+        return username
+    payload = decode_token(token, credentials_exception)
+    token_cache.set(token, payload["sub"], payload["exp"])
+    return payload["sub"]
+
+
+def revoke_token(token: str):
+    """
+    Rejects a valid JWT token from now until it expires.
+    """
+    payload = decode_token(
+        token, Exception("Could not validate credentials")
+    )
+    token_cache.revoke(token, payload["exp"])
 
 
 def get_current_user(token: str):
     """
-    Gets the current user from a JWT token.
+    Gets the current user from a JWT token, as a detached snapshot served
+    from the user cache when possible.
     """
-    db: Session = next(get_db())
     credentials_exception = Exception("Could not validate credentials")
     username = verify_token(token, credentials_exception)
+    snapshot = user_cache.get(username)
+    if snapshot is not None:
+        return snapshot
+    generation = user_cache.generation()
+    db: Session = get_session()
     user = get_user_by_username(db, username)
     if user is None:
         return None
-    return user
+    snapshot = UserSnapshot.from_user(user)
+    user_cache.set(snapshot, generation)
+    return snapshot
 
 
 def token_required(f):
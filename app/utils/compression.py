@@ -0,0 +1,83 @@
+"""
+This module compresses response bodies.
+
+Responses of a compressible type whose body is at least
+``COMPRESS_MIN_SIZE`` bytes are encoded with brotli when the client
+accepts it and the ``brotli`` package is installed, and with gzip
+otherwise. Smaller bodies are sent as is: below about a kilobyte the
+headers dominate and compressing costs more CPU than it saves bytes.
+Streamed responses (exports) are left alone.
+"""
+
+import gzip
+import os
+
+from flask import Flask, request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+COMPRESSION_ENABLED = os.environ.get(
+    "COMPRESSION_ENABLED", "true"
+).lower() in ("1", "true", "yes")
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", 1024))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", 4))
+
+COMPRESSIBLE_TYPES = frozenset((
+    "application/json",
+    "application/x-ndjson",
+    "text/csv",
+    "text/plain",
+))
+
+
+def choose_encoding(accept_encodings) -> str | None:
+    """
+    Returns the content coding to use for a request's Accept-Encoding, or
+    None when it accepts neither brotli nor gzip.
+    """
+    if brotli is not None and accept_encodings["br"]:
+        return "br"
+    if accept_encodings["gzip"]:
+        return "gzip"
+    return None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """
+    Encodes a body with ``encoding`` (``br`` or ``gzip``).
+    """
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, GZIP_LEVEL, mtime=0)
+
+
+def compress_response(response):
+    """
+    Compresses the body of a response when it is worth it.
+    """
+    if (response.status_code != 200 or response.direct_passthrough
+            or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+    response.vary.add("Accept-Encoding")
+    if response.calculate_content_length() < COMPRESS_MIN_SIZE:
+        return response
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+    response.set_data(compress(response.get_data(), encoding))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def init_compression(app: Flask):
+    """
+    Registers response compression unless ``COMPRESSION_ENABLED`` is off.
+    """
+    if COMPRESSION_ENABLED:
+        app.after_request(compress_response)
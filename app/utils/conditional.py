@@ -0,0 +1,55 @@
+"""
+This module provides conditional GET support for polled endpoints.
+
+``conditional_on`` derives a weak ETag from the change versions a response
+depends on (see ``app.services.change_versions``) and from the request
+path and query string, before the view runs. A request whose
+``If-None-Match`` carries that ETag is answered with ``304 Not Modified``
+after a single primary key lookup: the list query, the serialization and
+the body are all skipped.
+"""
+
+import hashlib
+from functools import wraps
+
+from flask import current_app, make_response, request
+
+from app.services.change_versions import get_versions
+from app.utils.database import get_read_session
+
+
+def version_etag(versions: dict[str, int]) -> str:
+    """
+    Returns the ETag of the current request's response given the versions
+    it depends on.
+    """
+    digest = hashlib.blake2b(digest_size=12)
+    digest.update(request.full_path.encode())
+    for key, version in sorted(versions.items()):
+        digest.update(f"\0{key}={version}".encode())
+    return digest.hexdigest()
+
+
+def conditional_on(keys):
+    """
+    Decorator answering conditional GETs of a view. ``keys`` is called with
+    the view's arguments and returns the change version keys its response
+    depends on. Apply it below the authentication decorator, so only
+    authorized requests are answered.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            versions = get_versions(get_read_session(), keys(*args, **kwargs))
+            etag = version_etag(versions)
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.cache_control.no_cache = True
+            return response
+        return decorated
+    return decorator
@@ -2,34 +2,247 @@
 Database connection and setup utilities.
 """
 
+import hashlib
+import itertools
 import os
+import threading
+import time
+from collections import OrderedDict
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker, declarative_base
+from flask import g, request
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.schema import CreateColumn
+from app.utils.async_bridge import request_session
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-DATABASE_NAME = DATABASE_URL.rsplit("/", 1)[-1]
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 3600))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in (
+    "1", "true", "yes"
+)
 
-root_engine = create_engine(DATABASE_URL.rsplit("/", 1)[0] + "/")
+DATABASE_REPLICA_URLS = [
+    url.strip()
+    for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",")
+    if url.strip()
+]
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", 30))
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", 5))
+RECENT_WRITERS_SIZE = 10000
 
-with root_engine.connect() as conn:
-    if not conn.execute(
-        text(f"SHOW DATABASES LIKE '{DATABASE_NAME}'")
-    ).fetchone():
-        conn.execute(text(f"CREATE DATABASE {DATABASE_NAME}"))
-        print(f"Database '{DATABASE_NAME}' created.")
+# In strict loading mode relationships raise instead of lazy loading, so a
+# missing eager load fails loudly instead of running one query per row.
+STRICT_LOADING = os.getenv("STRICT_LOADING", "false").lower() in (
+    "1", "true", "yes"
+)
+RELATIONSHIP_LAZY = "raise" if STRICT_LOADING else "select"
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+ASYNC_DRIVERS = {
+    "mysql": "aiomysql",
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+}
+
+
+class PoolStats:
+    """
+    Counters about connection checkouts from the pool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, waited: float, timed_out: bool = False):
+        """
+        Records how long a checkout waited for a connection.
+        """
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+
+pool_stats = PoolStats()
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool that records how long each checkout waited for a connection,
+    including the time to open a new one when the pool may grow.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        pool_stats.record(time.perf_counter() - started)
+        return connection
+
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
 
 Base = declarative_base()
 
+startup_timings: dict[str, float] = {}
+
+_engine: Engine | None = None
+_connect_started_at = 0.0
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> Engine:
+    """
+    Return the application engine, creating it on first use. Creating the
+    engine does not connect; the first connection is opened by the first
+    query. Both durations are recorded in ``startup_timings``.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                if not DATABASE_URL:
+                    raise RuntimeError("DATABASE_URL is not set")
+                started = time.perf_counter()
+                created = create_engine(
+                    DATABASE_URL,
+                    poolclass=TimedQueuePool,
+                    pool_size=DB_POOL_SIZE,
+                    max_overflow=DB_MAX_OVERFLOW,
+                    pool_recycle=DB_POOL_RECYCLE,
+                    pool_timeout=DB_POOL_TIMEOUT,
+                    pool_pre_ping=DB_POOL_PRE_PING,
+                )
+                event.listen(
+                    created, "do_connect", _start_first_connect, once=True
+                )
+                event.listen(
+                    created, "first_connect", _record_first_connect
+                )
+                SessionLocal.configure(bind=created)
+                startup_timings["engine_ms"] = round(
+                    (time.perf_counter() - started) * 1000, 3
+                )
+                _engine = created
+    return _engine
+
+
+_async_engine = None
+_async_sessionmaker = None
+
+
+def async_database_url() -> str:
+    """
+    Return ``ASYNC_DATABASE_URL``, or ``DATABASE_URL`` with its driver
+    replaced by the asyncio driver of the same database.
+    """
+    if ASYNC_DATABASE_URL:
+        return ASYNC_DATABASE_URL
+    if not DATABASE_URL:
+        raise RuntimeError("DATABASE_URL is not set")
+    url = make_url(DATABASE_URL)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(
+            f"No asyncio driver known for {backend}, set ASYNC_DATABASE_URL"
+        )
+    return url.set(
+        drivername=f"{backend}+{ASYNC_DRIVERS[backend]}"
+    ).render_as_string(hide_password=False)
+
+
+def get_async_engine():
+    """
+    Return the asyncio engine of the ASGI entry point, creating it on first
+    use with the same pool settings as the application engine.
+    """
+    global _async_engine, _async_sessionmaker
+    if _async_engine is None:
+        with _engine_lock:
+            if _async_engine is None:
+                from sqlalchemy.ext.asyncio import (
+                    async_sessionmaker,
+                    create_async_engine,
+                )
+                created = create_async_engine(
+                    async_database_url(),
+                    poolclass=AsyncAdaptedQueuePool,
+                    pool_size=DB_POOL_SIZE,
+                    max_overflow=DB_MAX_OVERFLOW,
+                    pool_recycle=DB_POOL_RECYCLE,
+                    pool_timeout=DB_POOL_TIMEOUT,
+                    pool_pre_ping=DB_POOL_PRE_PING,
+                )
+                _async_sessionmaker = async_sessionmaker(
+                    created, autoflush=False
+                )
+                _async_engine = created
+    return _async_engine
+
+
+def create_async_session():
+    """Open an ``AsyncSession`` on the asyncio engine."""
+    get_async_engine()
+    return _async_sessionmaker()
+
+
+def _start_first_connect(dialect, conn_rec, cargs, cparams):
+    """Note when the first database connection starts opening."""
+    global _connect_started_at
+    _connect_started_at = time.perf_counter()
+
+
+def _record_first_connect(dbapi_connection, connection_record):
+    """Record how long opening the first database connection took."""
+    startup_timings["first_connection_ms"] = round(
+        (time.perf_counter() - _connect_started_at) * 1000, 3
+    )
+
+
+def _dispose_after_fork():
+    """
+    Drop connections inherited from the parent process so a forked worker
+    never shares a socket with it.
+    """
+    if _engine is not None:
+        _engine.dispose(close=False)
+    if _async_engine is not None:
+        _async_engine.sync_engine.dispose(close=False)
+    for replica in _replicas or ():
+        replica.engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_dispose_after_fork)
+
+
+def __getattr__(name):
+    """Keep ``engine`` importable while creating it lazily."""
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def get_db():
-    """Yield a database session for dependency injection."""
+    """Yield a database session for use outside of a request."""
+    get_engine()
     db = SessionLocal()
     try:
         yield db
@@ -37,8 +250,255 @@ def get_db():
         db.close()
 
 
+def get_session() -> Session:
+    """
+    Return the database session of the current request, opening it on
+    first use. It is closed by ``close_session`` when the request ends.
+    """
+    if "db" not in g:
+        db = request_session.get()
+        if db is None:
+            get_engine()
+            db = SessionLocal()
+        g.db = db
+    return g.db
+
+
+def close_session(exception=None):
+    """Close the sessions of the current request, if any were opened."""
+    for name in ("read_db", "db"):
+        db = g.pop(name, None)
+        if db is not None:
+            db.close()
+
+
+class Replica:
+    """
+    A read replica engine and its health. A replica that fails to connect
+    is skipped for ``REPLICA_RETRY_SECONDS`` and then tried again.
+    """
+
+    def __init__(self, url: str):
+        self.url = make_url(url)
+        self.engine = create_engine(
+            url,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_pre_ping=True,
+        )
+        self.down_until = 0.0
+        self.failures = 0
+        self.reads = 0
+
+    def is_available(self, now: float) -> bool:
+        """Tell whether the replica may be used."""
+        return now >= self.down_until
+
+    def mark_down(self):
+        """Take the replica out of rotation for a while."""
+        self.failures += 1
+        self.down_until = time.monotonic() + REPLICA_RETRY_SECONDS
+
+    def status(self) -> dict:
+        """Describe the replica and its health."""
+        return {
+            "url": self.url.render_as_string(hide_password=True),
+            "healthy": self.is_available(time.monotonic()),
+            "failures": self.failures,
+            "reads": self.reads,
+        }
+
+
+_replicas: list[Replica] | None = None
+_replica_turn = itertools.count()
+_recent_writers: OrderedDict[str, float] = OrderedDict()
+_recent_writers_lock = threading.Lock()
+
+
+def get_replicas() -> list[Replica]:
+    """
+    Return the read replicas listed in ``DATABASE_REPLICA_URLS``, creating
+    their engines on first use.
+    """
+    global _replicas
+    if _replicas is None:
+        with _engine_lock:
+            if _replicas is None:
+                _replicas = [Replica(url) for url in DATABASE_REPLICA_URLS]
+    return _replicas
+
+
+def _client_key() -> str:
+    """
+    Identify the client of the current request for read-your-writes by a
+    digest of its ``Authorization`` header, so the recently written map
+    never holds bearer tokens, or by its address without one.
+    """
+    authorization = request.headers.get("Authorization")
+    if authorization:
+        return hashlib.blake2b(
+            authorization.encode(), digest_size=16
+        ).hexdigest()
+    return request.remote_addr or ""
+
+
+def record_write(response):
+    """
+    Remember clients whose request may have written, so their reads stay
+    on the primary until replicas have caught up with the write.
+    """
+    if (
+        _replicas
+        and request.method not in ("GET", "HEAD", "OPTIONS")
+        and response.status_code < 400
+    ):
+        key = _client_key()
+        with _recent_writers_lock:
+            _recent_writers[key] = time.monotonic() + READ_YOUR_WRITES_SECONDS
+            _recent_writers.move_to_end(key)
+            while len(_recent_writers) > RECENT_WRITERS_SIZE:
+                _recent_writers.popitem(last=False)
+    return response
+
+
+def _wrote_recently() -> bool:
+    """Tell whether the client of the current request wrote recently."""
+    with _recent_writers_lock:
+        deadline = _recent_writers.get(_client_key())
+    return deadline is not None and deadline > time.monotonic()
+
+
+def get_read_session() -> Session:
+    """
+    Return a session for the read-only queries of the current request.
+
+    With replicas configured it is bound to the next healthy replica in
+    turn; a replica whose connection fails is marked down and the next one
+    is tried. The primary session of ``get_session`` is returned when no
+    replica is configured or reachable, for clients that wrote less than
+    ``READ_YOUR_WRITES_SECONDS`` ago, so they see their own writes, and
+    for requests served by the ASGI entry point.
+    """
+    if "read_db" in g:
+        return g.read_db
+    if request_session.get() is not None:
+        return get_session()
+    replicas = get_replicas()
+    if not replicas or _wrote_recently():
+        return get_session()
+    get_engine()
+    now = time.monotonic()
+    first = next(_replica_turn)
+    for offset in range(len(replicas)):
+        replica = replicas[(first + offset) % len(replicas)]
+        if not replica.is_available(now):
+            continue
+        db = SessionLocal(bind=replica.engine)
+        try:
+            db.connection()
+        except DBAPIError:
+            db.close()
+            replica.mark_down()
+            continue
+        replica.reads += 1
+        g.read_db = db
+        return db
+    return get_session()
+
+
+def get_replica_status() -> list[dict]:
+    """Describe the read replicas and their health."""
+    return [replica.status() for replica in get_replicas()]
+
+
+def get_pool_status() -> dict:
+    """Describe the connection pool usage and checkout waits."""
+    pool = get_engine().pool
+    return {
+        "pool_size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "checkouts": pool_stats.checkouts,
+        "timeouts": pool_stats.timeouts,
+        "wait_total_ms": round(pool_stats.wait_total * 1000, 3),
+        "wait_max_ms": round(pool_stats.wait_max * 1000, 3),
+    }
+
+
+def create_missing_columns(connection):
+    """
+    Add columns declared on the models that are missing from tables which
+    already exist. New columns must be nullable or carry a server default.
+    """
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {
+            column["name"] for column in inspector.get_columns(table.name)
+        }
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = CreateColumn(column).compile(dialect=connection.dialect)
+                connection.execute(
+                    text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+                )
+                print(f"Column '{table.name}.{column.name}' created.")
+
+
+def create_missing_indexes(connection):
+    """
+    Create indexes declared on the models that are missing from tables
+    which already exist. ``create_all`` only emits indexes together with
+    a new table, so this is the migration path for existing databases.
+    """
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {
+            index["name"] for index in inspector.get_indexes(table.name)
+        }
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(connection)
+                print(f"Index '{index.name}' created.")
+
+
+def create_database():
+    """
+    Create the MySQL database named in ``DATABASE_URL`` if the server does
+    not have it yet. Other backends create their database on connect.
+    """
+    url = make_url(DATABASE_URL)
+    if url.get_backend_name() != "mysql":
+        return
+    root_engine = create_engine(url.set(database=""))
+    try:
+        with root_engine.connect() as conn:
+            if not conn.execute(
+                text(f"SHOW DATABASES LIKE '{url.database}'")
+            ).fetchone():
+                conn.execute(text(f"CREATE DATABASE {url.database}"))
+                print(f"Database '{url.database}' created.")
+    finally:
+        root_engine.dispose()
+
+
 def init_db():
-    """Create all tables in the database."""
+    """Create the database, its tables, columns and indexes."""
+    create_database()
+    engine = get_engine()
     Base.metadata.create_all(bind=engine)
-    with engine.connect() as connection:
-        connection.execute(text("ALTER TABLE users AUTO_INCREMENT = 1;"))
+    with engine.begin() as connection:
+        create_missing_columns(connection)
+        create_missing_indexes(connection)
+    if engine.dialect.name == "mysql":
+        with engine.connect() as connection:
+            connection.execute(
+                text("ALTER TABLE users AUTO_INCREMENT = 1;")
+            )
@@ -1,10 +1,214 @@
 """
 This module provides utilities for password hashing using bcrypt.
+
+Hashing runs on a bounded thread pool rather than on the thread serving
+the request, so a login storm can use at most ``HASH_WORKERS`` cores.
+When more than ``HASH_QUEUE_LIMIT`` operations are already waiting, new
+ones are rejected with ``HashingBusyError`` instead of queuing without
+bound. The bcrypt backend releases the GIL while hashing, so the pool
+runs in parallel with the rest of the application.
+
+Logins for unknown usernames do not verify a password at all:
+``Hasher.verify_missing`` holds a pool worker for as long as a recent
+verification took instead (a moving average). A failed login then takes
+the same time, and is rejected with ``HashingBusyError`` under the same
+load, whether or not the username exists, without spending bcrypt work on
+made-up names.
+
+Bulk imports hash on a separate process pool of ``IMPORT_HASH_PROCESSES``
+processes (``hash_passwords``), so a large import uses every core without
+queuing ahead of logins. Imports of at most ``IMPORT_PROCESS_MIN_ROWS``
+passwords hash on the thread pool instead, since starting the process
+pool costs more than hashing them; so do imports for which the process
+pool fails. There, each password is a separate pool operation, so logins
+keep interleaving with the import.
 """
 
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from passlib.context import CryptContext
+from app.utils.async_bridge import wait
+
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", 12))
+HASH_WORKERS = int(os.environ.get("HASH_WORKERS", os.cpu_count() or 1))
+HASH_QUEUE_LIMIT = int(os.environ.get("HASH_QUEUE_LIMIT", HASH_WORKERS * 8))
+IMPORT_HASH_PROCESSES = int(
+    os.environ.get("IMPORT_HASH_PROCESSES", os.cpu_count() or 1)
+)
+IMPORT_PROCESS_MIN_ROWS = int(os.environ.get("IMPORT_PROCESS_MIN_ROWS", 8))
+
+logger = logging.getLogger(__name__)
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+
+class HashingBusyError(Exception):
+    """
+    Raised when too many hashing operations are already waiting.
+    """
+
+
+class HashingPool:
+    """
+    Bounded executor for bcrypt work that records how long operations
+    waited in the queue and how long they ran.
+    """
+
+    def __init__(
+        self, workers: int = HASH_WORKERS, queue_limit: int = HASH_QUEUE_LIMIT
+    ):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.run_total = 0.0
+        self.run_max = 0.0
+
+    def run(self, function, *args):
+        """
+        Runs ``function(*args)`` on the pool and waits for its result.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HashingBusyError(
+                "Too many password operations in progress, please retry"
+            )
+        try:
+            return wait(self._submit(function, *args))
+        finally:
+            self._slots.release()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    def map(self, function, items: list) -> list:
+        """
+        Runs ``function(item)`` for each item on the pool and returns the
+        results in order. At most ``workers`` items are queued at a time,
+        so other operations interleave with them instead of waiting for
+        the whole batch. Each queued item takes a slot like ``run`` does:
+        when none is free and none of the items is pending, the remaining
+        ones are rejected with ``HashingBusyError``.
+        """
+        results = []
+        pending = deque()
+        try:
+            for item in items:
+                while len(pending) >= self.workers or \
+                        not self._slots.acquire(blocking=False):
+                    if not pending:
+                        with self._lock:
+                            self.rejected += 1
+                        raise HashingBusyError(
+                            "Too many password operations in progress, "
+                            "please retry"
+                        )
+                    results.append(wait(pending.popleft()))
+                future = self._submit(function, item)
+                future.add_done_callback(lambda _: self._slots.release())
+                pending.append(future)
+            while pending:
+                results.append(wait(pending.popleft()))
+        finally:
+            for future in pending:
+                future.cancel()
+        return results
+
+    def _submit(self, function, *args) -> Future:
+        """
+        Queues an operation on the executor, starting it if needed.
+        """
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers,
+                        thread_name_prefix="hashing",
+                    )
+        return self._executor.submit(
+            self._timed, time.perf_counter(), function, *args
+        )
+
+    def _timed(self, queued_at: float, function, *args):
+        """
+        Runs a queued operation and records its timings.
+        """
+        started = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            finished = time.perf_counter()
+            waited, ran = started - queued_at, finished - started
+            with self._lock:
+                self.submitted += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+                self.run_total += ran
+                self.run_max = max(self.run_max, ran)
+
+    def stats(self) -> dict:
+        """
+        Describes the pool configuration and the recorded timings.
+        """
+        with self._lock:
+            completed = self.submitted or 1
+            return {
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "bcrypt_rounds": BCRYPT_ROUNDS,
+                "completed": self.submitted,
+                "rejected": self.rejected,
+                "queue_wait_avg_ms": round(
+                    self.wait_total / completed * 1000, 3
+                ),
+                "queue_wait_max_ms": round(self.wait_max * 1000, 3),
+                "run_avg_ms": round(self.run_total / completed * 1000, 3),
+                "run_max_ms": round(self.run_max * 1000, 3),
+            }
+
+
+hashing_pool = HashingPool()
+
+
+class VerifyTimer:
+    """
+    Exponential moving average of how long password verifications take,
+    as seen by the request (queue wait included).
+    """
+
+    def __init__(self, weight: float = 0.1):
+        self.weight = weight
+        self.average: float | None = None
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        """
+        Adds the duration of a verification to the average.
+        """
+        with self._lock:
+            if self.average is None:
+                self.average = seconds
+            else:
+                self.average += self.weight * (seconds - self.average)
+
+
+verify_timer = VerifyTimer()
+_dummy_hash: str | None = None
 
 
 class Hasher():
@@ -16,11 +220,109 @@ class Hasher():
         """
         Verifies a plain password against a hashed password.
         """
-        return pwd_context.verify(plain_password, hashed_password)
+        return hashing_pool.run(
+            pwd_context.verify, plain_password, hashed_password
+        )
+
+    @staticmethod
+    def verify_and_update(plain_password, hashed_password):
+        """
+        Verifies a plain password against a hashed password. Returns a
+        ``(verified, new_hash)`` pair where ``new_hash`` is a rehash of the
+        password with the configured cost, or None when it is up to date.
+        """
+        started = time.perf_counter()
+        result = hashing_pool.run(
+            pwd_context.verify_and_update, plain_password, hashed_password
+        )
+        verify_timer.record(time.perf_counter() - started)
+        return result
+
+    @staticmethod
+    def verify_missing(plain_password):
+        """
+        Takes as long as ``verify_and_update`` for a user that does not
+        exist, on the same pool. Only the first call, before any
+        verification was timed, verifies against a dummy hash; later ones
+        just wait on a pool worker.
+        """
+        global _dummy_hash
+        if verify_timer.average is None:
+            if _dummy_hash is None:
+                _dummy_hash = Hasher.get_password_hash("dummy password")
+            Hasher.verify_and_update(plain_password or "", _dummy_hash)
+        else:
+            hashing_pool.run(time.sleep, verify_timer.average)
 
     @staticmethod
     def get_password_hash(password):
         """
         Hashes a plain text password.
         """
-        return pwd_context.hash(password)
+        return hashing_pool.run(pwd_context.hash, password)
+
+
+_import_executor: ProcessPoolExecutor | None = None
+_import_executor_lock = threading.Lock()
+
+
+def _hash_batch(passwords: list[str]) -> list[str]:
+    """
+    Hashes a batch of passwords in a pool process.
+    """
+    return [pwd_context.hash(password) for password in passwords]
+
+
+def hash_passwords(passwords: list[str]) -> list[str]:
+    """
+    Hashes many passwords in parallel on the import process pool and
+    returns the hashes in order. The pool is started on first use with the
+    ``spawn`` method, which is safe from a multithreaded server. Few
+    passwords, or passwords the process pool failed to hash, are hashed on
+    the thread pool one password per operation, spread over its workers.
+    """
+    if len(passwords) <= IMPORT_PROCESS_MIN_ROWS:
+        return hashing_pool.map(pwd_context.hash, passwords)
+    try:
+        return _hash_on_processes(passwords)
+    except (BrokenProcessPool, RuntimeError, OSError):
+        logger.warning(
+            "The import hashing processes failed, hashing %d passwords on "
+            "the thread pool", len(passwords), exc_info=True,
+        )
+        _discard_import_executor()
+        return hashing_pool.map(pwd_context.hash, passwords)
+
+
+def _hash_on_processes(passwords: list[str]) -> list[str]:
+    """
+    Hashes passwords on the import process pool, starting it if needed.
+    """
+    global _import_executor
+    if _import_executor is None:
+        with _import_executor_lock:
+            if _import_executor is None:
+                _import_executor = ProcessPoolExecutor(
+                    max_workers=IMPORT_HASH_PROCESSES,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    size = max(1, -(-len(passwords) // (IMPORT_HASH_PROCESSES * 4)))
+    futures = [
+        _import_executor.submit(
+            _hash_batch, passwords[offset:offset + size]
+        )
+        for offset in range(0, len(passwords), size)
+    ]
+    return [hashed for future in futures for hashed in wait(future)]
+
+
+def _discard_import_executor():
+    """
+    Shuts a failed import process pool down, so the next import starts a
+    new one.
+    """
+    global _import_executor
+    with _import_executor_lock:
+        executor, _import_executor = _import_executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,318 @@
+"""
+This module records per-route request metrics and renders them in the
+Prometheus text format.
+
+Every request updates a latency histogram, a count per status code and an
+in-flight gauge for its route and method, plus the number of SQL
+statements it ran and their total time, taken from SQLAlchemy engine
+events. Samples go to counters owned by the recording thread, so the hot
+path takes no lock, allocates nothing once warm (the state of finished
+requests is reused) and only updates preallocated slots; the counters of
+all threads are summed when ``/metrics`` is scraped. The counters of
+threads that exited are folded into a retired total whenever a thread
+starts recording or ``/metrics`` is scraped, so servers that start a
+thread per request do not keep one set of counters per thread forever.
+
+Set ``METRICS_ENABLED=false`` to turn the instrumentation off.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from flask import Flask, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() in (
+    "1", "true", "yes"
+)
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class RouteStats:
+    """
+    Counters of one route and method, owned by a single thread.
+    """
+    __slots__ = (
+        "buckets", "count", "seconds", "statuses", "in_flight",
+        "statements", "statement_seconds",
+    )
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.seconds = 0.0
+        self.statuses: dict[int, int] = {}
+        self.in_flight = 0
+        self.statements = 0
+        self.statement_seconds = 0.0
+
+
+class _ThreadShard(threading.local):
+    """
+    Counters of the requests served by the current thread.
+    """
+
+    def __init__(self):
+        self.routes: dict[str, dict[str, RouteStats]] = {}
+        self.spare: list[_RequestState] = []
+        with _shards_lock:
+            _retire_exited_threads()
+            _shards.append((threading.current_thread(), self.routes))
+
+
+class _RequestState:
+    """
+    Start time, status and SQL work of the request being served.
+    """
+    __slots__ = (
+        "stats", "started", "status", "statements", "statement_seconds",
+        "statement_started",
+    )
+
+    def __init__(self, stats: RouteStats):
+        self.reset(stats)
+
+    def reset(self, stats: RouteStats):
+        """
+        Starts the state over for a new request of the route of ``stats``.
+        """
+        self.stats = stats
+        self.status = 500
+        self.statements = 0
+        self.statement_seconds = 0.0
+        self.statement_started = 0.0
+        self.started = time.perf_counter()
+
+
+_shards: list[tuple[threading.Thread, dict[str, dict[str, RouteStats]]]] = []
+_retired: dict[str, dict[str, RouteStats]] = {}
+_shards_lock = threading.Lock()
+
+
+def _add(total: RouteStats, stats: RouteStats):
+    """
+    Adds the counters of ``stats`` to ``total``.
+    """
+    for index, value in enumerate(stats.buckets):
+        total.buckets[index] += value
+    total.count += stats.count
+    total.seconds += stats.seconds
+    for status, count in list(stats.statuses.items()):
+        total.statuses[status] = total.statuses.get(status, 0) + count
+    total.in_flight += stats.in_flight
+    total.statements += stats.statements
+    total.statement_seconds += stats.statement_seconds
+
+
+def _retire_exited_threads():
+    """
+    Folds the counters of threads that exited into the retired total and
+    drops their shards. Called with ``_shards_lock`` held.
+    """
+    alive = []
+    for thread, routes in _shards:
+        if thread.is_alive():
+            alive.append((thread, routes))
+            continue
+        for route, methods in routes.items():
+            retired = _retired.setdefault(route, {})
+            for method, stats in methods.items():
+                total = retired.get(method)
+                if total is None:
+                    total = retired[method] = RouteStats()
+                _add(total, stats)
+    _shards[:] = alive
+
+
+_shard = _ThreadShard()
+# Request state is context-local rather than thread-local so requests
+# interleaved on one event loop thread (app.asgi) keep their own.
+_request: ContextVar[_RequestState | None] = ContextVar(
+    "metrics_request", default=None
+)
+
+
+def _start_request():
+    """
+    Marks a request as in flight and starts counting its SQL statements.
+    """
+    rule = request.url_rule
+    route = rule.rule if rule is not None else UNMATCHED_ROUTE
+    methods = _shard.routes.get(route)
+    if methods is None:
+        methods = _shard.routes[route] = {}
+    stats = methods.get(request.method)
+    if stats is None:
+        stats = methods[request.method] = RouteStats()
+    stats.in_flight += 1
+    if _shard.spare:
+        state = _shard.spare.pop()
+        state.reset(stats)
+    else:
+        state = _RequestState(stats)
+    _request.set(state)
+
+
+def _capture_status(response):
+    """
+    Remembers the status code of the response.
+    """
+    state = _request.get()
+    if state is not None:
+        state.status = response.status_code
+    return response
+
+
+def _finish_request(exception=None):
+    """
+    Records the latency, status and SQL work of the finished request.
+    """
+    state = _request.get()
+    if state is None:
+        return
+    _request.set(None)
+    elapsed = time.perf_counter() - state.started
+    stats = state.stats
+    stats.in_flight -= 1
+    stats.count += 1
+    stats.seconds += elapsed
+    index = bisect_left(BUCKETS, elapsed)
+    if index < len(BUCKETS):
+        stats.buckets[index] += 1
+    status = 500 if exception is not None else state.status
+    stats.statuses[status] = stats.statuses.get(status, 0) + 1
+    stats.statements += state.statements
+    stats.statement_seconds += state.statement_seconds
+    _shard.spare.append(state)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    """
+    Notes when a SQL statement starts.
+    """
+    state = _request.get()
+    if state is not None:
+        state.statement_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    """
+    Counts a SQL statement and its duration for the current request.
+    """
+    state = _request.get()
+    if state is not None:
+        state.statements += 1
+        state.statement_seconds += (
+            time.perf_counter() - state.statement_started
+        )
+
+
+def init_metrics(app: Flask):
+    """
+    Registers the request hooks and the SQL statement listeners.
+    """
+    if not METRICS_ENABLED:
+        return
+    app.before_request(_start_request)
+    app.after_request(_capture_status)
+    app.teardown_request(_finish_request)
+    if not event.contains(
+        Engine, "before_cursor_execute", _before_cursor_execute
+    ):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def collect() -> dict[tuple[str, str], RouteStats]:
+    """
+    Sums the counters of all threads per (route, method).
+    """
+    with _shards_lock:
+        _retire_exited_threads()
+        shards = [routes for _, routes in _shards]
+        totals: dict[tuple[str, str], RouteStats] = {}
+        for route, methods in _retired.items():
+            for method, stats in methods.items():
+                total = totals[route, method] = RouteStats()
+                _add(total, stats)
+    for shard in shards:
+        for route, methods in list(shard.items()):
+            for method, stats in list(methods.items()):
+                total = totals.get((route, method))
+                if total is None:
+                    total = totals[route, method] = RouteStats()
+                _add(total, stats)
+    return totals
+
+
+def _escape(value: str) -> str:
+    """
+    Escapes a label value.
+    """
+    return (
+        value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    )
+
+
+def render_metrics(gauges: dict[str, tuple[str, float]] | None = None) -> str:
+    """
+    Renders the collected metrics, and optional extra ``name: (help,
+    value)`` gauges, in the Prometheus text exposition format.
+    """
+    totals = sorted(collect().items())
+    lines = [
+        "# HELP http_request_duration_seconds Request latency.",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    for (route, method), stats in totals:
+        labels = f'method="{method}",route="{_escape(route)}"'
+        cumulative = 0
+        for bound, count in zip(BUCKETS, stats.buckets):
+            cumulative += count
+            lines.append(
+                f'http_request_duration_seconds_bucket{{{labels},'
+                f'le="{bound}"}} {cumulative}'
+            )
+        lines.append(
+            f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} '
+            f'{stats.count}'
+        )
+        lines.append(
+            f"http_request_duration_seconds_sum{{{labels}}} {stats.seconds}"
+        )
+        lines.append(
+            f"http_request_duration_seconds_count{{{labels}}} {stats.count}"
+        )
+    sections = (
+        ("http_requests_total", "counter", "Requests by status code.",
+         lambda stats: sorted(stats.statuses.items())),
+        ("http_requests_in_flight", "gauge", "Requests being served.",
+         lambda stats: [(None, stats.in_flight)]),
+        ("db_statements_total", "counter",
+         "SQL statements run by requests.",
+         lambda stats: [(None, stats.statements)]),
+        ("db_statement_duration_seconds_total", "counter",
+         "Time spent in SQL statements by requests.",
+         lambda stats: [(None, stats.statement_seconds)]),
+    )
+    for name, kind, description, samples in sections:
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        for (route, method), stats in totals:
+            labels = f'method="{method}",route="{_escape(route)}"'
+            for status, value in samples(stats):
+                extra = f',status="{status}"' if status is not None else ""
+                lines.append(f"{name}{{{labels}{extra}}} {value}")
+    for name, (description, value) in (gauges or {}).items():
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,72 @@
+"""
+This module provides helpers for offset and keyset (cursor) pagination.
+
+List endpoints accept either ``?skip=&limit=`` (offset mode, returns a
+plain list) or ``?after=<cursor>&limit=`` (keyset mode, returns the items
+and a ``next_cursor``). An empty ``after`` requests the first page in
+keyset mode. Cursors are opaque URL-safe strings encoding the sort key of
+the last item of the previous page.
+"""
+
+import base64
+import json
+from datetime import datetime
+from flask import request
+
+
+def encode_cursor(key: tuple) -> str:
+    """
+    Encodes the sort key of an item into an opaque cursor.
+    """
+    values = [
+        value.isoformat() if isinstance(value, datetime) else value
+        for value in key
+    ]
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types) -> tuple:
+    """
+    Decodes a cursor back into a sort key, converting each value with the
+    matching callable in ``types`` (e.g. ``datetime.fromisoformat, int``).
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError
+        return tuple(cast(value) for cast, value in zip(types, values))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def get_pagination_args(*types) -> tuple[int, int, tuple | None, bool]:
+    """
+    Reads the pagination query parameters of the current request.
+
+    Returns ``(skip, limit, after, keyset)`` where ``after`` is the decoded
+    sort key (None for the first page) and ``keyset`` tells whether the
+    client asked for cursor pagination.
+    """
+    skip = int(request.args.get("skip", 0))
+    limit = int(request.args.get("limit", 100))
+    if skip < 0 or limit < 0:
+        raise ValueError("skip and limit must be >= 0")
+    cursor = request.args.get("after")
+    after = decode_cursor(cursor, *types) if cursor else None
+    return skip, limit, after, cursor is not None
+
+
+def paginate(items: list[dict], limit: int, keyset: bool, key) -> list | dict:
+    """
+    Shapes a page of serialized items for the response: a plain list in
+    offset mode, or the items with the cursor of the next page, which is
+    None once the last page was reached.
+    """
+    if not keyset:
+        return items
+    next_cursor = None
+    if items and len(items) == limit:
+        next_cursor = encode_cursor(key(items[-1]))
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,192 @@
+"""
+This module provides a debug mode that counts the SQL statements of every
+request and catches N+1 query patterns.
+
+Enable it with ``QUERY_DEBUG=true``. Each request then records the shape of
+every statement it runs (its SQL text with the bind placeholders of
+expanded ``IN`` lists collapsed). A shape that repeats
+``QUERY_REPEAT_THRESHOLD`` times or more in one request is logged as a
+likely N+1. Views may declare how many statements they may run with the
+``query_budget`` decorator; exceeding it raises ``QueryBudgetExceeded``
+in testing mode (so the test fails) or when ``QUERY_BUDGET_STRICT=true``,
+and is logged otherwise. The endpoints with the most statements per
+request are listed on standard error at shutdown.
+"""
+
+import atexit
+import os
+import re
+import sys
+import threading
+from collections import Counter
+from contextvars import ContextVar
+
+from flask import Flask, current_app, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+QUERY_DEBUG = os.environ.get("QUERY_DEBUG", "false").lower() in (
+    "1", "true", "yes"
+)
+QUERY_BUDGET_STRICT = os.environ.get(
+    "QUERY_BUDGET_STRICT", "false"
+).lower() in ("1", "true", "yes")
+QUERY_REPEAT_THRESHOLD = int(os.environ.get("QUERY_REPEAT_THRESHOLD", 3))
+REPORT_SIZE = 10
+
+_IN_LIST = re.compile(r"\((?:\s*(?:\?|%s|:\w+)\s*,)+\s*(?:\?|%s|:\w+)\s*\)")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """
+    Raised when a request runs more SQL statements than its budget.
+    """
+
+
+def query_budget(statements: int):
+    """
+    Decorator declaring the maximum number of SQL statements a view may
+    run per request. Only checked when ``QUERY_DEBUG`` is enabled.
+    """
+    def decorator(f):
+        f.query_budget = statements
+        return f
+    return decorator
+
+
+def statement_shape(statement: str) -> str:
+    """
+    Returns the statement with expanded ``IN`` lists collapsed, so the same
+    query with different list lengths has one shape.
+    """
+    return _IN_LIST.sub("(?...)", " ".join(statement.split()))
+
+
+class EndpointReport:
+    """
+    Statement counts of one endpoint across requests.
+    """
+    __slots__ = ("requests", "statements", "max_statements", "repeated")
+
+    def __init__(self):
+        self.requests = 0
+        self.statements = 0
+        self.max_statements = 0
+        self.repeated: Counter[str] = Counter()
+
+
+_shapes: ContextVar[Counter | None] = ContextVar(
+    "query_budget_shapes", default=None
+)
+_reports: dict[str, EndpointReport] = {}
+_reports_lock = threading.Lock()
+
+
+def _record_statement(conn, cursor, statement, parameters, context,
+                      executemany):
+    """
+    Records the shape of a statement run during a request.
+    """
+    shapes = _shapes.get()
+    if shapes is not None:
+        shapes[statement_shape(statement)] += 1
+
+
+def _start_request():
+    """
+    Starts counting the statements of a request.
+    """
+    _shapes.set(Counter())
+
+
+def _check_request(response):
+    """
+    Flags repeated statements and enforces the budget of the endpoint.
+    """
+    shapes = _shapes.get()
+    if shapes is None:
+        return response
+    _shapes.set(None)
+    total = sum(shapes.values())
+    endpoint = request.endpoint or "<unmatched>"
+    repeated = {
+        shape: count for shape, count in shapes.items()
+        if count >= QUERY_REPEAT_THRESHOLD
+    }
+    with _reports_lock:
+        report = _reports.get(endpoint)
+        if report is None:
+            report = _reports[endpoint] = EndpointReport()
+        report.requests += 1
+        report.statements += total
+        report.max_statements = max(report.max_statements, total)
+        report.repeated.update(repeated)
+    for shape, count in repeated.items():
+        current_app.logger.warning(
+            "%s ran the same statement %d times (possible N+1): %s",
+            endpoint, count, shape,
+        )
+    view = current_app.view_functions.get(request.endpoint)
+    budget = getattr(view, "query_budget", None)
+    if budget is not None and total > budget:
+        message = (
+            f"{endpoint} ran {total} SQL statements, "
+            f"its budget is {budget}"
+        )
+        if current_app.testing or QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(message)
+        current_app.logger.warning(message)
+    return response
+
+
+def _abort_request(exception=None):
+    """
+    Stops counting when a request ended without a response.
+    """
+    _shapes.set(None)
+
+
+def get_report() -> list[tuple[str, EndpointReport]]:
+    """
+    Returns the endpoints ordered by their worst statement count.
+    """
+    with _reports_lock:
+        return sorted(
+            _reports.items(),
+            key=lambda item: (item[1].max_statements, item[1].statements),
+            reverse=True,
+        )
+
+
+def print_report(file=None):
+    """
+    Prints the endpoints with the most statements per request.
+    """
+    report = get_report()[:REPORT_SIZE]
+    if not report:
+        return
+    file = file or sys.stderr
+    print("SQL statements per request (worst endpoints):", file=file)
+    for endpoint, stats in report:
+        print(
+            f"  {endpoint}: max {stats.max_statements}, "
+            f"avg {stats.statements / stats.requests:.1f} "
+            f"over {stats.requests} requests",
+            file=file,
+        )
+        for shape, count in stats.repeated.most_common(3):
+            print(f"    repeated {count}x: {shape[:200]}", file=file)
+
+
+def init_query_budget(app: Flask):
+    """
+    Registers the statement counters when ``QUERY_DEBUG`` is enabled.
+    """
+    if not QUERY_DEBUG:
+        return
+    app.before_request(_start_request)
+    app.after_request(_check_request)
+    app.teardown_request(_abort_request)
+    if not event.contains(Engine, "before_cursor_execute", _record_statement):
+        event.listen(Engine, "before_cursor_execute", _record_statement)
+        atexit.register(print_report)
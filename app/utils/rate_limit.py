@@ -0,0 +1,257 @@
+"""
+This module provides token bucket rate limiting for routes.
+
+Each limit gives every key (a client IP, a client IP and username) a
+bucket of ``burst`` tokens refilled at ``rate`` tokens per second; a
+request takes one token from each of its buckets, or none at all when one
+is empty, in which case it is rejected with 429 and ``Retry-After``.
+Limits are written as ``"<requests>/<seconds>"``, e.g.
+``LOGIN_LIMIT_PER_IP=20/60``.
+
+Buckets live in a bounded in-process LRU of ``RATE_LIMIT_MAX_KEYS``
+entries by default, so every check is O(1) and memory does not grow with
+the number of keys an attacker makes up. Each worker then limits on its
+own; set ``RATE_LIMIT_REDIS_URL`` (requires the optional ``redis``
+package) to share the buckets between workers.
+
+Client IPs are taken from the connection by default. Behind reverse
+proxies, set ``RATE_LIMIT_TRUSTED_PROXIES`` to the number of proxies that
+append to ``X-Forwarded-For``, so clients are told apart instead of all
+sharing the bucket of the proxy address.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable
+
+from flask import jsonify, request
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+
+RATE_LIMIT_ENABLED = os.environ.get(
+    "RATE_LIMIT_ENABLED", "true"
+).lower() in ("1", "true", "yes")
+RATE_LIMIT_MAX_KEYS = int(os.environ.get("RATE_LIMIT_MAX_KEYS", 100000))
+RATE_LIMIT_REDIS_URL = os.environ.get("RATE_LIMIT_REDIS_URL")
+RATE_LIMIT_TRUSTED_PROXIES = int(
+    os.environ.get("RATE_LIMIT_TRUSTED_PROXIES", 0)
+)
+
+TAKE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local levels = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local rate, burst = tonumber(ARGV[2 * i]), tonumber(ARGV[2 * i + 1])
+    local bucket = redis.call('HMGET', key, 'tokens', 'updated')
+    local tokens = tonumber(bucket[1]) or burst
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+    if tokens < 1 then
+        wait = math.max(wait, (1 - tokens) / rate)
+    end
+    levels[i] = tokens
+end
+for i, key in ipairs(KEYS) do
+    local rate, burst = tonumber(ARGV[2 * i]), tonumber(ARGV[2 * i + 1])
+    local tokens = levels[i]
+    if wait == 0 then
+        tokens = tokens - 1
+    end
+    redis.call('HSET', key, 'tokens', tostring(tokens),
+        'updated', tostring(now))
+    redis.call('PEXPIRE', key, math.ceil(burst / rate * 1000))
+end
+return tostring(wait)
+"""
+
+
+class Limit:
+    """
+    A token bucket limit: ``burst`` requests at once, refilled at
+    ``rate`` requests per second.
+    """
+    __slots__ = ("rate", "burst")
+
+    def __init__(self, rate: float, burst: int):
+        if rate <= 0 or burst < 1:
+            raise ValueError("A rate limit needs a positive rate and burst")
+        self.rate = rate
+        self.burst = burst
+
+    @classmethod
+    def parse(cls, value: str) -> "Limit":
+        """
+        Parses a ``"<requests>/<seconds>"`` limit.
+        """
+        requests, _, seconds = value.partition("/")
+        return cls(int(requests) / float(seconds or 1), int(requests))
+
+    def __repr__(self):
+        return f"<Limit(rate={self.rate}, burst={self.burst})>"
+
+
+class MemoryBuckets:
+    """
+    Thread-safe token buckets of this worker, keeping at most ``maxsize``
+    keys (the least recently used ones are evicted first).
+    """
+
+    def __init__(self, maxsize: int = RATE_LIMIT_MAX_KEYS):
+        self.maxsize = maxsize
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, requests: list[tuple[str, Limit]]) -> float:
+        """
+        Takes a token from the bucket of each ``(key, limit)`` pair, or
+        none when one of them is empty. Returns 0 when the tokens were
+        taken, otherwise the seconds until all buckets have one.
+        """
+        now = time.monotonic()
+        with self._lock:
+            levels = []
+            for key, limit in requests:
+                tokens, updated = self._buckets.pop(key, (limit.burst, now))
+                levels.append(
+                    min(limit.burst, tokens + (now - updated) * limit.rate)
+                )
+            wait = max(
+                (
+                    (1 - tokens) / limit.rate
+                    for tokens, (_, limit) in zip(levels, requests)
+                    if tokens < 1
+                ),
+                default=0.0,
+            )
+            taken = 0 if wait else 1
+            for tokens, (key, _) in zip(levels, requests):
+                self._buckets[key] = (tokens - taken, now)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        """
+        Drops every bucket.
+        """
+        with self._lock:
+            self._buckets.clear()
+
+
+class RedisBuckets:
+    """
+    Token buckets shared by every worker, kept in Redis hashes that expire
+    once they would be full again.
+    """
+
+    def __init__(self, url: str, prefix: str = "rate_limit:"):
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._take = self._client.register_script(TAKE_SCRIPT)
+
+    def take(self, requests: list[tuple[str, Limit]]) -> float:
+        """
+        Takes a token from the bucket of each ``(key, limit)`` pair, or
+        none when one of them is empty, in one atomic script. Returns 0
+        when the tokens were taken, otherwise the seconds until all buckets
+        have one.
+        """
+        args = [time.time()]
+        for _, limit in requests:
+            args += [limit.rate, limit.burst]
+        return float(self._take(
+            keys=[self.prefix + key for key, _ in requests], args=args,
+        ))
+
+    def clear(self):
+        """
+        Drops every bucket.
+        """
+        for key in self._client.scan_iter(f"{self.prefix}*"):
+            self._client.delete(key)
+
+
+def _buckets():
+    """
+    Returns the configured bucket store.
+    """
+    if RATE_LIMIT_REDIS_URL and redis is not None:
+        return RedisBuckets(RATE_LIMIT_REDIS_URL)
+    return MemoryBuckets()
+
+
+buckets = _buckets()
+
+
+def client_ip() -> str | None:
+    """
+    Keys a request by client address: the one ``RATE_LIMIT_TRUSTED_PROXIES``
+    hops back in ``X-Forwarded-For``, as seen by the outermost trusted
+    proxy, or the connection address when there is no trusted proxy or
+    the header has fewer hops.
+    """
+    if RATE_LIMIT_TRUSTED_PROXIES > 0:
+        hops = [
+            hop.strip() for hop in
+            request.headers.get("X-Forwarded-For", "").split(",")
+            if hop.strip()
+        ]
+        if len(hops) >= RATE_LIMIT_TRUSTED_PROXIES:
+            return hops[-RATE_LIMIT_TRUSTED_PROXIES]
+    return request.remote_addr
+
+
+def json_username() -> str | None:
+    """
+    Keys a request by the username of its JSON body.
+    """
+    body = request.get_json(silent=True)
+    username = body.get("username") if isinstance(body, dict) else None
+    return username if isinstance(username, str) else None
+
+
+def client_ip_and_username() -> str | None:
+    """
+    Keys a request by client address and the username of its JSON body,
+    so guessing the password of a user from one address does not lock the
+    user out from the others.
+    """
+    username = json_username()
+    if username is None:
+        return None
+    return f"{client_ip()}:{username}"
+
+
+def rate_limited(name: str, *limits: tuple[Callable[[], str | None], Limit]):
+    """
+    Decorator that rate limits a route by each ``(key_function, limit)``
+    pair. Requests for which a key function returns None are not limited
+    by that pair; a rejected request takes no token from any bucket.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if RATE_LIMIT_ENABLED:
+                requests = []
+                for key_function, limit in limits:
+                    key = key_function()
+                    if key is not None:
+                        requests.append(
+                            (f"{name}:{key_function.__name__}:{key}", limit)
+                        )
+                wait = buckets.take(requests) if requests else 0.0
+                if wait:
+                    return jsonify({
+                        "message": "Too many requests, please retry later"
+                    }), 429, {"Retry-After": str(math.ceil(wait))}
+            return f(*args, **kwargs)
+        return decorated
+    return decorator
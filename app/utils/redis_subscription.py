@@ -0,0 +1,114 @@
+"""
+This module provides the Redis channel through which the per-worker caches
+hear about changes made on other workers.
+
+Connecting and listening happen on a background thread started on first
+use in each process, so a request never waits on Redis or fails because of
+it. While Redis is unreachable, ``connected`` is False, messages published
+locally are dropped with a warning and the caches fall back to local-only
+behaviour; the thread reconnects every ``REDIS_RETRY_SECONDS`` and calls
+``on_connect`` again, so a cache can resynchronize the state it missed.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Callable
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+
+REDIS_RETRY_SECONDS = float(os.environ.get("REDIS_RETRY_SECONDS", 5))
+
+logger = logging.getLogger(__name__)
+
+
+class RedisSubscription:
+    """
+    Subscription to one Redis channel, kept alive by a background thread.
+    ``on_message`` is called with each message of the channel as a string,
+    ``on_connect`` with the client after every (re)connection.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        channel: str,
+        on_message: Callable[[str], None],
+        on_connect: Callable | None = None
+    ):
+        self.url = url
+        self.channel = channel
+        self.on_message = on_message
+        self.on_connect = on_connect
+        self.client = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def connected(self) -> bool:
+        """
+        Tells whether the channel is currently subscribed.
+        """
+        return self.client is not None
+
+    def start(self):
+        """
+        Starts the background thread, once per process: a thread started
+        before a fork does not run in the child.
+        """
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self.client = None
+            threading.Thread(
+                target=self._run, name=f"redis:{self.channel}", daemon=True
+            ).start()
+
+    def publish(self, message: str) -> bool:
+        """
+        Publishes a message to the other workers. Returns False, after
+        logging the error, when Redis is unreachable.
+        """
+        client = self.client
+        if client is None:
+            logger.warning(
+                "Redis is unreachable, %s not published", self.channel
+            )
+            return False
+        try:
+            client.publish(self.channel, message)
+        except redis.RedisError as e:
+            logger.warning("Could not publish to %s: %s", self.channel, e)
+            return False
+        return True
+
+    def _run(self):
+        """
+        Subscribes and dispatches messages, reconnecting after errors.
+        """
+        while True:
+            try:
+                client = redis.Redis.from_url(self.url)
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                if self.on_connect is not None:
+                    self.on_connect(client)
+                self.client = client
+                logger.info("Subscribed to %s", self.channel)
+                for message in pubsub.listen():
+                    self.on_message(message["data"].decode())
+            except redis.RedisError as e:
+                logger.warning(
+                    "Redis channel %s is unavailable, caching locally only "
+                    "and retrying in %ss: %s",
+                    self.channel, REDIS_RETRY_SECONDS, e,
+                )
+            self.client = None
+            time.sleep(REDIS_RETRY_SECONDS)
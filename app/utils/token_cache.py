@@ -0,0 +1,193 @@
+"""
+This module provides a bounded cache of verified access tokens and the
+list of revoked (logged out) tokens.
+
+Verifying a JWT parses it, decodes its base64 parts, checks its HMAC and
+validates its claims, and a client sends the same token with every call.
+Once a token has been verified, its username is cached under the exact
+token string until the token expires, so later requests with it cost a
+dict lookup. At most ``TOKEN_CACHE_SIZE`` tokens are kept, the oldest
+cached first out: tokens are issued with the same lifetime, so the oldest
+one is also the first to expire.
+
+Revoked tokens are rejected until they expire, after which the signature
+check rejects them anyway. With several workers, set
+``TOKEN_CACHE_REDIS_URL`` (requires the optional ``redis`` package) to
+share revocations with every worker, including workers started later;
+otherwise a token is only revoked on the worker that served the logout.
+Redis is reached from a background thread (see ``RedisSubscription``):
+while it is unreachable, revocations only apply locally, and on every
+(re)connection the worker stores its own revocations and loads the others.
+"""
+
+import heapq
+import logging
+import os
+import threading
+import time
+
+from app.utils.redis_subscription import RedisSubscription, redis
+
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", 4096))
+TOKEN_CACHE_REDIS_URL = os.environ.get("TOKEN_CACHE_REDIS_URL")
+REVOCATION_CHANNEL = "token_cache:revoke"
+REVOKED_PREFIX = "token_cache:revoked:"
+
+logger = logging.getLogger(__name__)
+
+
+class TokenCache:
+    """
+    Thread-safe mapping of verified token to username with a maximum size,
+    and the revoked tokens that have not expired yet.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = TOKEN_CACHE_SIZE,
+        redis_url: str | None = TOKEN_CACHE_REDIS_URL
+    ):
+        self.maxsize = maxsize
+        self._entries: dict[str, tuple[float, str]] = {}
+        self._revoked: dict[str, float] = {}
+        self._revoked_expiry: list[tuple[float, str]] = []
+        self._lock = threading.Lock()
+        self._subscription = None
+        if redis_url is not None and redis is not None:
+            self._subscription = RedisSubscription(
+                redis_url, REVOCATION_CHANNEL,
+                lambda data: self._add_revoked(*_parse_revocation(data)),
+                on_connect=self._synchronize,
+            )
+
+    def get(self, token: str) -> str | None:
+        """
+        Returns the username of a verified token, if cached and not
+        expired. Revoked tokens are never cached.
+        """
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        expires_at, username = entry
+        if expires_at <= time.time():
+            with self._lock:
+                self._entries.pop(token, None)
+            return None
+        return username
+
+    def set(self, token: str, username: str, expires_at: float):
+        """
+        Caches the username of a verified token until ``expires_at`` (a
+        UNIX timestamp), evicting the oldest entry when the cache is full.
+        """
+        if self.maxsize <= 0:
+            return
+        self._subscribe()
+        with self._lock:
+            if token in self._revoked:
+                return
+            self._entries[token] = (expires_at, username)
+            while len(self._entries) > self.maxsize:
+                del self._entries[next(iter(self._entries))]
+
+    def is_revoked(self, token: str) -> bool:
+        """
+        Tells whether a token was revoked.
+        """
+        self._subscribe()
+        return token in self._revoked
+
+    def revoke(self, token: str, expires_at: float):
+        """
+        Rejects a token until ``expires_at`` on this worker and, when
+        configured, on every other worker.
+        """
+        self._add_revoked(token, expires_at)
+        if not self._subscribe():
+            return
+        client = self._subscription.client
+        if client is None:
+            # Stored by _synchronize once Redis is reachable again.
+            logger.warning("Redis is unreachable, token revoked locally")
+            return
+        try:
+            _store_revocation(client, token, expires_at)
+        except redis.RedisError as e:
+            logger.warning("Could not store a revocation: %s", e)
+            return
+        self._subscription.publish(f"{expires_at} {token}")
+
+    def clear(self):
+        """
+        Drops every cached and revoked token of this worker.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._revoked.clear()
+            self._revoked_expiry.clear()
+
+    def _add_revoked(self, token: str, expires_at: float):
+        """
+        Records a revoked token and forgets the revoked tokens that have
+        expired since.
+        """
+        now = time.time()
+        with self._lock:
+            self._entries.pop(token, None)
+            if expires_at > now:
+                self._revoked[token] = expires_at
+                heapq.heappush(self._revoked_expiry, (expires_at, token))
+            while self._revoked_expiry and self._revoked_expiry[0][0] <= now:
+                _, expired = heapq.heappop(self._revoked_expiry)
+                if self._revoked.get(expired, now + 1) <= now:
+                    del self._revoked[expired]
+
+    def _subscribe(self) -> bool:
+        """
+        Starts listening for revocations from other workers on first use.
+        Returns whether Redis is configured.
+        """
+        if self._subscription is None:
+            return False
+        self._subscription.start()
+        return True
+
+    def _synchronize(self, client):
+        """
+        Stores the revocations of this worker in Redis and loads those of
+        the other workers, after every connection to Redis.
+        """
+        now = time.time()
+        with self._lock:
+            revoked = [
+                (token, expires_at)
+                for token, expires_at in self._revoked.items()
+                if expires_at > now
+            ]
+        for token, expires_at in revoked:
+            _store_revocation(client, token, expires_at)
+        for key in client.scan_iter(f"{REVOKED_PREFIX}*"):
+            value = client.get(key)
+            if value is not None:
+                self._add_revoked(
+                    key.decode()[len(REVOKED_PREFIX):], float(value)
+                )
+
+
+def _store_revocation(client, token: str, expires_at: float):
+    """
+    Stores a revoked token in Redis until it expires.
+    """
+    ttl = max(1, int(expires_at - time.time()) + 1)
+    client.set(REVOKED_PREFIX + token, expires_at, ex=ttl)
+
+
+def _parse_revocation(data: str) -> tuple[str, float]:
+    """
+    Parses a ``"<expires_at> <token>"`` revocation message.
+    """
+    expires_at, token = data.split(" ", 1)
+    return token, float(expires_at)
+
+
+token_cache = TokenCache()
@@ -0,0 +1,158 @@
+"""
+This module provides a bounded LRU+TTL cache of authenticated users.
+
+Resolving the user behind a token costs a SELECT on every protected
+request. The cache keeps a small detached snapshot of each recently seen
+user, keyed by username, for ``USER_CACHE_TTL`` seconds. Snapshots are
+dropped when the user is updated or deleted through the service layer.
+
+With several workers, set ``USER_CACHE_REDIS_URL`` (requires the optional
+``redis`` package) to broadcast invalidations to every worker; otherwise
+other workers see a change once their entry expires. While Redis is
+unreachable, entries live at most ``USER_CACHE_FALLBACK_TTL`` seconds.
+
+Every invalidation bumps a generation counter. A reader records it before
+loading a user from the database and passes it to ``set``, which drops the
+snapshot if an invalidation happened in between: the snapshot may have
+been read before the change.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from app.utils.redis_subscription import RedisSubscription, redis
+
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", 1024))
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", 60))
+USER_CACHE_FALLBACK_TTL = float(os.environ.get("USER_CACHE_FALLBACK_TTL", 5))
+USER_CACHE_REDIS_URL = os.environ.get("USER_CACHE_REDIS_URL")
+INVALIDATION_CHANNEL = "user_cache:invalidate"
+
+
+class UserSnapshot:
+    """
+    Read-only copy of the User fields needed to authorize a request.
+    It is not bound to any database session.
+    """
+    __slots__ = ("id", "username", "is_admin")
+
+    def __init__(self, id: int, username: str, is_admin: bool):
+        self.id = id
+        self.username = username
+        self.is_admin = bool(is_admin)
+
+    @classmethod
+    def from_user(cls, user) -> "UserSnapshot":
+        """
+        Copies the relevant fields of a User model instance.
+        """
+        return cls(user.id, user.username, user.is_admin)
+
+    def __repr__(self):
+        return (f"<UserSnapshot(id={self.id}, username='{self.username}', "
+                f"is_admin={self.is_admin})>")
+
+
+class UserCache:
+    """
+    Thread-safe mapping of username to UserSnapshot with a maximum size
+    (least recently used entries are evicted first) and a time to live.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = USER_CACHE_SIZE,
+        ttl: float = USER_CACHE_TTL,
+        redis_url: str | None = USER_CACHE_REDIS_URL
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, UserSnapshot]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._subscription = None
+        if redis_url is not None and redis is not None:
+            self._subscription = RedisSubscription(
+                redis_url, INVALIDATION_CHANNEL, self.discard,
+                on_connect=lambda client: self.clear(),
+            )
+
+    def generation(self) -> int:
+        """
+        Returns the current generation, to pass to ``set``.
+        """
+        return self._generation
+
+    def get(self, username: str) -> UserSnapshot | None:
+        """
+        Returns the cached snapshot of a user, if present and fresh.
+        """
+        if self._subscription is not None:
+            self._subscription.start()
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                return None
+            expires_at, snapshot = entry
+            if expires_at < time.monotonic():
+                del self._entries[username]
+                return None
+            self._entries.move_to_end(username)
+            return snapshot
+
+    def set(self, snapshot: UserSnapshot, generation: int | None = None):
+        """
+        Stores the snapshot of a user, evicting the least recently used
+        entry when the cache is full. The snapshot is dropped if the cache
+        was invalidated since ``generation`` was read.
+        """
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl
+        if self._subscription is not None and \
+                not self._subscription.connected:
+            ttl = min(ttl, USER_CACHE_FALLBACK_TTL)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[snapshot.username] = (
+                time.monotonic() + ttl, snapshot
+            )
+            self._entries.move_to_end(snapshot.username)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, username: str):
+        """
+        Drops a user from this worker's cache only.
+        """
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(username, None)
+
+    def invalidate(self, *usernames: str):
+        """
+        Drops users from the cache of this worker and, when configured,
+        of every other worker.
+        """
+        for username in usernames:
+            self.discard(username)
+        if self._subscription is not None:
+            self._subscription.start()
+            for username in usernames:
+                self._subscription.publish(username)
+
+    def clear(self):
+        """
+        Drops every cached user.
+        """
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+user_cache = UserCache()
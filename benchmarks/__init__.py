@@ -0,0 +1,3 @@
+"""
+This package contains standalone benchmarks for the booking system.
+"""
@@ -0,0 +1,221 @@
+"""
+Throughput of the WSGI and ASGI serving modes at high concurrency.
+
+Generates a seeded data set (see ``benchmarks.data``) in a scratch
+database, then serves the application in each mode (see
+``benchmarks.server``), opens ``--connections`` keep-alive connections and
+has each of them request read endpoints in turn for ``--duration``
+seconds. Reports requests per second, p50/p99 latency and failed requests
+per mode.
+
+The gap between the modes depends on how long requests wait on the
+database: a local SQLite file answers from the page cache, so run it
+against a networked database (the ASGI mode needs its asyncio driver,
+e.g. ``aiomysql``) to see the effect of not holding a thread per waiting
+request. The load generator shares the machine with the server; give it
+its own cores or host for absolute numbers.
+
+    python -m benchmarks.asgi_throughput --connections 1000 --duration 30
+    python -m benchmarks.asgi_throughput \\
+        --database mysql+mysqlconnector://user:password@db/bench
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.server import MODES, serve
+from benchmarks.suite import percentile
+
+
+class Load:
+    """
+    Counters shared by the connections of one run.
+    """
+
+    def __init__(self):
+        self.latencies: list[float] = []
+        self.errors = 0
+        self.recording = False
+
+
+async def _read_response(reader: asyncio.StreamReader) -> int:
+    """
+    Reads one HTTP/1.1 response and returns its status code.
+    """
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    if headers.get("transfer-encoding") == "chunked":
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(int(headers.get("content-length", 0)))
+    return status
+
+
+async def _connection(port: int, requests: list[bytes], offset: int,
+                      load: Load, stop_at: float):
+    """
+    Sends requests over one keep-alive connection until ``stop_at``,
+    reconnecting after failures.
+    """
+    index = offset
+    writer = None
+    while time.monotonic() < stop_at:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(
+                    "127.0.0.1", port
+                )
+            began = time.perf_counter()
+            writer.write(requests[index % len(requests)])
+            status = await _read_response(reader)
+            elapsed = time.perf_counter() - began
+            if load.recording:
+                if status == 200:
+                    load.latencies.append(elapsed)
+                else:
+                    load.errors += 1
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            if load.recording:
+                load.errors += 1
+            if writer is not None:
+                writer.close()
+            writer = None
+            await asyncio.sleep(0.01)
+        index += 1
+    if writer is not None:
+        writer.close()
+
+
+async def run_load(port: int, paths: list[str], token: str,
+                   connections: int, warmup: float, duration: float) -> dict:
+    """
+    Runs ``connections`` clients and summarizes the requests completed
+    after the warmup.
+    """
+    requests = [
+        (f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n"
+         f"Authorization: Bearer {token}\r\n\r\n").encode()
+        for path in paths
+    ]
+    load = Load()
+    stop_at = time.monotonic() + warmup + duration
+    clients = [
+        asyncio.create_task(
+            _connection(port, requests, index, load, stop_at)
+        )
+        for index in range(connections)
+    ]
+    await asyncio.sleep(warmup)
+    load.recording = True
+    began = time.perf_counter()
+    await asyncio.gather(*clients)
+    elapsed = time.perf_counter() - began
+    latencies = sorted(load.latencies)
+    if not latencies:
+        return {"requests": 0, "errors": load.errors}
+    return {
+        "requests": len(latencies),
+        "errors": load.errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database", help="SQLAlchemy URL of a scratch "
+                        "database (default: a temporary SQLite file)")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--rooms", type=int, default=100)
+    parser.add_argument("--bookings", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--warmup", type=float, default=5)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="server processes per mode")
+    parser.add_argument("--threads", type=int, default=32,
+                        help="threads per WSGI worker")
+    parser.add_argument("--port", type=int, default=8732)
+    parser.add_argument("--output", help="write the results to this file")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="booking-bench-")
+    os.environ["DATABASE_URL"] = args.database or (
+        f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    )
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+    from app.utils.database import Base, SessionLocal, get_engine, init_db
+    from app.main import create_app
+    from app.models import Booking
+    from benchmarks.data import generate
+
+    engine = get_engine()
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+    db = SessionLocal()
+    dataset = generate(db, args.users, args.rooms, args.bookings, args.seed)
+    booking = db.query(Booking).order_by(Booking.id).first()
+    db.close()
+    engine.dispose()
+
+    token = create_app().test_client().post("/api/auth/login", json={
+        "username": dataset.admin_username, "password": dataset.password,
+    }).json["access_token"]
+    day = booking.start_time.date().isoformat()
+    paths = [
+        f"/api/rooms/{booking.room_id}",
+        f"/api/bookings/{booking.id}",
+        f"/api/bookings/room/{booking.room_id}?limit=20",
+        f"/api/rooms/available?start={day}T10:00:00&end={day}T11:00:00"
+        "&limit=20",
+    ]
+
+    results = {}
+    print(f"{'mode':<6} {'connections':>11} {'requests':>9} {'errors':>7} "
+          f"{'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for mode in args.modes.split(","):
+        with serve(mode, args.port, args.workers, args.threads):
+            result = asyncio.run(run_load(
+                args.port, paths, token, args.connections, args.warmup,
+                args.duration,
+            ))
+        results[mode] = result
+        print(f"{mode:<6} {args.connections:>11} {result['requests']:>9} "
+              f"{result['errors']:>7} {result.get('throughput_rps', 0):>9} "
+              f"{result.get('p50_ms', 0):>9} {result.get('p99_ms', 0):>9}")
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({
+                "meta": {
+                    "backend": engine.dialect.name,
+                    "connections": args.connections,
+                    "duration": args.duration,
+                    "workers": args.workers,
+                    "threads": args.threads,
+                },
+                "results": results,
+            }, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
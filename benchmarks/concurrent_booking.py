@@ -0,0 +1,171 @@
+"""
+Stress test for concurrent booking creation.
+
+Starts ``--threads`` writers, each with its own session, that keep trying
+to book random half hour slots through ``create_booking``. In the
+``shared`` scenario all writers compete for the same few rooms and slots
+so conflicts are frequent; in the ``separate`` scenario every writer has
+its own room, which shows whether writers on different rooms run in
+parallel. After each scenario the bookings are checked for overlaps and
+the run fails if a single double booking exists.
+
+Point ``DATABASE_URL`` at a scratch database before running, the test
+creates its own user and rooms and removes them afterwards. The same
+scenarios run in the test suite (``tests/test_concurrent_booking.py``):
+
+    python -m benchmarks.concurrent_booking --threads 16 --attempts 200
+"""
+
+import argparse
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, delete, func
+from sqlalchemy.orm import aliased
+
+from app.utils.database import SessionLocal, get_pool_status, init_db
+from app.models import Booking, MeetingRoom, User
+from app.schemas import BookingCreate
+from app.services import ConcurrentWriteError, create_booking
+
+PREFIX = "bench_concurrent_"
+SLOT = timedelta(minutes=30)
+EPOCH = datetime(2030, 1, 1)
+
+
+def writer(user_id, room_ids, slots, attempts, seed, counts, lock):
+    """
+    Tries ``attempts`` bookings on random rooms and slots.
+    """
+    rng = random.Random(seed)
+    db = SessionLocal()
+    created = conflicts = errors = 0
+    try:
+        for _ in range(attempts):
+            slot = rng.randrange(slots)
+            start = EPOCH + SLOT * slot + timedelta(minutes=rng.choice(
+                (0, 10, 20)
+            ))
+            booking = BookingCreate(
+                user_id=user_id,
+                room_id=rng.choice(room_ids),
+                start_time=start,
+                end_time=start + SLOT,
+            )
+            try:
+                create_booking(db, booking)
+                created += 1
+            except ValueError as e:
+                db.rollback()
+                if isinstance(e, ConcurrentWriteError) or (
+                    "not available" in str(e)
+                ):
+                    conflicts += 1
+                else:
+                    errors += 1
+            except Exception:
+                db.rollback()
+                errors += 1
+    finally:
+        db.close()
+    with lock:
+        counts["created"] += created
+        counts["conflicts"] += conflicts
+        counts["errors"] += errors
+
+
+def count_double_bookings(db, room_ids):
+    """
+    Counts pairs of overlapping bookings in the given rooms.
+    """
+    other = aliased(Booking)
+    return db.query(func.count()).select_from(Booking).join(
+        other,
+        and_(
+            other.room_id == Booking.room_id,
+            other.id > Booking.id,
+            other.start_time < Booking.end_time,
+            other.end_time > Booking.start_time,
+        ),
+    ).filter(Booking.room_id.in_(room_ids)).scalar()
+
+
+def run(scenario, user_id, rooms, args):
+    """
+    Runs one scenario and returns its counters.
+    """
+    counts = {"created": 0, "conflicts": 0, "errors": 0}
+    lock = threading.Lock()
+    threads = []
+    for index in range(args.threads):
+        if scenario == "shared":
+            room_ids = rooms[:args.shared_rooms]
+        else:
+            room_ids = [rooms[index]]
+        threads.append(threading.Thread(target=writer, args=(
+            user_id, room_ids, args.slots, args.attempts,
+            args.seed + index, counts, lock,
+        )))
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counts["seconds"] = time.perf_counter() - began
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--attempts", type=int, default=200)
+    parser.add_argument("--shared-rooms", type=int, default=2)
+    parser.add_argument("--slots", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    user = User(username=f"{PREFIX}user", password="-", is_admin=False)
+    rooms = [
+        MeetingRoom(name=f"{PREFIX}{index}", capacity=1)
+        for index in range(max(args.threads, args.shared_rooms))
+    ]
+    db.add_all([user, *rooms])
+    db.commit()
+    room_ids = [room.id for room in rooms]
+    failed = False
+    try:
+        print(f"{'scenario':<10} {'attempts':>9} {'created':>8} "
+              f"{'conflicts':>10} {'errors':>7} {'attempts/s':>11} "
+              f"{'double':>7}")
+        for scenario in ("shared", "separate"):
+            counts = run(scenario, user.id, room_ids, args)
+            double = count_double_bookings(db, room_ids)
+            db.rollback()
+            failed |= double > 0
+            attempts = args.threads * args.attempts
+            print(f"{scenario:<10} {attempts:>9} {counts['created']:>8} "
+                  f"{counts['conflicts']:>10} {counts['errors']:>7} "
+                  f"{attempts / counts['seconds']:>11.1f} {double:>7}")
+            db.execute(delete(Booking).where(Booking.room_id.in_(room_ids)))
+            db.commit()
+        pool = get_pool_status()
+        print(f"pool checkouts: {pool['checkouts']}, "
+              f"max checkout wait: {pool['wait_max_ms']} ms")
+    finally:
+        db.rollback()
+        db.execute(delete(Booking).where(Booking.room_id.in_(room_ids)))
+        db.execute(delete(MeetingRoom).where(MeetingRoom.id.in_(room_ids)))
+        db.execute(delete(User).where(User.id == user.id))
+        db.commit()
+        db.close()
+    if failed:
+        sys.exit("Double bookings found")
+
+
+if __name__ == "__main__":
+    main()
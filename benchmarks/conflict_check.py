@@ -0,0 +1,124 @@
+"""
+Benchmark for the room conflict check.
+
+Seeds a single room with a growing number of bookings and measures the
+latency of ``is_room_available`` against the previous three-branch OR
+query that loaded every conflicting row. Point ``DATABASE_URL`` at a
+scratch database before running, the benchmark creates its own user and
+room and removes them afterwards:
+
+    python -m benchmarks.conflict_check --sizes 1000 10000 100000 1000000
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, delete, insert, or_
+
+from app.utils.database import SessionLocal, init_db
+from app.models import Booking, MeetingRoom, User
+from app.services.booking import is_room_available
+
+SLOT = timedelta(minutes=30)
+EPOCH = datetime(2030, 1, 1)
+
+
+def legacy_is_room_available(db, room_id, start_time, end_time):
+    """
+    The conflict check as it was before the EXISTS probe.
+    """
+    query = db.query(Booking).filter(
+        and_(
+            Booking.room_id == room_id,
+            or_(
+                and_(Booking.start_time < end_time,
+                     Booking.end_time > start_time),
+                and_(Booking.start_time >= start_time,
+                     Booking.start_time < end_time),
+                and_(Booking.end_time > start_time,
+                     Booking.end_time <= end_time)
+            )
+        )
+    )
+    return not query.all()
+
+
+def seed(db, room_id, user_id, start, count, chunk=10000):
+    """
+    Appends ``count`` back-to-back half hour bookings from slot ``start``.
+    """
+    for offset in range(start, start + count, chunk):
+        rows = [
+            {
+                "user_id": user_id,
+                "room_id": room_id,
+                "start_time": EPOCH + SLOT * slot,
+                "end_time": EPOCH + SLOT * (slot + 1),
+            }
+            for slot in range(offset, min(offset + chunk, start + count))
+        ]
+        db.execute(insert(Booking), rows)
+        db.commit()
+
+
+def measure(db, check, room_id, total, probes):
+    """
+    Returns per-probe latencies in milliseconds for random probe slots.
+    """
+    latencies = []
+    for _ in range(probes):
+        slot = random.randrange(total * 2)
+        start = EPOCH + SLOT * slot + timedelta(minutes=10)
+        began = time.perf_counter()
+        check(db, room_id, start, start + SLOT)
+        latencies.append((time.perf_counter() - began) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+",
+        default=[1000, 10000, 100000, 1000000],
+    )
+    parser.add_argument("--probes", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    init_db()
+    db = SessionLocal()
+    user = User(username="bench_conflict_user", password="-", is_admin=False)
+    room = MeetingRoom(name="bench_conflict_room", capacity=1)
+    db.add_all([user, room])
+    db.commit()
+    try:
+        seeded = 0
+        print(f"{'bookings':>10} {'exists p50':>11} {'exists p99':>11} "
+              f"{'legacy p50':>11} {'legacy p99':>11}  (ms)")
+        for size in sorted(args.sizes):
+            seed(db, room.id, user.id, seeded, size - seeded)
+            seeded = size
+            row = [size]
+            for check in (is_room_available, legacy_is_room_available):
+                latencies = sorted(
+                    measure(db, check, room.id, size, args.probes)
+                )
+                row.append(statistics.median(latencies))
+                row.append(latencies[int(len(latencies) * 0.99) - 1])
+            print("{:>10} {:>11.3f} {:>11.3f} {:>11.3f} {:>11.3f}"
+                  .format(*row))
+    finally:
+        db.rollback()
+        db.execute(delete(Booking).where(Booking.room_id == room.id))
+        db.delete(room)
+        db.delete(user)
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
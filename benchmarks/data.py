@@ -0,0 +1,163 @@
+"""
+Seeded synthetic data for the benchmark suite.
+
+``generate`` fills an empty database with users, meeting rooms and
+non-overlapping bookings whose distribution resembles real usage: most
+bookings fall on weekdays during office hours with peaks in the late
+morning and early afternoon, last 30 minutes to 2 hours, and a few
+popular rooms and users account for a large share of them. Half of the
+bookings are in the past and half in the upcoming weeks. The same seed
+always produces the same data relative to the current day.
+"""
+
+import random
+from itertools import accumulate
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta, timezone
+
+from sqlalchemy import insert
+
+from app.models import Booking, MeetingRoom, User
+from app.utils.hashing import Hasher
+
+ADMIN_USERNAME = "bench_admin"
+PASSWORD = "bench-password"
+
+CAPACITIES = (2, 4, 4, 6, 6, 8, 10, 12, 20)
+DURATIONS = ((30, 0.3), (60, 0.4), (90, 0.15), (120, 0.15))
+START_HOURS = (
+    (8, 0.04), (9, 0.12), (10, 0.18), (11, 0.14), (12, 0.05),
+    (13, 0.12), (14, 0.15), (15, 0.11), (16, 0.07), (17, 0.02),
+)
+WEEKEND_WEIGHT = 0.1
+BUSIEST_ROOM_DAY = 4
+INSERT_CHUNK = 5000
+
+
+@dataclass
+class Dataset:
+    """
+    Describes generated data: the admin's credentials and the time
+    window holding the bookings.
+    """
+    users: int
+    rooms: int
+    bookings: int
+    seed: int
+    window_start: datetime
+    window_end: datetime
+    admin_username: str = ADMIN_USERNAME
+    password: str = PASSWORD
+
+
+class _Weighted:
+    """
+    Picks values at random according to their weights.
+    """
+
+    def __init__(self, values, weights):
+        self.values = list(values)
+        self.cum_weights = list(accumulate(weights))
+
+    def pick(self, rng: random.Random):
+        """
+        Returns one value.
+        """
+        return rng.choices(self.values, cum_weights=self.cum_weights)[0]
+
+    @classmethod
+    def of(cls, pairs) -> "_Weighted":
+        """
+        Builds a picker from (value, weight) pairs.
+        """
+        values, weights = zip(*pairs)
+        return cls(values, weights)
+
+
+def _insert(db, model, rows):
+    """
+    Inserts rows in chunks with executemany statements.
+    """
+    for offset in range(0, len(rows), INSERT_CHUNK):
+        db.execute(insert(model), rows[offset:offset + INSERT_CHUNK])
+
+
+def generate(db, users: int, rooms: int, bookings: int, seed: int = 42):
+    """
+    Generates the data set into an empty database and returns a Dataset.
+    The first user is an administrator; all users share one password.
+    """
+    rng = random.Random(seed)
+    hashed = Hasher.get_password_hash(PASSWORD)
+    _insert(db, User, [
+        {
+            "username": ADMIN_USERNAME if index == 0 else f"user{index:06d}",
+            "password": hashed,
+            "is_admin": index == 0,
+        }
+        for index in range(users)
+    ])
+    _insert(db, MeetingRoom, [
+        {
+            "name": f"Room {index:04d}",
+            "capacity": rng.choice(CAPACITIES),
+            "description": f"Floor {index % 12}",
+        }
+        for index in range(rooms)
+    ])
+    user_ids = [user_id for user_id, in db.query(User.id).order_by(User.id)]
+    room_ids = [
+        room_id for room_id, in db.query(MeetingRoom.id).order_by(
+            MeetingRoom.id
+        )
+    ]
+
+    room_weights = [1 / (rank + 1) ** 0.3 for rank in range(len(room_ids))]
+    busiest_share = room_weights[0] / sum(room_weights)
+    days = max(14, int(bookings * busiest_share / BUSIEST_ROOM_DAY * 1.4))
+    today = datetime.now(timezone.utc).replace(tzinfo=None).date()
+    first_day = today - timedelta(days=days // 2)
+    all_days = [first_day + timedelta(days=offset) for offset in range(days)]
+    pick_room = _Weighted(room_ids, room_weights)
+    pick_user = _Weighted(
+        user_ids, [1 / (rank + 1) ** 0.7 for rank in range(len(user_ids))]
+    )
+    pick_day = _Weighted(all_days, [
+        WEEKEND_WEIGHT if day.weekday() >= 5 else 1.0 for day in all_days
+    ])
+    pick_hour = _Weighted.of(START_HOURS)
+    pick_duration = _Weighted.of(DURATIONS)
+
+    taken: dict[tuple[int, object], list[tuple[datetime, datetime]]] = {}
+    rows = []
+    attempts = 0
+    while len(rows) < bookings and attempts < bookings * 20:
+        attempts += 1
+        room_id = pick_room.pick(rng)
+        day = pick_day.pick(rng)
+        start = datetime.combine(day, time(pick_hour.pick(rng))) + timedelta(
+            minutes=15 * rng.randrange(4)
+        )
+        end = start + timedelta(minutes=pick_duration.pick(rng))
+        slots = taken.setdefault((room_id, day), [])
+        if any(start < other_end and end > other_start
+               for other_start, other_end in slots):
+            continue
+        slots.append((start, end))
+        rows.append({
+            "user_id": pick_user.pick(rng),
+            "room_id": room_id,
+            "start_time": start,
+            "end_time": end,
+        })
+    _insert(db, Booking, rows)
+    db.commit()
+    window_start = datetime.combine(first_day, time())
+    return Dataset(
+        users=users,
+        rooms=rooms,
+        bookings=len(rows),
+        seed=seed,
+        window_start=window_start,
+        window_end=window_start + timedelta(days=days),
+    )
@@ -0,0 +1,128 @@
+"""
+Cost of the polled list endpoints per poll.
+
+Generates a seeded data set (see ``benchmarks.data``) in a scratch
+database, then polls the room catalog and the booking list of the user
+with the most bookings the way kiosks do, in four ways: a plain request,
+with gzip or brotli accepted, and revalidating with ``If-None-Match``.
+Reports the response body bytes, the CPU time and the SQL statements per
+poll. Brotli is skipped unless the ``brotli`` package is installed.
+
+    python -m benchmarks.polling --rooms 200 --bookings 50000 --polls 500
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database", help="SQLAlchemy URL of a scratch "
+                        "database (default: a temporary SQLite file)")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--rooms", type=int, default=200)
+    parser.add_argument("--bookings", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--polls", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=100,
+                        help="items per polled page")
+    parser.add_argument("--output", help="write the results to this file")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="booking-bench-")
+    os.environ["DATABASE_URL"] = args.database or (
+        f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    )
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+    from sqlalchemy import event, func
+    from sqlalchemy.engine import Engine
+
+    from app.utils.database import Base, SessionLocal, get_engine, init_db
+    from app.main import create_app
+    from app.models import Booking
+    from app.utils.compression import brotli
+    from benchmarks.data import generate
+
+    engine = get_engine()
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+    db = SessionLocal()
+    dataset = generate(db, args.users, args.rooms, args.bookings, args.seed)
+    user_id = db.query(Booking.user_id).group_by(Booking.user_id).order_by(
+        func.count().desc()
+    ).limit(1).scalar()
+    db.close()
+
+    client = create_app().test_client()
+    token = client.post("/api/auth/login", json={
+        "username": dataset.admin_username, "password": dataset.password,
+    }).json["access_token"]
+    auth = {"Authorization": f"Bearer {token}"}
+
+    statements = [0]
+
+    def count(*_):
+        statements[0] += 1
+
+    event.listen(Engine, "before_cursor_execute", count)
+
+    endpoints = {
+        "rooms": f"/api/rooms/?limit={args.limit}",
+        "user_bookings": f"/api/bookings/user/{user_id}?limit={args.limit}",
+    }
+    variants = {
+        "plain": {},
+        "gzip": {"Accept-Encoding": "gzip"},
+        "br": {"Accept-Encoding": "br, gzip"},
+        "304": {},
+    }
+    if brotli is None:
+        del variants["br"]
+
+    results = {}
+    print(f"{'endpoint':<14} {'variant':<6} {'status':>6} {'bytes':>8} "
+          f"{'cpu ms':>8} {'queries':>8}")
+    for name, path in endpoints.items():
+        etag = client.get(path, headers=auth).headers["ETag"]
+        for variant, headers in variants.items():
+            headers = {**auth, **headers}
+            if variant == "304":
+                headers["If-None-Match"] = etag
+            response = client.get(path, headers=headers)
+            statements[0] = 0
+            began = time.process_time()
+            for _ in range(args.polls):
+                response = client.get(path, headers=headers)
+            cpu = (time.process_time() - began) / args.polls
+            result = {
+                "status": response.status_code,
+                "bytes": len(response.data),
+                "cpu_ms": round(cpu * 1000, 3),
+                "queries": round(statements[0] / args.polls, 2),
+            }
+            results[f"{name}:{variant}"] = result
+            print(f"{name:<14} {variant:<6} {result['status']:>6} "
+                  f"{result['bytes']:>8} {result['cpu_ms']:>8} "
+                  f"{result['queries']:>8}")
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({
+                "meta": {
+                    "backend": engine.dialect.name,
+                    "rooms": args.rooms,
+                    "bookings": args.bookings,
+                    "limit": args.limit,
+                    "polls": args.polls,
+                },
+                "results": results,
+            }, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
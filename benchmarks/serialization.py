@@ -0,0 +1,178 @@
+"""
+Benchmark for the serialization of list responses.
+
+For each list endpoint, measures rows per second of the previous path
+(ORM objects, ``model_validate(...).model_dump()`` per row and Flask's
+default JSON provider) against the batch path (column tuples,
+``serialize_rows`` and ``FastJSONProvider``). Point ``DATABASE_URL`` at a
+scratch database before running, the benchmark creates its own users,
+rooms and bookings and removes them afterwards:
+
+    python -m benchmarks.serialization --rows 1000
+"""
+
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import delete, insert
+
+from app.main import create_app
+from app.models import Booking, MeetingRoom, User
+from app.schemas import BookingInDB, MeetingRoomInDB, UserInDB
+from app.services import (
+    get_available_rooms,
+    get_bookings,
+    get_bookings_by_room_id,
+    get_bookings_by_user_id,
+    get_rooms,
+    get_users,
+)
+from app.utils.database import SessionLocal, init_db
+from app.utils.serialization import (
+    FastJSONProvider,
+    schema_fields,
+    serialize_rows,
+)
+
+PREFIX = "bench_serial_"
+EPOCH = datetime(2030, 1, 1)
+SLOT = timedelta(minutes=30)
+
+
+def seed(db, rows):
+    """
+    Creates ``rows`` users, rooms and bookings of the first user and room.
+    """
+    db.execute(insert(User), [
+        {"username": f"{PREFIX}{i}", "password": "-", "is_admin": False}
+        for i in range(rows)
+    ])
+    db.execute(insert(MeetingRoom), [
+        {"name": f"{PREFIX}{i}", "capacity": 10, "description": "Benchmark"}
+        for i in range(rows)
+    ])
+    user = db.query(User).filter(User.username == f"{PREFIX}0").one()
+    room = db.query(MeetingRoom).filter(
+        MeetingRoom.name == f"{PREFIX}0"
+    ).one()
+    db.execute(insert(Booking), [
+        {
+            "user_id": user.id,
+            "room_id": room.id,
+            "start_time": EPOCH + SLOT * (2 * i),
+            "end_time": EPOCH + SLOT * (2 * i + 1),
+        }
+        for i in range(rows)
+    ])
+    db.commit()
+    return user.id, room.id
+
+
+def cleanup(db):
+    """
+    Removes everything created by ``seed``.
+    """
+    db.rollback()
+    user_ids = db.query(User.id).filter(User.username.like(f"{PREFIX}%"))
+    db.execute(delete(Booking).where(Booking.user_id.in_(user_ids)))
+    db.execute(delete(User).where(User.username.like(f"{PREFIX}%")))
+    db.execute(delete(MeetingRoom).where(
+        MeetingRoom.name.like(f"{PREFIX}%")
+    ))
+    db.commit()
+
+
+def endpoints(user_id, room_id, rows):
+    """
+    Returns (name, schema, query) for each list endpoint, where ``query``
+    takes a session and the ``fields`` argument of the service.
+    """
+    free_start = EPOCH + SLOT * (2 * rows + 10)
+    return [
+        ("GET /api/bookings", BookingInDB,
+         lambda db, fields: get_bookings(db, 0, rows, fields=fields)),
+        ("GET /api/bookings/user/<id>", BookingInDB,
+         lambda db, fields: get_bookings_by_user_id(
+             db, user_id, 0, rows, fields=fields)),
+        ("GET /api/bookings/room/<id>", BookingInDB,
+         lambda db, fields: get_bookings_by_room_id(
+             db, room_id, 0, rows, fields=fields)),
+        ("GET /api/rooms", MeetingRoomInDB,
+         lambda db, fields: get_rooms(db, 0, rows, fields=fields)),
+        ("GET /api/rooms/available", MeetingRoomInDB,
+         lambda db, fields: get_available_rooms(
+             db, free_start, free_start + SLOT, 1, 0, rows, fields=fields)),
+        ("GET /api/users", UserInDB,
+         lambda db, fields: get_users(db, 0, rows, fields=fields)),
+    ]
+
+
+def legacy(db, provider, schema, query):
+    """
+    Serializes a page the way list routes did before the batch path.
+    """
+    items = query(db, None)
+    provider.response(
+        [schema.model_validate(item).model_dump() for item in items]
+    )
+    return len(items)
+
+
+def batch(db, provider, schema, query):
+    """
+    Serializes a page through the batch path.
+    """
+    items = query(db, schema_fields(schema))
+    provider.response(serialize_rows(schema, items))
+    return len(items)
+
+
+def rows_per_second(db, provider, path, schema, query, repeat):
+    """
+    Returns the median throughput of ``path`` over ``repeat`` runs.
+    """
+    rates = []
+    for _ in range(repeat):
+        db.expunge_all()
+        began = time.perf_counter()
+        count = path(db, provider, schema, query)
+        rates.append(count / (time.perf_counter() - began))
+    return statistics.median(rates)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app()
+    providers = (DefaultJSONProvider(app), FastJSONProvider(app))
+    init_db()
+    db = SessionLocal()
+    try:
+        user_id, room_id = seed(db, args.rows)
+        print(f"{'endpoint':<30} {'before':>12} {'after':>12} "
+              f"{'speedup':>8}  (rows/s)")
+        with app.app_context():
+            for name, schema, query in endpoints(
+                user_id, room_id, args.rows
+            ):
+                before, after = (
+                    rows_per_second(
+                        db, provider, path, schema, query, args.repeat
+                    )
+                    for path, provider in zip((legacy, batch), providers)
+                )
+                print(f"{name:<30} {before:>12,.0f} {after:>12,.0f} "
+                      f"{after / before:>7.1f}x")
+    finally:
+        cleanup(db)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Runs the application under a real server for benchmarks.
+
+``serve`` starts the WSGI mode (gunicorn with threads, ``app.main:app``) or
+the ASGI mode (uvicorn, ``app.asgi:application``) in a subprocess that
+inherits the environment, e.g. ``DATABASE_URL``. ``HttpClient`` talks to
+it with the interface of the Flask test client used by the suite, so the
+same route cases run against either mode.
+"""
+
+import contextlib
+import http.client
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.parse
+from dataclasses import dataclass
+
+MODES = ("wsgi", "asgi")
+
+
+def server_command(mode: str, port: int, workers: int, threads: int):
+    """
+    Returns the command line serving the application in ``mode``.
+    """
+    if mode == "wsgi":
+        return [
+            sys.executable, "-m", "gunicorn", "--worker-class", "gthread",
+            "--workers", str(workers), "--threads", str(threads),
+            "--bind", f"127.0.0.1:{port}", "--log-level", "warning",
+            "app.main:app",
+        ]
+    if mode == "asgi":
+        return [
+            sys.executable, "-m", "uvicorn", "--workers", str(workers),
+            "--port", str(port), "--log-level", "warning",
+            "--no-access-log", "app.asgi:application",
+        ]
+    raise ValueError(f"Unknown mode: {mode}")
+
+
+@contextlib.contextmanager
+def serve(mode: str, port: int, workers: int = 1, threads: int = 32,
+          timeout: float = 30):
+    """
+    Starts a server, waits until it answers and stops it on exit.
+    """
+    process = subprocess.Popen(
+        server_command(mode, port, workers, threads),
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"The {mode} server exited")
+            try:
+                connection = http.client.HTTPConnection("127.0.0.1", port)
+                connection.request("GET", "/metrics")
+                connection.getresponse().read()
+                connection.close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"The {mode} server did not start")
+                time.sleep(0.1)
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+@dataclass
+class HttpRequest:
+    """
+    Method and path of a request, as ``response.request`` of Flask.
+    """
+    method: str
+    path: str
+
+
+class HttpResponse:
+    """
+    A response with the attributes of a Flask test client response.
+    """
+
+    def __init__(self, request: HttpRequest, status_code: int, headers,
+                 body: bytes):
+        self.request = request
+        self.status_code = status_code
+        self.headers = headers
+        self.data = body
+
+    def get_data(self) -> bytes:
+        return self.data
+
+    @property
+    def json(self):
+        if "json" not in self.headers.get("Content-Type", ""):
+            return None
+        return json.loads(self.data)
+
+
+class HttpClient:
+    """
+    Minimal keep-alive HTTP client with the methods of the Flask test
+    client used by the benchmarks.
+    """
+
+    def __init__(self, port: int):
+        self.port = port
+        self.connection = http.client.HTTPConnection("127.0.0.1", port)
+
+    def open(self, method: str, path: str, headers=None, json=None):
+        body = None
+        headers = dict(headers or {})
+        if json is not None:
+            body = _dumps(json)
+            headers["Content-Type"] = "application/json"
+        target = urllib.parse.quote(path, safe="/?=&:+%")
+        for attempt in range(2):
+            try:
+                self.connection.request(method, target, body, headers)
+                response = self.connection.getresponse()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                self.connection.close()
+                if attempt:
+                    raise
+        return HttpResponse(
+            HttpRequest(method, path.split("?", 1)[0]),
+            response.status, response.headers, response.read(),
+        )
+
+    def get(self, path, **kwargs):
+        return self.open("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.open("POST", path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.open("PUT", path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.open("DELETE", path, **kwargs)
+
+
+def _dumps(value) -> bytes:
+    """
+    Encodes a JSON request body.
+    """
+    return json.dumps(value).encode()
@@ -0,0 +1,520 @@
+"""
+Benchmark suite covering every API route and the main service functions.
+
+Generates a seeded data set (see ``benchmarks.data``) in a scratch
+database, then times each case: routes through the Flask test client with
+an administrator's token, services with their own session. Reports p50,
+p95 and p99 latency and throughput per case as JSON, and optionally
+compares the p95 latencies against a stored baseline, failing when a case
+got slower than the allowed tolerance.
+
+By default a fresh SQLite file is used so results are reproducible
+offline. ``--database`` accepts any SQLAlchemy URL, e.g. a MySQL scratch
+database; its tables are dropped and recreated. Password hashing uses
+``BCRYPT_ROUNDS=4`` unless set, so login is not dominated by bcrypt, a
+fixed ``SECRET_KEY`` unless set, and the login and registration rate
+limits are off unless ``RATE_LIMIT_ENABLED`` is set:
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --baseline results.json --tolerance 0.2
+
+``--serve wsgi`` or ``--serve asgi`` runs the route cases over HTTP
+against the application served by gunicorn or uvicorn (see
+``benchmarks.server``) instead of the test client, so both serving modes
+are checked by the same cases.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from benchmarks.server import MODES, HttpClient, serve
+
+
+@dataclass
+class Case:
+    """
+    A timed operation. ``prepare(i)`` builds the arguments of iteration
+    ``i`` outside of the timing, ``run(*arguments)`` is timed.
+    """
+    name: str
+    run: Callable
+    prepare: Callable = lambda i: (i,)
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """
+    Returns a percentile by linear interpolation between closest ranks.
+    """
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    weight = position - lower
+    return sorted_values[lower] * (1 - weight) + sorted_values[upper] * weight
+
+
+def measure(case: Case, iterations: int, warmup: int) -> dict:
+    """
+    Runs a case and summarizes its latencies in milliseconds.
+    """
+    for i in range(warmup):
+        case.run(*case.prepare(i))
+    latencies = []
+    for i in range(warmup, warmup + iterations):
+        arguments = case.prepare(i)
+        began = time.perf_counter()
+        case.run(*arguments)
+        latencies.append((time.perf_counter() - began) * 1000)
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        "count": iterations,
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "throughput_ops": round(iterations / total * 1000, 1),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Prints the p95 change of every case found in both runs and returns
+    the names of the cases slower than the baseline by more than
+    ``tolerance``.
+    """
+    regressions = []
+    for key in ("backend", "dataset", "serve"):
+        if results["meta"].get(key) != baseline["meta"].get(key):
+            print(f"warning: the baseline was recorded with a different "
+                  f"{key}: {baseline['meta'].get(key)}")
+    print(f"\n{'case':<48} {'base p95':>10} {'p95':>10} {'change':>8}")
+    for name, result in results["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        change = result["p95_ms"] / max(base["p95_ms"], 1e-9) - 1
+        flag = ""
+        if change > tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<48} {base['p95_ms']:>10.3f} "
+              f"{result['p95_ms']:>10.3f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def route_cases(client, headers, dataset, ids) -> list[Case]:
+    """
+    Builds one case per API route.
+    """
+    from app.utils.database import SessionLocal
+    from app.models import Booking, MeetingRoom
+    from app.schemas import MeetingRoomCreate, UserCreate
+    from app.services import create_room, create_user
+
+    def check(response, *expected):
+        if response.status_code not in expected:
+            raise RuntimeError(
+                f"{response.request.method} {response.request.path} "
+                f"returned {response.status_code}: {response.get_data()!r}"
+            )
+        return response
+
+    def get(path):
+        return lambda i: check(client.get(path, headers=headers), 200)
+
+    def free_slot(i, hours=1):
+        start = ids["free_day"] + timedelta(days=i // 8, hours=8 + i % 8)
+        return start, start + timedelta(minutes=30 * hours)
+
+    def booking_body(i, room_id=None):
+        start, end = free_slot(i)
+        return {
+            "user_id": ids["admin"],
+            "room_id": room_id or ids["write_room"],
+            "start_time": start.isoformat(),
+            "end_time": end.isoformat(),
+        }
+
+    def new_booking(room_id):
+        def prepare(i):
+            db = SessionLocal()
+            start, end = free_slot(i)
+            booking = Booking(
+                user_id=ids["admin"], room_id=room_id,
+                start_time=start, end_time=end,
+            )
+            db.add(booking)
+            db.commit()
+            booking_id = booking.id
+            db.close()
+            return (booking_id,)
+        return prepare
+
+    def new_room(i):
+        db = SessionLocal()
+        room = create_room(db, MeetingRoomCreate(
+            name=f"bench delete room {i}", capacity=4
+        ))
+        db.close()
+        return (room.id,)
+
+    def new_user(i):
+        db = SessionLocal()
+        user = create_user(db, UserCreate(
+            username=f"bench_delete_{i}", password=dataset.password
+        ))
+        db.close()
+        return (user.id,)
+
+    def series_body(i):
+        start = ids["series_day"] + timedelta(days=7 * i)
+        return {
+            "user_id": ids["admin"],
+            "room_id": ids["series_room"],
+            "start_time": start.isoformat(),
+            "end_time": (start + timedelta(hours=1)).isoformat(),
+            "frequency": "daily",
+            "count": 5,
+        }
+
+    day = ids["busy_day"]
+    week = f"from={day.isoformat()}&to={(day + timedelta(days=7)).isoformat()}"
+    slot = (f"start={(day + timedelta(hours=10)).isoformat()}"
+            f"&end={(day + timedelta(hours=11)).isoformat()}")
+    return [
+        Case("POST /api/auth/register", lambda i: check(client.post(
+            "/api/auth/register",
+            json={"username": f"bench_reg_{i}", "password": "secret1"},
+        ), 201)),
+        Case("POST /api/auth/login", lambda i: check(client.post(
+            "/api/auth/login",
+            json={"username": dataset.admin_username,
+                  "password": dataset.password},
+        ), 200)),
+        Case("POST /api/users/", lambda i: check(client.post(
+            "/api/users/", headers=headers,
+            json={"username": f"bench_new_{i}", "password": "secret1"},
+        ), 201)),
+        Case("GET /api/users/<id>", get(f"/api/users/{ids['user']}")),
+        Case("GET /api/users/username/<name>",
+             get(f"/api/users/username/{dataset.admin_username}")),
+        Case("GET /api/users/", get("/api/users/?limit=100")),
+        Case("PUT /api/users/<id>", lambda i: check(client.put(
+            f"/api/users/{ids['user']}", headers=headers,
+            json={"is_admin": False},
+        ), 200)),
+        Case("DELETE /api/users/<id>", lambda user_id: check(client.delete(
+            f"/api/users/{user_id}", headers=headers
+        ), 204), new_user),
+        Case("POST /api/rooms/", lambda i: check(client.post(
+            "/api/rooms/", headers=headers,
+            json={"name": f"bench new room {i}", "capacity": 6},
+        ), 201)),
+        Case("GET /api/rooms/<id>", get(f"/api/rooms/{ids['room']}")),
+        Case("GET /api/rooms/name/<name>", get("/api/rooms/name/Room 0000")),
+        Case("GET /api/rooms/", get("/api/rooms/?limit=100")),
+        Case("GET /api/rooms/available",
+             get(f"/api/rooms/available?{slot}&limit=100")),
+        Case("GET /api/rooms/occupancy",
+             get(f"/api/rooms/occupancy?{week}&granularity=15m")),
+        Case("PUT /api/rooms/<id>", lambda i: check(client.put(
+            f"/api/rooms/{ids['room']}", headers=headers,
+            json={"description": f"Updated {i}"},
+        ), 200)),
+        Case("DELETE /api/rooms/<id>", lambda room_id: check(client.delete(
+            f"/api/rooms/{room_id}", headers=headers
+        ), 204), new_room),
+        Case("POST /api/bookings/", lambda i: check(client.post(
+            "/api/bookings/", headers=headers, json=booking_body(i),
+        ), 201)),
+        Case("POST /api/bookings/batch", lambda i: check(client.post(
+            "/api/bookings/batch", headers=headers,
+            json=[booking_body(i * 10 + n, ids["batch_room"])
+                  for n in range(10)],
+        ), 200, 201, 207)),
+        Case("GET /api/bookings/<id>", get(f"/api/bookings/{ids['booking']}")),
+        Case("GET /api/bookings/user/<id>",
+             get(f"/api/bookings/user/{ids['busy_user']}?limit=100")),
+        Case("GET /api/bookings/room/<id>",
+             get(f"/api/bookings/room/{ids['busy_room']}?limit=100")),
+        Case("GET /api/bookings/", get("/api/bookings/?limit=100")),
+        Case("GET /api/bookings/export", lambda i: check(client.get(
+            f"/api/bookings/export?{week}", headers=headers
+        ), 200).get_data()),
+        Case("PUT /api/bookings/<id>", lambda booking_id: check(client.put(
+            f"/api/bookings/{booking_id}", headers=headers,
+            json={"end_time": (ids["free_day"] + timedelta(
+                days=-1, hours=10)).isoformat()},
+        ), 200), lambda i: (ids["update_booking"],)),
+        Case("DELETE /api/bookings/<id>", lambda booking_id: check(
+            client.delete(f"/api/bookings/{booking_id}", headers=headers), 204
+        ), new_booking(ids["delete_room"])),
+        Case("POST /api/bookings/series", lambda i: check(client.post(
+            "/api/bookings/series", headers=headers, json=series_body(i),
+        ), 201)),
+        Case("GET /api/bookings/series/<id>",
+             get(f"/api/bookings/series/{ids['series']}")),
+        Case("PUT /api/bookings/series/<id>", lambda i: check(client.put(
+            f"/api/bookings/series/{ids['series']}", headers=headers,
+            json={"count": 3 + i % 3},
+        ), 200)),
+        Case("DELETE /api/bookings/series/<id>", lambda i: check(
+            client.delete(
+                f"/api/bookings/series/{ids['series_base'] + i}",
+                headers=headers,
+            ), 204
+        )),
+        Case("GET /api/admin/pool", get("/api/admin/pool")),
+        Case("GET /api/admin/hashing", get("/api/admin/hashing")),
+    ]
+
+
+def service_cases(dataset, ids) -> list[Case]:
+    """
+    Builds one case per main service function.
+    """
+    from app.utils.database import SessionLocal
+    from app.schemas import BookingCreate
+    from app.services import (
+        create_booking,
+        get_available_rooms,
+        get_booking_by_id,
+        get_bookings,
+        get_bookings_by_room_id,
+        get_rooms,
+        get_rooms_occupancy,
+        get_user_by_username,
+        get_users,
+        iter_bookings,
+    )
+    from app.services.booking import is_room_available
+
+    def with_session(function):
+        def run(i):
+            db = SessionLocal()
+            try:
+                return function(db, i)
+            finally:
+                db.close()
+        return run
+
+    day = ids["busy_day"]
+    slot = (day + timedelta(hours=10), day + timedelta(hours=11))
+
+    def book(db, i):
+        start = ids["free_day"] + timedelta(days=400 + i // 8, hours=8 + i % 8)
+        return create_booking(db, BookingCreate(
+            user_id=ids["admin"], room_id=ids["write_room"],
+            start_time=start, end_time=start + timedelta(minutes=30),
+        ))
+
+    return [
+        Case("get_user_by_username", with_session(
+            lambda db, i: get_user_by_username(db, dataset.admin_username))),
+        Case("get_users", with_session(lambda db, i: get_users(db, 0, 100))),
+        Case("get_rooms", with_session(lambda db, i: get_rooms(db, 0, 100))),
+        Case("get_available_rooms", with_session(
+            lambda db, i: get_available_rooms(db, *slot, 1, 0, 100))),
+        Case("is_room_available", with_session(
+            lambda db, i: is_room_available(db, ids["busy_room"], *slot))),
+        Case("get_booking_by_id", with_session(
+            lambda db, i: get_booking_by_id(db, ids["booking"]))),
+        Case("get_bookings", with_session(
+            lambda db, i: get_bookings(db, 0, 100))),
+        Case("get_bookings_by_room_id", with_session(
+            lambda db, i: get_bookings_by_room_id(
+                db, ids["busy_room"], 0, 100))),
+        Case("iter_bookings", with_session(lambda db, i: sum(1 for _ in (
+            iter_bookings(db, ("id", "start_time"), day,
+                          day + timedelta(days=7)))))),
+        Case("get_rooms_occupancy", with_session(
+            lambda db, i: get_rooms_occupancy(
+                db, day, day + timedelta(days=7), 15))),
+        Case("create_booking", with_session(book)),
+    ]
+
+
+def prepare_ids(dataset, client, headers) -> dict:
+    """
+    Picks the records the cases read and creates those they write to.
+    """
+    from sqlalchemy import func
+    from app.utils.database import SessionLocal
+    from app.models import Booking, MeetingRoom, User
+
+    db = SessionLocal()
+    busy_room, = db.query(Booking.room_id).group_by(Booking.room_id).order_by(
+        func.count().desc()
+    ).first()
+    busy_user, = db.query(Booking.user_id).group_by(Booking.user_id).order_by(
+        func.count().desc()
+    ).first()
+    admin = db.query(User).filter(
+        User.username == dataset.admin_username
+    ).one()
+    rooms = {}
+    for name in ("write", "batch", "delete", "series"):
+        room = MeetingRoom(name=f"bench {name} room", capacity=4)
+        db.add(room)
+        rooms[name] = room
+    db.commit()
+    today = datetime.now(timezone.utc).replace(tzinfo=None)
+    busy_day = datetime.combine(today.date(), datetime.min.time())
+    ids = {
+        "admin": admin.id,
+        "user": db.query(User.id).filter(User.id != admin.id).first()[0],
+        "room": db.query(MeetingRoom.id).first()[0],
+        "booking": db.query(Booking.id).first()[0],
+        "busy_room": busy_room,
+        "busy_user": busy_user,
+        "busy_day": busy_day,
+        "free_day": busy_day + (dataset.window_end - dataset.window_start)
+        + timedelta(days=30),
+        "series_day": busy_day + timedelta(days=3 * 365),
+        **{f"{name}_room": room.id for name, room in rooms.items()},
+    }
+    db.close()
+
+    start = ids["free_day"] - timedelta(days=1, hours=-9)
+    response = client.post("/api/bookings/", headers=headers, json={
+        "user_id": ids["admin"], "room_id": ids["write_room"],
+        "start_time": start.isoformat(),
+        "end_time": (start + timedelta(minutes=30)).isoformat(),
+    })
+    ids["update_booking"] = response.json["id"]
+    series_ids = []
+    for i in range(2):
+        start = ids["series_day"] - timedelta(days=30 * (i + 1))
+        response = client.post("/api/bookings/series", headers=headers, json={
+            "user_id": ids["admin"], "room_id": ids["series_room"],
+            "start_time": start.isoformat(),
+            "end_time": (start + timedelta(hours=1)).isoformat(),
+            "frequency": "daily", "count": 5,
+        })
+        series_ids.append(response.json["id"])
+    ids["series"] = series_ids[0]
+    ids["series_base"] = series_ids[1]
+    return ids
+
+
+def run_cases(cases, args) -> dict:
+    """
+    Measures the selected cases and prints a line per case.
+    """
+    results = {}
+    print(f"\n{'case':<48} {'p50':>9} {'p95':>9} {'p99':>9} {'ops/s':>9}")
+    for kind, case in cases:
+        name = f"{kind}:{case.name}"
+        if args.only and args.only not in name:
+            continue
+        result = measure(case, args.iterations, args.warmup)
+        results[name] = result
+        print(f"{name:<48} {result['p50_ms']:>9.3f} {result['p95_ms']:>9.3f} "
+              f"{result['p99_ms']:>9.3f} {result['throughput_ops']:>9.1f}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database", help="SQLAlchemy URL of a scratch "
+                        "database (default: a temporary SQLite file)")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--rooms", type=int, default=100)
+    parser.add_argument("--bookings", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--only", help="run cases whose name contains this")
+    parser.add_argument("--output", help="write the results to this file")
+    parser.add_argument("--baseline", help="results file to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed p95 slowdown against the baseline")
+    parser.add_argument("--serve", choices=MODES,
+                        help="run the route cases over HTTP against the "
+                        "application served in this mode")
+    parser.add_argument("--port", type=int, default=8731)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="booking-bench-")
+    os.environ["DATABASE_URL"] = args.database or (
+        f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    )
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    from app.utils.database import Base, SessionLocal, get_engine, init_db
+    from app.main import create_app
+    from benchmarks.data import generate
+
+    engine = get_engine()
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+    db = SessionLocal()
+    began = time.perf_counter()
+    dataset = generate(db, args.users, args.rooms, args.bookings, args.seed)
+    db.close()
+    print(f"Generated {dataset.users} users, {dataset.rooms} rooms and "
+          f"{dataset.bookings} bookings in "
+          f"{time.perf_counter() - began:.1f} s on {engine.dialect.name}")
+
+    with contextlib.ExitStack() as stack:
+        if args.serve:
+            stack.enter_context(serve(args.serve, args.port))
+            client = HttpClient(args.port)
+        else:
+            client = create_app().test_client()
+        token = client.post("/api/auth/login", json={
+            "username": dataset.admin_username, "password": dataset.password,
+        }).json["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        ids = prepare_ids(dataset, client, headers)
+
+        cases = [
+            *(("route", case) for case in route_cases(
+                client, headers, dataset, ids
+            )),
+            *(("service", case) for case in service_cases(dataset, ids)),
+        ]
+        results = run_cases(cases, args)
+
+    report = {
+        "meta": {
+            "backend": engine.dialect.name,
+            "serve": args.serve,
+            "dataset": {
+                key: value for key, value in asdict(dataset).items()
+                if key in ("users", "rooms", "bookings", "seed")
+            },
+            "iterations": args.iterations,
+            "python": platform.python_version(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            sys.exit(f"{len(regressions)} case(s) regressed: "
+                     + ", ".join(regressions))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark for the bulk user import.
+
+Creates ``--users`` users with ``create_users_bulk`` and, for a sample of
+``--sequential`` users, with ``create_user`` one at a time, then reports
+the throughput of both next to the time a single process needs to hash
+the same passwords. The import should take about that hashing time divided
+by ``IMPORT_HASH_PROCESSES``. Uses a temporary SQLite file unless
+``--database`` points at a scratch database, whose tables are dropped:
+
+    python -m benchmarks.user_import --users 10000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database", help="SQLAlchemy URL of a scratch "
+                        "database (default: a temporary SQLite file)")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--sequential", type=int, default=200,
+                        help="users created one at a time")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="booking-bench-")
+    os.environ["DATABASE_URL"] = args.database or (
+        f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    )
+
+    from app.utils.database import Base, SessionLocal, get_engine, init_db
+    from app.schemas.user import UserCreate
+    from app.services.user import create_user, create_users_bulk
+    from app.utils.hashing import (
+        BCRYPT_ROUNDS, IMPORT_HASH_PROCESSES, hash_passwords, pwd_context,
+    )
+
+    Base.metadata.drop_all(bind=get_engine())
+    init_db()
+    db = SessionLocal()
+    users = [
+        UserCreate(username=f"import_{index:06d}", password=f"pw-{index:06d}")
+        for index in range(args.users)
+    ]
+    # Start the pool processes outside the measurements.
+    hash_passwords(["warmup"] * IMPORT_HASH_PROCESSES)
+
+    sample = users[:args.sequential]
+    began = time.perf_counter()
+    for user in sample:
+        pwd_context.hash(user.password)
+    hashing = (time.perf_counter() - began) / len(sample) * len(users)
+
+    began = time.perf_counter()
+    for user in sample:
+        create_user(db, UserCreate(
+            username=f"one_{user.username}", password=user.password
+        ))
+    sequential = (time.perf_counter() - began) / len(sample)
+
+    began = time.perf_counter()
+    results = create_users_bulk(db, users)
+    bulk = time.perf_counter() - began
+    created = sum(result["status"] == "created" for result in results)
+    db.close()
+
+    print(f"bcrypt rounds {BCRYPT_ROUNDS}, "
+          f"{IMPORT_HASH_PROCESSES} hashing processes")
+    print(f"{'method':<22} {'users':>7} {'seconds':>9} {'users/s':>9}")
+    print(f"{'one at a time':<22} {len(users):>7} "
+          f"{sequential * len(users):>9.2f} {1 / sequential:>9.1f}  "
+          f"(extrapolated from {len(sample)})")
+    print(f"{'hashing, 1 process':<22} {len(users):>7} {hashing:>9.2f} "
+          f"{len(users) / hashing:>9.1f}  "
+          f"(bound: {hashing / IMPORT_HASH_PROCESSES:.2f} s)")
+    print(f"{'import':<22} {created:>7} {bulk:>9.2f} "
+          f"{created / bulk:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
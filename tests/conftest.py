@@ -0,0 +1,100 @@
+"""
+Shared test setup: every test session runs against a fresh SQLite file
+with cheap password hashing, strict loading and enforced query budgets.
+Settings are read when the application is imported, so they are set here
+before any test module imports it.
+"""
+
+import os
+import tempfile
+import uuid
+
+_directory = tempfile.mkdtemp(prefix="booking-tests-")
+os.environ["DATABASE_URL"] = (
+    f"sqlite:///{os.path.join(_directory, 'test.db')}"
+)
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["STRICT_LOADING"] = "true"
+os.environ["QUERY_DEBUG"] = "true"
+os.environ["QUERY_BUDGET_STRICT"] = "true"
+# Two import chunks: a full import is then cheap enough to test against
+# the budget derived from this limit.
+os.environ["USER_IMPORT_MAX_ROWS"] = "2000"
+
+import pytest  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.schemas import UserCreate  # noqa: E402
+from app.services import create_user  # noqa: E402
+from app.utils.database import SessionLocal, init_db  # noqa: E402
+
+PASSWORD = "secret1"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    """
+    Creates the schema once per test session.
+    """
+    init_db()
+
+
+@pytest.fixture
+def db():
+    """
+    A database session, closed after the test.
+    """
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture(scope="session")
+def client():
+    """
+    A test client of the application.
+    """
+    app.testing = True
+    return app.test_client()
+
+
+@pytest.fixture(scope="module")
+def names():
+    """
+    Returns unique names, so test modules can share the database.
+    """
+    prefix = uuid.uuid4().hex[:8]
+    return lambda name: f"{name}_{prefix}"
+
+
+@pytest.fixture(scope="module")
+def admin(client, names):
+    """
+    An admin user and the headers authenticating as them.
+    """
+    db = SessionLocal()
+    user = create_user(db, UserCreate(
+        username=names("admin"), password=PASSWORD, is_admin=True
+    ))
+    user_id = user.id
+    db.close()
+    token = client.post("/api/auth/login", json={
+        "username": names("admin"), "password": PASSWORD,
+    }).json["access_token"]
+    return user_id, {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(scope="session")
+def call(client):
+    """
+    Sends a request, checks its status and returns its JSON body.
+    """
+    def call(method, path, status, **kwargs):
+        response = getattr(client, method)(path, **kwargs)
+        assert response.status_code == status, response.get_data(
+            as_text=True
+        )
+        return response.json
+    return call
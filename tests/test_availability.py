@@ -0,0 +1,124 @@
+"""
+The in-process availability index answers conflict checks exactly like the
+database does.
+"""
+
+import random
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import Booking, MeetingRoom, User
+from app.schemas import BookingCreate, BookingUpdate
+from app.services import (
+    booking as booking_service,
+    cancel_booking,
+    create_booking,
+    update_booking,
+)
+from app.services.availability import AvailabilityIndex, RoomIntervals
+from app.services.booking import is_room_available
+
+DAY = (datetime.utcnow() + timedelta(days=60)).replace(
+    hour=0, minute=0, second=0, microsecond=0
+)
+
+
+def slot(start: int, length: int) -> tuple[datetime, datetime]:
+    """
+    A time slot given in quarter hours from ``DAY``.
+    """
+    start_time = DAY + timedelta(minutes=15 * start)
+    return start_time, start_time + timedelta(minutes=15 * length)
+
+
+def random_slots(rng, count):
+    return [slot(rng.randrange(0, 400), rng.randrange(1, 12))
+            for _ in range(count)]
+
+
+def test_intervals_match_a_linear_scan():
+    rng = random.Random(5)
+    intervals = RoomIntervals(0, datetime.min)
+    kept = {}
+    for booking_id in range(300):
+        start_time, end_time = slot(
+            rng.randrange(0, 2000), rng.randrange(1, 8)
+        )
+        if rng.random() < 0.3 and kept:
+            removed = rng.choice(sorted(kept))
+            intervals.remove(removed)
+            del kept[removed]
+        if not any(start_time < end and start < end_time
+                   for start, end in kept.values()):
+            intervals.add(booking_id, start_time, end_time)
+            kept[booking_id] = (start_time, end_time)
+        assert intervals.starts == sorted(intervals.starts)
+        query = random_slots(rng, 1)[0]
+        exclude = rng.choice([None, *kept])
+        assert intervals.overlaps(*query, exclude) == any(
+            query[0] < end and start < query[1]
+            for other, (start, end) in kept.items() if other != exclude
+        )
+
+
+@pytest.fixture
+def room(db):
+    prefix = f"availability_{uuid.uuid4().hex[:8]}"
+    user = User(username=prefix, password="-", is_admin=False)
+    room = MeetingRoom(name=prefix, capacity=4)
+    db.add_all([user, room])
+    db.flush()
+    rng = random.Random(11)
+    taken = []
+    for start_time, end_time in random_slots(rng, 60):
+        if not any(start_time < end and start < end_time
+                   for start, end in taken):
+            taken.append((start_time, end_time))
+            db.add(Booking(user_id=user.id, room_id=room.id,
+                           start_time=start_time, end_time=end_time))
+    db.commit()
+    return user.id, room.id
+
+
+def assert_index_matches_database(db, index, room_id, rng):
+    booking_ids = [booking_id for booking_id, in db.query(Booking.id).filter(
+        Booking.room_id == room_id
+    )]
+    db_room = db.get(MeetingRoom, room_id)
+    for start_time, end_time in random_slots(rng, 200):
+        exclude = rng.choice([None, *booking_ids])
+        assert index.is_free(
+            db, db_room, start_time, end_time, exclude
+        ) == is_room_available(db, room_id, start_time, end_time, exclude)
+    db.rollback()
+
+
+def test_index_matches_the_database_across_writes(db, room, monkeypatch):
+    user_id, room_id = room
+    index = AvailabilityIndex(enabled=True)
+    monkeypatch.setattr(booking_service, "availability_index", index)
+    rng = random.Random(3)
+    assert_index_matches_database(db, index, room_id, rng)
+    entry = index._rooms[room_id]
+
+    created = []
+    for start_time, end_time in random_slots(rng, 20):
+        try:
+            created.append(create_booking(db, BookingCreate(
+                user_id=user_id, room_id=room_id,
+                start_time=start_time, end_time=end_time,
+            )).id)
+        except ValueError:
+            db.rollback()
+    assert created
+    moved_start, moved_end = slot(500, 4)
+    update_booking(db, created[0], BookingUpdate(
+        start_time=moved_start, end_time=moved_end
+    ))
+    assert cancel_booking(db, created[-1])
+    db.commit()
+
+    assert index._rooms[room_id] is entry
+    assert_index_matches_database(db, index, room_id, rng)
@@ -0,0 +1,151 @@
+"""
+Expansion of recurrence rules and the series routes.
+"""
+
+from datetime import date, datetime, timedelta
+from email.utils import parsedate_to_datetime
+
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.booking_series import (
+    MAX_INTERVAL,
+    SERIES_HORIZON_DAYS,
+    BookingSeriesBase,
+)
+from app.services.booking_series import expand_occurrences
+
+START = datetime(2030, 1, 31, 9, 0)
+
+
+def rule(**fields) -> BookingSeriesBase:
+    return BookingSeriesBase(**{
+        "start_time": START,
+        "end_time": START + timedelta(hours=1),
+        "frequency": "daily",
+        "count": 3,
+        **fields,
+    })
+
+
+def starts(series: BookingSeriesBase) -> list[datetime]:
+    return [start_time for start_time, _ in expand_occurrences(series)]
+
+
+def test_daily_and_weekly_intervals():
+    assert starts(rule(interval=2)) == [
+        START, START + timedelta(days=2), START + timedelta(days=4),
+    ]
+    assert starts(rule(frequency="weekly")) == [
+        START, START + timedelta(weeks=1), START + timedelta(weeks=2),
+    ]
+
+
+def test_monthly_skips_missing_days():
+    assert starts(rule(frequency="monthly", count=3)) == [
+        START, START.replace(month=3), START.replace(month=5),
+    ]
+
+
+def test_until_is_inclusive():
+    series = rule(count=None, until=START + timedelta(days=2))
+    assert len(starts(series)) == 3
+
+
+def test_exceptions_are_skipped():
+    series = rule(exceptions=[date(2030, 2, 1)])
+    assert starts(series) == [START, START + timedelta(days=2)]
+
+
+def test_timezone_aware_times_are_stored_naive():
+    series = rule(
+        start_time="2030-01-31T09:00:00Z", end_time="2030-01-31T10:00:00Z"
+    )
+    assert starts(series)[0] == START
+
+
+def test_overlapping_occurrences_are_rejected():
+    with pytest.raises(ValueError, match="overlap"):
+        expand_occurrences(rule(end_time=START + timedelta(days=2)))
+
+
+@pytest.mark.parametrize("frequency", sorted(MAX_INTERVAL))
+def test_interval_is_bounded_per_frequency(frequency):
+    rule(frequency=frequency, interval=MAX_INTERVAL[frequency], count=1)
+    with pytest.raises(ValidationError):
+        rule(frequency=frequency, interval=MAX_INTERVAL[frequency] + 1)
+
+
+@pytest.mark.parametrize("frequency", sorted(MAX_INTERVAL))
+def test_occurrences_are_bounded_by_the_horizon(frequency):
+    with pytest.raises(ValueError, match=str(SERIES_HORIZON_DAYS)):
+        expand_occurrences(rule(
+            frequency=frequency, interval=MAX_INTERVAL[frequency], count=730
+        ))
+
+
+def test_occurrences_past_the_last_year_are_rejected():
+    late = datetime(9999, 12, 1, 9, 0)
+    for frequency in MAX_INTERVAL:
+        with pytest.raises(ValueError, match="out of the supported range"):
+            expand_occurrences(rule(
+                frequency=frequency, start_time=late,
+                end_time=late + timedelta(hours=1),
+                interval=MAX_INTERVAL[frequency],
+            ))
+
+
+@pytest.fixture(scope="module")
+def series_setup(call, admin, names):
+    user_id, headers = admin
+    room = call("post", "/api/rooms/", 201, headers=headers, json={
+        "name": names("series room"), "capacity": 4,
+    })
+    return user_id, room["id"], headers
+
+
+def series_body(user_id, room_id, **fields):
+    start = (datetime.utcnow() + timedelta(days=10)).replace(
+        hour=9, minute=0, second=0, microsecond=0
+    )
+    return {
+        "user_id": user_id,
+        "room_id": room_id,
+        "start_time": start.isoformat(),
+        "end_time": (start + timedelta(hours=1)).isoformat(),
+        "frequency": "daily",
+        "count": 3,
+        **fields,
+    }
+
+
+@pytest.mark.parametrize("fields", [
+    {"frequency": "monthly", "interval": 60000},
+    {"frequency": "daily", "interval": 10 ** 9},
+    {"frequency": "weekly", "interval": 200000},
+    {"frequency": "weekly", "interval": 52, "count": 730},
+])
+def test_unbounded_series_are_rejected(call, series_setup, fields):
+    user_id, room_id, headers = series_setup
+    call("post", "/api/bookings/series", 400, headers=headers,
+         json=series_body(user_id, room_id, **fields))
+
+
+def test_update_with_timezone_aware_times(call, series_setup):
+    user_id, room_id, headers = series_setup
+    body = series_body(user_id, room_id, frequency="weekly")
+    series = call("post", "/api/bookings/series", 201, headers=headers,
+                  json=body)
+    start = datetime.fromisoformat(body["start_time"]) + timedelta(hours=2)
+    updated = call(
+        "put", f"/api/bookings/series/{series['id']}", 200, headers=headers,
+        json={
+            "start_time": f"{start.isoformat()}Z",
+            "end_time": f"{(start + timedelta(hours=1)).isoformat()}Z",
+            "until": f"{(start + timedelta(weeks=1)).isoformat()}+00:00",
+        }
+    )
+    assert [
+        parsedate_to_datetime(booking["start_time"]).replace(tzinfo=None)
+        for booking in updated["bookings"]
+    ] == [start, start + timedelta(weeks=1)]
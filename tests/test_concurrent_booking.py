@@ -0,0 +1,48 @@
+"""
+Concurrent booking writers must never double book a room.
+"""
+
+import argparse
+import uuid
+
+import pytest
+
+from app.models import MeetingRoom, User
+from app.services import lock_room
+from benchmarks.concurrent_booking import count_double_bookings, run
+
+
+@pytest.fixture
+def writers_setup(db):
+    """
+    A user and rooms reserved for the concurrent writers.
+    """
+    prefix = f"concurrent_{uuid.uuid4().hex[:8]}"
+    user = User(username=prefix, password="-", is_admin=False)
+    rooms = [
+        MeetingRoom(name=f"{prefix}_{index}", capacity=1)
+        for index in range(8)
+    ]
+    db.add_all([user, *rooms])
+    db.commit()
+    return user.id, [room.id for room in rooms]
+
+
+@pytest.mark.parametrize("scenario", ["shared", "separate"])
+def test_concurrent_writers_never_double_book(db, writers_setup, scenario):
+    user_id, room_ids = writers_setup
+    args = argparse.Namespace(
+        threads=8, attempts=25, shared_rooms=2, slots=20, seed=7
+    )
+    counts = run(scenario, user_id, room_ids, args)
+    assert counts["created"] > 0
+    assert count_double_bookings(db, room_ids) == 0
+
+
+def test_lock_room_requires_a_new_transaction(db, writers_setup):
+    _, room_ids = writers_setup
+    db.query(User).first()
+    with pytest.raises(RuntimeError):
+        lock_room(db, room_ids[0])
+    db.rollback()
+    assert lock_room(db, room_ids[0]).id == room_ids[0]
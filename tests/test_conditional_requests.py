@@ -0,0 +1,86 @@
+"""
+Conditional GETs of the booking list of a user: ``304 Not Modified`` while
+it is unchanged, a new ETag after every write and after archiving.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import Booking
+from app.services import archive_bookings
+from app.utils.database import SessionLocal
+
+
+@pytest.fixture(scope="module")
+def setup(call, admin, names):
+    user_id, headers = admin
+    room = call("post", "/api/rooms/", 201, headers=headers, json={
+        "name": names("conditional room"), "capacity": 4,
+    })
+    return user_id, room["id"], headers
+
+
+def get_list(client, user_id, headers, etag=None):
+    if etag is not None:
+        headers = {**headers, "If-None-Match": etag}
+    return client.get(f"/api/bookings/user/{user_id}", headers=headers)
+
+
+def add_booking(call, setup, days):
+    user_id, room_id, headers = setup
+    start = (datetime.utcnow() + timedelta(days=days)).replace(
+        minute=0, second=0, microsecond=0
+    )
+    return call("post", "/api/bookings/", 201, headers=headers, json={
+        "user_id": user_id,
+        "room_id": room_id,
+        "start_time": start.isoformat(),
+        "end_time": (start + timedelta(hours=1)).isoformat(),
+    })
+
+
+def test_unchanged_list_is_not_modified(client, call, setup):
+    user_id, _, headers = setup
+    add_booking(call, setup, 3)
+    first = get_list(client, user_id, headers)
+    assert first.status_code == 200 and first.headers["ETag"]
+    again = get_list(client, user_id, headers, first.headers["ETag"])
+    assert again.status_code == 304
+    assert again.headers["ETag"] == first.headers["ETag"]
+
+
+def test_etag_changes_after_writes(client, call, setup):
+    user_id, _, headers = setup
+    etag = get_list(client, user_id, headers).headers["ETag"]
+    booking = add_booking(call, setup, 4)
+    response = get_list(client, user_id, headers, etag)
+    assert response.status_code == 200
+    assert booking["id"] in [item["id"] for item in response.json]
+
+    etag = response.headers["ETag"]
+    call("delete", f"/api/bookings/{booking['id']}", 204, headers=headers)
+    response = get_list(client, user_id, headers, etag)
+    assert response.status_code == 200
+    assert booking["id"] not in [item["id"] for item in response.json]
+
+
+def test_etag_changes_after_archiving(client, setup):
+    user_id, room_id, headers = setup
+    db = SessionLocal()
+    start = datetime.utcnow() - timedelta(days=800)
+    booking = Booking(
+        user_id=user_id, room_id=room_id,
+        start_time=start, end_time=start + timedelta(hours=1),
+    )
+    db.add(booking)
+    db.commit()
+    booking_id = booking.id
+    first = get_list(client, user_id, headers)
+    assert booking_id in [item["id"] for item in first.json]
+
+    assert archive_bookings(db) >= 1
+    db.close()
+    response = get_list(client, user_id, headers, first.headers["ETag"])
+    assert response.status_code == 200
+    assert booking_id not in [item["id"] for item in response.json]
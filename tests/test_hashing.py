@@ -0,0 +1,58 @@
+"""
+Bulk password hashing on the hashing thread pool.
+"""
+
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.utils import hashing
+from app.utils.hashing import HashingBusyError, HashingPool
+
+
+def test_map_spreads_items_over_the_workers_in_order():
+    pool = HashingPool(workers=3, queue_limit=0)
+    barrier = threading.Barrier(3, timeout=5)
+
+    def work(item):
+        barrier.wait()
+        return item * 2, threading.current_thread().name
+
+    results = pool.map(work, list(range(6)))
+    assert [value for value, _ in results] == [0, 2, 4, 6, 8, 10]
+    assert len({thread for _, thread in results}) == 3
+    assert pool.stats()["completed"] == 6
+
+
+def test_map_is_rejected_when_the_pool_is_full():
+    pool = HashingPool(workers=1, queue_limit=0)
+    started, release = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    thread = threading.Thread(target=pool.run, args=(block,))
+    thread.start()
+    started.wait(5)
+    with pytest.raises(HashingBusyError):
+        pool.map(str, [1, 2])
+    release.set()
+    thread.join()
+    assert pool.map(str, [1, 2]) == ["1", "2"]
+
+
+def test_import_falls_back_to_the_thread_pool(monkeypatch):
+    def broken(passwords):
+        raise BrokenProcessPool("no processes")
+
+    monkeypatch.setattr(hashing, "_hash_on_processes", broken)
+    passwords = [f"password{index}" for index in range(
+        hashing.IMPORT_PROCESS_MIN_ROWS + 1
+    )]
+    hashes = hashing.hash_passwords(passwords)
+    assert all(
+        hashing.pwd_context.verify(password, hashed)
+        for password, hashed in zip(passwords, hashes)
+    )
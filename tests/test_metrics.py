@@ -0,0 +1,37 @@
+"""
+The metrics route and the per-request state of the instrumentation.
+"""
+
+import pytest
+
+from app.routes import metrics as metrics_route
+from app.utils import metrics
+
+
+@pytest.mark.parametrize("authorization", [
+    "", "Bearer wrong", "Bearer s3crét", "Bearer s3cret-and-more",
+])
+def test_metrics_reject_other_tokens(client, monkeypatch, authorization):
+    monkeypatch.setattr(metrics_route, "METRICS_TOKEN", "s3cret")
+    response = client.get(
+        "/metrics", headers={"Authorization": authorization}
+    )
+    assert response.status_code == 401
+
+
+def test_metrics_accept_the_token(client, monkeypatch):
+    monkeypatch.setattr(metrics_route, "METRICS_TOKEN", "s3cret")
+    response = client.get(
+        "/metrics", headers={"Authorization": "Bearer s3cret"}
+    )
+    assert response.status_code == 200
+    assert 'route="/metrics"' in response.get_data(as_text=True)
+
+
+def test_request_state_is_reused(client):
+    client.get("/metrics")
+    spare = list(metrics._shard.spare)
+    assert spare
+    client.get("/metrics")
+    assert metrics._shard.spare == spare
+    assert metrics._request.get() is None
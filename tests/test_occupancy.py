@@ -0,0 +1,147 @@
+"""
+Occupancy bitsets of the meeting rooms: rasterization, encodings, the
+versioned cache and the occupancy route.
+"""
+
+import base64
+import random
+import uuid
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.models import MeetingRoom, User
+from app.schemas import BookingCreate
+from app.services import create_booking
+from app.services.occupancy import (
+    MINUTES_PER_DAY,
+    OccupancyCache,
+    encode_base64,
+    encode_rle,
+    get_rooms_occupancy,
+    rasterize_day,
+)
+
+DAY = date.today() + timedelta(days=90)
+MIDNIGHT = datetime.combine(DAY, datetime.min.time())
+
+
+def brute_force(day, granularity, intervals):
+    """
+    Marks each cell overlapping an interval, one cell at a time.
+    """
+    day_start = datetime.combine(day, datetime.min.time())
+    cells = ""
+    for cell in range(MINUTES_PER_DAY // granularity):
+        cell_start = day_start + timedelta(minutes=cell * granularity)
+        cell_end = cell_start + timedelta(minutes=granularity)
+        cells += "1" if any(start < cell_end and cell_start < end
+                            for start, end in intervals) else "0"
+    return int(cells, 2)
+
+
+@pytest.mark.parametrize("granularity", [5, 15, 60, 180])
+def test_rasterize_day_matches_a_cell_by_cell_scan(granularity):
+    rng = random.Random(granularity)
+    for _ in range(50):
+        intervals = []
+        for _ in range(rng.randrange(0, 6)):
+            start = MIDNIGHT + timedelta(minutes=rng.randrange(-600, 1700))
+            intervals.append(
+                (start, start + timedelta(minutes=rng.randrange(1, 400)))
+            )
+        assert rasterize_day(DAY, granularity, intervals) == brute_force(
+            DAY, granularity, intervals
+        )
+
+
+def test_first_cell_is_the_most_significant_bit():
+    first_hour = [(MIDNIGHT, MIDNIGHT + timedelta(hours=1))]
+    assert rasterize_day(DAY, 60, first_hour) == 1 << 23
+
+
+def test_encodings():
+    bits = int("0011100001", 2)
+    assert encode_rle(10, bits) == [2, 3, 4, 1]
+    assert encode_rle(10, bits ^ 0b1111111111) == [0, 2, 3, 4, 1]
+    assert encode_rle(4, 0) == [4]
+    assert base64.b64decode(encode_base64(10, bits)) == bytes(
+        [0b00111000, 0b01000000]
+    )
+
+
+def test_cache_entries_are_tied_to_a_version():
+    cache = OccupancyCache(maxsize=2)
+    cache.set("a", 1, 0b101)
+    assert cache.get("a", 1) == 0b101
+    assert cache.get("a", 2) is None
+    cache.set("b", 1, 1)
+    cache.get("a", 1)
+    cache.set("c", 1, 1)
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) == 0b101
+
+
+@pytest.fixture
+def room(db):
+    prefix = f"occupancy_{uuid.uuid4().hex[:8]}"
+    user = User(username=prefix, password="-", is_admin=False)
+    room = MeetingRoom(name=prefix, capacity=4)
+    db.add_all([user, room])
+    db.commit()
+    return user.id, room.id
+
+
+def book(db, user_id, room_id, start_hour, hours):
+    start_time = MIDNIGHT + timedelta(hours=start_hour)
+    create_booking(db, BookingCreate(
+        user_id=user_id, room_id=room_id,
+        start_time=start_time, end_time=start_time + timedelta(hours=hours),
+    ))
+
+
+def occupancy_of(db, room_id, start, end, granularity):
+    return next(
+        (cells, bits) for other, cells, bits
+        in get_rooms_occupancy(db, start, end, granularity)
+        if other == room_id
+    )
+
+
+def test_bookings_across_days_update_the_cached_bits(db, room):
+    user_id, room_id = room
+    book(db, user_id, room_id, 23, 2)
+    start, end = MIDNIGHT + timedelta(hours=22), MIDNIGHT + timedelta(hours=26)
+    assert occupancy_of(db, room_id, start, end, 60) == (4, 0b0110)
+    assert occupancy_of(db, room_id, start, end, 60) == (4, 0b0110)
+    book(db, user_id, room_id, 25, 1)
+    assert occupancy_of(db, room_id, start, end, 60) == (4, 0b0111)
+    assert occupancy_of(db, room_id, start, end, 30) == (8, 0b00111111)
+
+
+def test_route_encodes_each_room(call, admin, db, room):
+    user_id, room_id = room
+    book(db, user_id, room_id, 9, 2)
+    _, headers = admin
+    path = (f"/api/rooms/occupancy?from={DAY}T08:00:00"
+            f"&to={DAY}T12:00:00&granularity=1h")
+    body = call("get", f"{path}&encoding=rle", 200, headers=headers)
+    assert body["cells"] == 4
+    assert body["granularity"] == 60
+    rooms = {item["room_id"]: item["occupancy"] for item in body["rooms"]}
+    assert rooms[room_id] == [1, 2, 1]
+    body = call("get", path, 200, headers=headers)
+    rooms = {item["room_id"]: item["occupancy"] for item in body["rooms"]}
+    assert base64.b64decode(rooms[room_id]) == bytes([0b01100000])
+
+
+@pytest.mark.parametrize("query", [
+    "from={day}T08:00:00&to={day}T12:00:00&granularity=7m",
+    "from={day}T08:05:00&to={day}T12:00:00&granularity=15m",
+    "from={day}T08:00:00&to={day}T12:00:00&encoding=png",
+    "to={day}T12:00:00",
+])
+def test_route_rejects_invalid_queries(call, admin, query):
+    _, headers = admin
+    call("get", f"/api/rooms/occupancy?{query.format(day=DAY)}", 400,
+         headers=headers)
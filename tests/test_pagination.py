@@ -0,0 +1,114 @@
+"""
+Keyset (cursor) pagination of the booking lists, including pages merged
+from the bookings table and the archive.
+"""
+
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import Booking, MeetingRoom
+from app.schemas import UserCreate
+from app.services import archive_bookings, create_user
+from app.utils.database import SessionLocal
+from app.utils.pagination import decode_cursor, encode_cursor
+from conftest import PASSWORD
+
+
+def test_cursor_round_trip():
+    key = (datetime(2030, 1, 2, 3, 4), 42)
+    cursor = encode_cursor(key)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, datetime.fromisoformat, int) == key
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64 !",
+    encode_cursor(("2030-01-02T03:04:00",)),
+    encode_cursor(("not a date", 1)),
+    encode_cursor(("2030-01-02T03:04:00", "not an id")),
+    "eyJzdGFydCI6MX0",
+])
+def test_invalid_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor, datetime.fromisoformat, int)
+
+
+@pytest.fixture(scope="module")
+def history(call):
+    """
+    A user with archived bookings, past and upcoming bookings, several of
+    them starting at the same time (in different rooms). Returns the user
+    id, the booking ids in list order and the user's headers.
+    """
+    db = SessionLocal()
+    prefix = f"pages_{uuid.uuid4().hex[:8]}"
+    user = create_user(db, UserCreate(username=prefix, password=PASSWORD))
+    rooms = [MeetingRoom(name=f"{prefix}_{index}", capacity=2)
+             for index in range(3)]
+    db.add_all(rooms)
+    db.flush()
+    now = datetime.utcnow().replace(second=0, microsecond=0)
+    starts = [now + timedelta(days=days) for days in (-900, -800, -800,
+                                                      -10, 5, 5, 5, 20)]
+    bookings = [
+        Booking(user_id=user.id, room_id=rooms[index % 3].id,
+                start_time=start, end_time=start + timedelta(hours=1))
+        for index, start in enumerate(starts)
+    ]
+    db.add_all(bookings)
+    db.commit()
+    ordered = [booking.id for booking in sorted(
+        bookings, key=lambda booking: (booking.start_time, booking.id)
+    )]
+    user_id = user.id
+    archive_bookings(db)
+    db.close()
+    token = call("post", "/api/auth/login", 200, json={
+        "username": prefix, "password": PASSWORD,
+    })["access_token"]
+    return user_id, ordered, {"Authorization": f"Bearer {token}"}
+
+
+def walk(call, path, headers, limit):
+    """
+    Follows the cursors of a keyset list, returning the ids of each page.
+    """
+    pages, cursor = [], ""
+    while cursor is not None:
+        page = call("get", f"{path}&limit={limit}&after={cursor}", 200,
+                    headers=headers)
+        pages.append([item["id"] for item in page["items"]])
+        cursor = page["next_cursor"]
+    return pages
+
+
+@pytest.mark.parametrize("limit", [1, 3, 8])
+def test_pages_merge_the_archive_in_order(call, history, limit):
+    user_id, ordered, headers = history
+    pages = walk(call, f"/api/bookings/user/{user_id}?history=true",
+                 headers, limit)
+    assert [booking for page in pages for booking in page] == ordered
+    assert all(len(page) <= limit for page in pages)
+
+
+def test_pages_without_history_skip_the_archive(call, history):
+    user_id, ordered, headers = history
+    pages = walk(call, f"/api/bookings/user/{user_id}?", headers, 2)
+    assert [booking for page in pages for booking in page] == ordered[3:]
+
+
+def test_offset_pages_merge_the_archive(call, history):
+    user_id, ordered, headers = history
+    page = call(
+        "get", f"/api/bookings/user/{user_id}?history=true&skip=2&limit=3",
+        200, headers=headers,
+    )
+    assert [item["id"] for item in page] == ordered[2:5]
+
+
+def test_invalid_cursor_is_a_bad_request(call, history):
+    user_id, _, headers = history
+    call("get", f"/api/bookings/user/{user_id}?after=garbage", 400,
+         headers=headers)
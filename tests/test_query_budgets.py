@@ -0,0 +1,168 @@
+"""
+Every route with a ``@query_budget`` must stay within it.
+
+``QUERY_DEBUG`` and ``QUERY_BUDGET_STRICT`` are enabled in conftest, so a
+request running more SQL statements than the budget of its route raises
+``QueryBudgetExceeded`` and fails the test. Each route is exercised in its
+most expensive variant (embedded relations, archived history, the largest
+user import), and the last test checks that no budgeted route was left
+out.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.main import app
+from app.models import Booking
+from app.routes.users import USER_IMPORT_MAX_ROWS
+from app.services import archive_bookings
+from app.services.user import IMPORT_CHUNK_ROWS
+from app.utils import query_budget
+from app.utils.database import SessionLocal
+from conftest import PASSWORD
+
+DAY = (datetime.utcnow() + timedelta(days=30)).replace(
+    hour=0, minute=0, second=0, microsecond=0
+)
+
+
+@pytest.fixture(scope="module")
+def room_id(call, admin, names):
+    _, headers = admin
+    return call("post", "/api/rooms/", 201, headers=headers, json={
+        "name": names("room"), "capacity": 4,
+    })["id"]
+
+
+@pytest.fixture(scope="module")
+def archived_id(admin, room_id):
+    """
+    A booking moved to the archive, so history reads query both tables.
+    """
+    user_id, _ = admin
+    db = SessionLocal()
+    start = datetime.utcnow() - timedelta(days=800)
+    booking = Booking(
+        user_id=user_id, room_id=room_id,
+        start_time=start, end_time=start + timedelta(hours=1),
+    )
+    db.add(booking)
+    db.commit()
+    booking_id = booking.id
+    archive_bookings(db)
+    db.close()
+    return booking_id
+
+
+def booking_body(user_id, room_id, hour):
+    start = DAY + timedelta(hours=hour)
+    return {
+        "user_id": user_id,
+        "room_id": room_id,
+        "start_time": start.isoformat(),
+        "end_time": (start + timedelta(minutes=30)).isoformat(),
+    }
+
+
+def test_auth_routes(call, names):
+    call("post", "/api/auth/register", 201, json={
+        "username": names("registered"), "password": PASSWORD,
+    })
+    token = call("post", "/api/auth/login", 200, json={
+        "username": names("registered"), "password": PASSWORD,
+    })["access_token"]
+    call("post", "/api/auth/logout", 204,
+         headers={"Authorization": f"Bearer {token}"})
+
+
+def test_user_routes(call, admin, names):
+    _, headers = admin
+    user = call("post", "/api/users/", 201, headers=headers, json={
+        "username": names("user"), "password": PASSWORD,
+    })
+    call("get", f"/api/users/{user['id']}", 200, headers=headers)
+    call("get", f"/api/users/username/{names('user')}", 200,
+         headers=headers)
+    call("get", "/api/users/?limit=100", 200, headers=headers)
+    call("put", f"/api/users/{user['id']}", 200, headers=headers,
+         json={"is_admin": False})
+    call("delete", f"/api/users/{user['id']}", 204, headers=headers)
+
+
+def test_largest_user_import(call, admin, names):
+    _, headers = admin
+    assert USER_IMPORT_MAX_ROWS > IMPORT_CHUNK_ROWS
+    rows = [
+        {"username": names(f"imported{index}"), "password": PASSWORD}
+        for index in range(USER_IMPORT_MAX_ROWS)
+    ]
+    results = call("post", "/api/users/import", 200, headers=headers,
+                   json=rows)
+    assert all(result["status"] == "created" for result in results)
+
+
+def test_room_routes(call, admin, room_id, names):
+    _, headers = admin
+    slot = (f"start={(DAY + timedelta(hours=10)).isoformat()}"
+            f"&end={(DAY + timedelta(hours=11)).isoformat()}")
+    week = f"from={DAY.isoformat()}&to={(DAY + timedelta(days=7)).isoformat()}"
+    call("get", f"/api/rooms/{room_id}", 200, headers=headers)
+    call("get", f"/api/rooms/name/{names('room')}", 200,
+         headers=headers)
+    call("get", "/api/rooms/?limit=100", 200, headers=headers)
+    call("get", f"/api/rooms/available?{slot}", 200, headers=headers)
+    call("get", f"/api/rooms/occupancy?{week}", 200, headers=headers)
+    call("put", f"/api/rooms/{room_id}", 200, headers=headers,
+         json={"description": "Updated"})
+    other = call("post", "/api/rooms/", 201, headers=headers, json={
+        "name": names("deleted room"), "capacity": 2,
+    })
+    call("delete", f"/api/rooms/{other['id']}", 204, headers=headers)
+
+
+def test_booking_routes(call, admin, room_id, archived_id):
+    user_id, headers = admin
+    booking = call("post", "/api/bookings/", 201, headers=headers,
+                   json=booking_body(user_id, room_id, 8))
+    call("post", "/api/bookings/batch", 200, headers=headers, json=[
+        booking_body(user_id, room_id, hour) for hour in range(12, 16)
+    ])
+    related = "include=room,user"
+    call("get", f"/api/bookings/{booking['id']}?{related}", 200,
+         headers=headers)
+    call("get", f"/api/bookings/{archived_id}?{related}", 200,
+         headers=headers)
+    for path in (f"/api/bookings/user/{user_id}",
+                 f"/api/bookings/room/{room_id}", "/api/bookings/"):
+        call("get", f"{path}?{related}&history=true&limit=100", 200,
+             headers=headers)
+    call("get", "/api/bookings/export?history=true", 200,
+         headers=headers)
+    call("put", f"/api/bookings/{booking['id']}", 200, headers=headers,
+         json=booking_body(user_id, room_id, 9))
+    call("delete", f"/api/bookings/{booking['id']}", 204,
+         headers=headers)
+
+
+def test_series_routes(call, admin, room_id):
+    user_id, headers = admin
+    series = call("post", "/api/bookings/series", 201, headers=headers,
+                  json={**booking_body(user_id, room_id, 18),
+                        "frequency": "daily", "count": 5})
+    call("get", f"/api/bookings/series/{series['id']}", 200,
+         headers=headers)
+    call("put", f"/api/bookings/series/{series['id']}", 200,
+         headers=headers, json={"count": 3})
+    call("delete", f"/api/bookings/series/{series['id']}", 204,
+         headers=headers)
+
+
+def test_every_budgeted_route_was_exercised():
+    budgeted = {
+        endpoint for endpoint, view in app.view_functions.items()
+        if hasattr(view, "query_budget")
+    }
+    exercised = {endpoint for endpoint, _ in query_budget.get_report()}
+    assert budgeted <= exercised, budgeted - exercised
+
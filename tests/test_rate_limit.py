@@ -0,0 +1,82 @@
+"""
+Token buckets of the rate limiter and the limits of the login route.
+"""
+
+import pytest
+
+from app.routes import auth
+from app.utils import rate_limit
+from app.utils.rate_limit import Limit, MemoryBuckets
+
+
+def test_limit_parses_requests_per_seconds():
+    limit = Limit.parse("20/60")
+    assert limit.burst == 20
+    assert limit.rate == pytest.approx(1 / 3)
+    with pytest.raises(ValueError):
+        Limit.parse("0/60")
+
+
+def test_bucket_allows_its_burst_then_refills(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    buckets = MemoryBuckets()
+    limit = Limit(rate=0.5, burst=2)
+    assert buckets.take([("key", limit)]) == 0
+    assert buckets.take([("key", limit)]) == 0
+    assert buckets.take([("key", limit)]) == pytest.approx(2)
+    now[0] += 2
+    assert buckets.take([("key", limit)]) == 0
+
+
+def test_rejected_request_takes_no_token():
+    buckets = MemoryBuckets()
+    roomy, tight = Limit(rate=0.001, burst=2), Limit(rate=0.001, burst=1)
+    assert buckets.take([("ip", roomy), ("user", tight)]) == 0
+    assert buckets.take([("ip", roomy), ("user", tight)]) > 0
+    assert buckets.take([("ip", roomy)]) == 0
+    assert buckets.take([("ip", roomy)]) > 0
+
+
+def test_least_recently_used_keys_are_evicted():
+    buckets = MemoryBuckets(maxsize=2)
+    limit = Limit(rate=0.001, burst=1)
+    for key in ("first", "second", "third"):
+        buckets.take([(key, limit)])
+    assert buckets.take([("first", limit)]) == 0
+    assert buckets.take([("third", limit)]) > 0
+
+
+@pytest.fixture
+def limited(monkeypatch):
+    """
+    Enables rate limiting with fresh buckets and small login limits.
+    """
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(rate_limit, "buckets", MemoryBuckets())
+    monkeypatch.setattr(auth.LOGIN_LIMIT_PER_IP, "burst", 4)
+    monkeypatch.setattr(auth.LOGIN_LIMIT_PER_USERNAME, "burst", 2)
+
+
+def login(client, username, address):
+    return client.post(
+        "/api/auth/login",
+        json={"username": username, "password": "wrong password"},
+        environ_base={"REMOTE_ADDR": address},
+    )
+
+
+def test_failed_logins_lock_a_username_out_of_one_address_only(
+    client, limited
+):
+    statuses = [login(client, "victim", "10.0.0.1").status_code
+                for _ in range(3)]
+    assert statuses == [401, 401, 429]
+    assert login(client, "victim", "10.0.0.1").headers["Retry-After"]
+    assert login(client, "victim", "10.0.0.2").status_code == 401
+
+
+def test_login_limit_per_address(client, limited):
+    statuses = [login(client, f"user{index}", "10.0.0.3").status_code
+                for index in range(5)]
+    assert statuses == [401] * 4 + [429]
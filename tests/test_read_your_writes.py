@@ -0,0 +1,43 @@
+"""
+Clients that wrote recently read from the primary.
+"""
+
+from collections import OrderedDict
+
+import pytest
+from flask import Response
+
+from app.main import app
+from app.utils import database
+
+
+@pytest.fixture
+def replicated(monkeypatch):
+    """
+    Pretends a replica is configured, with no recent writers.
+    """
+    monkeypatch.setattr(database, "_replicas", [object()])
+    monkeypatch.setattr(database, "_recent_writers", OrderedDict())
+
+
+def request_as(token, method="GET"):
+    return app.test_request_context(
+        "/", method=method, headers={"Authorization": f"Bearer {token}"}
+    )
+
+
+def test_writers_are_remembered_without_their_token(replicated):
+    with request_as("first-token", "POST"):
+        database.record_write(Response(status=201))
+        assert database._wrote_recently()
+    assert not any("first-token" in key for key in database._recent_writers)
+    with request_as("first-token"):
+        assert database._wrote_recently()
+    with request_as("second-token"):
+        assert not database._wrote_recently()
+
+
+def test_failed_writes_are_not_remembered(replicated):
+    with request_as("first-token", "POST"):
+        database.record_write(Response(status=400))
+        assert not database._wrote_recently()
@@ -0,0 +1,68 @@
+"""
+Verified tokens are cached until they expire, and revoked tokens are
+rejected until then.
+"""
+
+import time
+
+from app.utils.token_cache import TokenCache
+from conftest import PASSWORD
+
+
+def test_cached_token_expires():
+    cache = TokenCache(maxsize=10, redis_url=None)
+    cache.set("fresh", "alice", time.time() + 60)
+    cache.set("expired", "bob", time.time() - 1)
+    assert cache.get("fresh") == "alice"
+    assert cache.get("expired") is None
+
+
+def test_oldest_token_is_evicted_first():
+    cache = TokenCache(maxsize=2, redis_url=None)
+    expires_at = time.time() + 60
+    for token in ("first", "second", "third"):
+        cache.set(token, token, expires_at)
+    assert cache.get("first") is None
+    assert cache.get("second") == "second"
+    assert cache.get("third") == "third"
+
+
+def test_revoked_token_is_uncached_and_never_cached_again():
+    cache = TokenCache(maxsize=10, redis_url=None)
+    expires_at = time.time() + 60
+    cache.set("token", "alice", expires_at)
+    cache.revoke("token", expires_at)
+    assert cache.is_revoked("token")
+    assert cache.get("token") is None
+    cache.set("token", "alice", expires_at)
+    assert cache.get("token") is None
+
+
+def test_expired_revocations_are_forgotten():
+    cache = TokenCache(maxsize=10, redis_url=None)
+    cache.revoke("old", time.time() + 0.01)
+    time.sleep(0.02)
+    cache.revoke("new", time.time() + 60)
+    assert not cache.is_revoked("old")
+    assert cache.is_revoked("new")
+
+
+def login(call, username):
+    token = call("post", "/api/auth/login", 200, json={
+        "username": username, "password": PASSWORD,
+    })["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_logout_revokes_only_its_token(call, names):
+    user = call("post", "/api/auth/register", 201, json={
+        "username": names("leaving"), "password": PASSWORD,
+    })
+    own_bookings = f"/api/bookings/user/{user['id']}"
+    leaving = login(call, names("leaving"))
+    staying = login(call, names("leaving"))
+    call("get", own_bookings, 200, headers=leaving)
+    call("post", "/api/auth/logout", 204, headers=leaving)
+    call("get", own_bookings, 401, headers=leaving)
+    call("post", "/api/auth/logout", 401, headers=leaving)
+    call("get", own_bookings, 200, headers=staying)
@@ -0,0 +1,38 @@
+"""
+The cache of authenticated users never keeps a snapshot read before an
+invalidation.
+"""
+
+from app.utils.user_cache import UserCache, UserSnapshot
+
+
+def test_snapshot_read_before_an_invalidation_is_dropped():
+    cache = UserCache(maxsize=10, ttl=60, redis_url=None)
+    generation = cache.generation()
+    stale = UserSnapshot(1, "alice", is_admin=True)
+    cache.invalidate("alice")
+    cache.set(stale, generation)
+    assert cache.get("alice") is None
+
+
+def test_snapshot_read_without_invalidation_is_cached():
+    cache = UserCache(maxsize=10, ttl=60, redis_url=None)
+    generation = cache.generation()
+    snapshot = UserSnapshot(1, "alice", is_admin=False)
+    cache.set(snapshot, generation)
+    assert cache.get("alice") is snapshot
+
+
+def test_role_change_is_seen_on_the_next_request(call, admin, names):
+    _, headers = admin
+    user = call("post", "/api/users/", 201, headers=headers, json={
+        "username": names("promoted"), "password": "secret1",
+    })
+    token = call("post", "/api/auth/login", 200, json={
+        "username": names("promoted"), "password": "secret1",
+    })["access_token"]
+    own = {"Authorization": f"Bearer {token}"}
+    call("get", "/api/users/", 403, headers=own)
+    call("put", f"/api/users/{user['id']}", 200, headers=headers,
+         json={"is_admin": True})
+    call("get", "/api/users/", 200, headers=own)